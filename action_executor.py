@@ -0,0 +1,169 @@
+"""Пул действий команд: программы, браузер и громкость выполняются вне потока распознавания"""
+import threading
+import time
+from collections import deque
+
+from metrics import METRICS
+from event_log import log_event
+
+
+class ActionRejected(Exception):
+    """Очередь действий заполнена"""
+
+
+class ActionTimeout(Exception):
+    """Действие не закончилось за отведенное время"""
+
+
+class Action:
+    """Действие: имя, функция, обработчики результата и срок по time.monotonic()"""
+    def __init__(self, name, func, done, failed, timeout):
+        self.name = name
+        self.func = func
+        self.done = done
+        self.failed = failed
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout
+        self.finished = False  # Результат или таймаут уже сообщены
+
+
+class ActionExecutor:
+    """Действия команд выполняются в ограниченном пуле потоков
+
+    submit() ставит действие в очередь и сразу возвращается, поэтому поток
+    распознавания не ждет запуска программ, браузера и вызовов COM. Потоков
+    не больше workers, они создаются по мере надобности. Действия с одним
+    именем выполняются по очереди (две команды громкости не поменяются
+    местами). Очередь ограничена capacity: лишнее действие сразу получает
+    failed(ActionRejected). Если действие не закончилось за timeout секунд с
+    постановки, failed(ActionTimeout) вызывает сторожевой поток; прервать
+    функцию нельзя, поэтому поток пула остается занят до ее возврата, а
+    поздний результат отбрасывается. done и failed вызываются из потоков пула.
+    """
+    def __init__(self, workers=2, capacity=8, timeout=10.0, metrics=METRICS):
+        self.workers = workers
+        self.capacity = capacity
+        self.timeout = timeout
+        self.metrics = metrics
+        self.late = 0  # Действия, закончившиеся после таймаута
+        self._queue = deque()
+        self._active = []  # Выполняемые действия
+        self._lock = threading.Lock()
+        self._work_cond = threading.Condition(self._lock)
+        self._watch_cond = threading.Condition(self._lock)
+        self._threads = []
+        self._idle = 0  # Потоки пула, ждущие действия
+        self._watchdog = None
+        self._running = True
+
+    def submit(self, name, func, done=None, failed=None, timeout=None):
+        """Ставит действие в очередь; False - очередь заполнена (failed уже вызван)"""
+        action = Action(name, func, done, failed, self.timeout if timeout is None else timeout)
+        with self._lock:
+            accepted = len(self._queue) < self.capacity
+            if accepted:
+                self._running = True
+                self._queue.append(action)
+                if not self._idle and len(self._threads) < self.workers:
+                    thread = threading.Thread(target=self._work, name="action", daemon=True)
+                    self._threads.append(thread)
+                    thread.start()
+                else:
+                    self._work_cond.notify()
+                if self._watchdog is None:
+                    self._watchdog = threading.Thread(target=self._watch, name="action-watchdog", daemon=True)
+                    self._watchdog.start()
+                else:
+                    self._watch_cond.notify()
+        if not accepted:
+            self._fail(action, 'rejected', ActionRejected(f"очередь действий заполнена ({self.capacity})"))
+        return accepted
+
+    def stop(self, timeout=1.0):
+        """Отменяет ожидающие действия и ждет потоки пула не дольше timeout секунд"""
+        with self._lock:
+            self._running = False
+            self._queue.clear()
+            threads, self._threads = self._threads, []
+            watchdog, self._watchdog = self._watchdog, None
+            self._work_cond.notify_all()
+            self._watch_cond.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in threads + [watchdog]:
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(max(0.0, deadline - time.monotonic()))  # Зависшее действие не держит выход
+
+    def _next(self):
+        """Первое действие, с именем которого ничего не выполняется (под блокировкой)"""
+        running = {action.name for action in self._active}
+        for action in self._queue:
+            if action.name not in running:
+                self._queue.remove(action)
+                return action
+        return None
+
+    def _work(self):
+        while True:
+            with self._lock:
+                action = self._next()
+                while action is None:
+                    if not self._running:
+                        return
+                    self._idle += 1
+                    self._work_cond.wait()
+                    self._idle -= 1
+                    action = self._next()
+                self._active.append(action)
+            started = time.perf_counter()
+            try:
+                result, error = action.func(), None
+            except Exception as e:
+                result, error = None, e
+            self.metrics.histogram('quant_action_seconds', "Длительность действий команд",
+                                   action=action.name).observe(time.perf_counter() - started)
+            with self._lock:
+                self._active.remove(action)
+                late, action.finished = action.finished, True
+                if late:
+                    self.late += 1
+                if any(queued.name == action.name for queued in self._queue):
+                    self._work_cond.notify()  # Очередное действие с тем же именем
+            if late:
+                log_event(f"Действие {action.name} закончилось после таймаута", "warning", action=action.name)
+            elif error is not None:
+                self._fail(action, 'error', error)
+            elif action.done is not None:
+                self._call(action, action.done, result)
+
+    def _watch(self):
+        """Сторожевой поток: сообщает о действиях, не закончившихся к сроку"""
+        while True:
+            with self._lock:
+                if self._watchdog is not threading.current_thread():
+                    return
+                now = time.monotonic()
+                expired = [action for action in list(self._active) + list(self._queue)
+                           if not action.finished and action.deadline <= now]
+                for action in expired:
+                    action.finished = True
+                    if action in self._queue:
+                        self._queue.remove(action)  # Ожидающее действие уже не нужно
+                if not expired:
+                    pending = [action.deadline for action in list(self._active) + list(self._queue)
+                               if not action.finished]
+                    self._watch_cond.wait(min(pending) - now if pending else None)
+                    continue
+            for action in expired:
+                self._fail(action, 'timeout', ActionTimeout(f"нет результата за {action.timeout:g} с"))
+
+    def _fail(self, action, reason, error):
+        self.metrics.counter('quant_action_failures_total', "Действия команд с ошибкой, таймаутом или отказом",
+                             action=action.name, reason=reason).inc()
+        if action.failed is not None:
+            self._call(action, action.failed, error)
+
+    def _call(self, action, callback, value):
+        try:
+            callback(value)
+        except Exception as e:
+            log_event(f"Ошибка обработки результата действия {action.name}: {e}", "error", action=action.name)
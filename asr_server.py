@@ -0,0 +1,211 @@
+"""Сервер распознавания: много потоков аудио по TCP с одной загруженной моделью
+
+    python asr_server.py --port 8765
+
+Протокол: клиент отправляет строку JSON с параметрами сессии ({} или
+{"language": "en"}), затем сырой 16-битный моно PCM 16 кГц. Сервер отвечает
+строками JSON: {"type": "wake"}, {"type": "intent", ...}, {"type": "speech",
+"text": ...}, {"type": "action", ...} и {"type": "idle"}. Когда клиент закрывает
+отправку (shutdown), сервер дораспознает остаток и закрывает соединение.
+"""
+import argparse
+import json
+import socket
+import socketserver
+import threading
+import time
+
+import main
+from main import VoiceAssistant, open_model, SAMPLE_RATE, CHUNK_SIZE
+from audio_source import AudioSource
+from model_cache import ModelCache
+from metrics import METRICS, MetricsExporter
+from event_log import EVENT_LOG, log_event
+from system_monitor import SystemMonitor
+from speech import SpeechOutput, NullBackend, PRIORITY_NORMAL
+
+
+class SocketSource(AudioSource):
+    """Аудио из соединения клиента
+
+    Соединение закрывает сервер после конца сессии, поэтому close() (в том
+    числе при мягком перезапуске сессии) его не трогает.
+    """
+    def __init__(self, reader, sample_rate, chunk_size, realtime=True):
+        super().__init__(sample_rate, chunk_size)
+        self.reader = reader
+        self.realtime = realtime  # Клиент - живой микрофон: в ожидании отставание отбрасывается
+
+    def read(self):
+        data = self.reader.read(self.chunk_size * 2)  # Целый чанк или остаток перед концом потока
+        return data or None
+
+
+class RemoteVolume:
+    """Громкость клиента: команда уходит клиенту, уровень запоминается в сессии"""
+    def __init__(self, session):
+        self.session = session
+        self.level = 50
+
+    def get_volume(self):
+        return self.level
+
+    def set_volume(self, percent):
+        self.level = max(0, min(100, percent))
+        self.session.send({'type': 'action', 'action': 'volume', 'level': self.level})
+        return self.level
+
+
+class Session(VoiceAssistant):
+    """Ассистент одного клиента: свои распознаватели, активный режим и таймеры, общая модель
+
+    Речь и действия (браузер, программы, громкость) не выполняются на сервере,
+    а уходят клиенту сообщениями JSON.
+    """
+    def __init__(self, session_id, connection, reader, models, language=None, pool=None, system_monitor=None):
+        self.session_id = session_id
+        self.connection = connection
+        self._send_lock = threading.Lock()
+        super().__init__(SocketSource(reader, SAMPLE_RATE, CHUNK_SIZE), models, language, pool,
+                         system_monitor=system_monitor)
+
+    def send(self, message):
+        """Отправляет клиенту строку JSON (из любого потока сессии)"""
+        data = (json.dumps(message, ensure_ascii=False) + "\n").encode('utf-8')
+        with self._send_lock:
+            try:
+                self.connection.sendall(data)
+            except OSError:
+                self.stop()  # Клиент отключился
+
+    def init_voice_engine(self):
+        self.speech = SpeechOutput(NullBackend())
+        self.speech.start()
+
+    def init_volume_controller(self):
+        self.volume_controller = RemoteVolume(self)
+
+    def speak(self, text, interrupt=False, priority=PRIORITY_NORMAL, chime=False, started=None):
+        self.last_command_time = time.time()
+        self.send({'type': 'speech', 'text': text, 'interrupt': interrupt, 'chime': chime})
+
+    def open_url(self, url):
+        self.send({'type': 'action', 'action': 'open_url', 'url': url})
+
+    def open_program(self, program_name):
+        self.send({'type': 'action', 'action': 'open_program', 'name': program_name})
+        return True
+
+    def stop(self):
+        super().stop()
+        if not self.restart_requested:
+            try:
+                self.connection.shutdown(socket.SHUT_RDWR)  # Будим захват, ждущий данных клиента
+            except OSError:
+                pass
+
+    def exec_restart(self):
+        raise RuntimeError("Перезапуск процесса недоступен в режиме сервера")
+
+    def activate(self):
+        if not self.is_active:
+            self.send({'type': 'wake', 'position': self.stream_position})
+        super().activate()
+
+    def deactivate(self, silent=False):
+        if self.is_active:
+            self.send({'type': 'idle'})
+        super().deactivate(silent)
+
+    def process_user_input(self, text):
+        match = self.router.match(text)
+        self.send({'type': 'intent', 'intent': match.name, 'text': text,
+                   'number': match.slots['number'], 'unit': match.slots['unit'], 'query': match.slots['query'],
+                   'position': self.stream_position})  # Байт потока, на котором закончилась команда
+        super().process_user_input(text)
+
+
+class SessionHandler(socketserver.StreamRequestHandler):
+    """Соединение клиента: заголовок сессии, затем основной цикл ассистента до конца потока"""
+    def handle(self):
+        server = self.server
+        try:
+            options = json.loads(self.rfile.readline() or b"{}")
+        except ValueError:
+            return
+        with server.lock:
+            server.counter += 1
+            session_id = server.counter
+        session = Session(session_id, self.connection, self.rfile, server.models,
+                          options.get('language'), server.pool, server.system_monitor)
+        with server.lock:
+            server.sessions[session_id] = session
+        try:
+            session.run()
+        finally:
+            with server.lock:
+                del server.sessions[session_id]
+
+
+class AsrServer(socketserver.ThreadingTCPServer):
+    """TCP-сервер сессий; все сессии берут модели из одного кэша или декодируют в общем пуле процессов"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, models=None, pool=None):
+        super().__init__(address, SessionHandler)
+        self.models = models or ModelCache(open_model, main.MODEL_CACHE_MEMORY, main.MODELS_DIR)
+        self.pool = pool  # RecognitionPool: сессии закрепляются за его процессами
+        # Один опрос состояния системы на все сессии (состояние сервера, а не клиента)
+        self.system_monitor = SystemMonitor(main.SYSTEM_STATUS_TTL, main.SYSTEM_MOUNT_TIMEOUT)
+        self.sessions = {}  # Номер -> Session
+        self.counter = 0
+        self.lock = threading.Lock()
+
+    def stop(self):
+        """Останавливает прием соединений и все сессии"""
+        self.shutdown()
+        with self.lock:
+            sessions = list(self.sessions.values())
+        for session in sessions:
+            session.stop()
+        self.server_close()
+        self.system_monitor.stop()
+
+
+def serve():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1', help="Адрес для входящих соединений")
+    parser.add_argument('--port', type=int, default=8765, help="Порт")
+    parser.add_argument('--workers', type=int, default=main.RECOGNITION_WORKERS,
+                        help="Процессов для декодирования (0 - в процессе сервера)")
+    parser.add_argument('--metrics-port', type=int, default=main.METRICS_PORT,
+                        help="Порт метрик Prometheus на localhost (0 - без HTTP)")
+    args = parser.parse_args()
+
+    EVENT_LOG.configure(main.LOG_FILE, main.LOG_MAX_BYTES, main.LOG_BACKUPS, main.LOG_CONSOLE)
+    pool = None
+    if args.workers:
+        from recognition_pool import RecognitionPool
+        pool = RecognitionPool(args.workers, SAMPLE_RATE)
+    server = AsrServer((args.host, args.port), pool=pool)
+    if pool is None:
+        server.models.get(main.LANGUAGES[main.LANGUAGE])  # Модель по умолчанию загружается до первого клиента
+    log_event(f"Сервер распознавания слушает {args.host}:{server.server_address[1]}", color="bold_green")
+    # Метрики всех сессий сервера - в общем реестре процесса
+    exporter = MetricsExporter(METRICS, args.metrics_port or None, main.METRICS_SNAPSHOT,
+                               main.METRICS_SNAPSHOT_SECONDS, log=log_event)
+    exporter.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log_event("Завершение работы...")
+    finally:
+        server.stop()
+        exporter.stop()
+        if pool is not None:
+            pool.close()
+
+
+if __name__ == '__main__':
+    serve()
@@ -0,0 +1,268 @@
+"""Источники аудио для ассистента: микрофон и воспроизведение записей"""
+import threading
+import time
+import wave
+from collections import deque
+
+from resampler import Resampler
+
+
+class AudioSource:
+    """Базовый источник аудио: выдает чанки 16-битного моно PCM"""
+    realtime = True  # Данные идут в реальном времени, потери при переполнении допустимы
+    captured = None  # time.perf_counter() получения последнего чанка, если источник его знает
+
+    def __init__(self, sample_rate, chunk_size):
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size  # Размер чанка в сэмплах
+
+    def open(self):
+        """Готовит устройство заранее (может идти параллельно с другими шагами запуска)"""
+
+    def start(self):
+        """Открывает источник и начинает выдачу данных"""
+
+    def read(self):
+        """Возвращает следующий чанк (bytes или memoryview, действительный до следующего read) или None"""
+        raise NotImplementedError
+
+    def close(self):
+        """Освобождает ресурсы источника"""
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def input_devices(pa):
+    """Устройства ввода PortAudio: [(номер, название, частота по умолчанию)]"""
+    devices = []
+    for index in range(pa.get_device_count()):
+        info = pa.get_device_info_by_index(index)
+        if info.get('maxInputChannels', 0) > 0:
+            devices.append((index, info['name'], int(info.get('defaultSampleRate', 0))))
+    return devices
+
+
+def find_input_device(pa, device):
+    """Номер устройства ввода по номеру или части названия (None - устройство по умолчанию)"""
+    if device is None or isinstance(device, int):
+        return device
+    devices = input_devices(pa)
+    for index, name, _ in devices:
+        if device.lower() in name.lower():
+            return index
+    raise ValueError(f"Микрофон '{device}' не найден, доступны: {', '.join(name for _, name, _ in devices)}")
+
+
+class MicrophoneSource(AudioSource):
+    """Захват аудио с микрофона через PyAudio в режиме обратного вызова
+
+    PortAudio отдает кадры по chunk_size сэмплов (10-50 мс) из своего потока;
+    обратный вызов только кладет кадр в очередь и никогда не ждет, read()
+    забирает кадры в потоке захвата. Если поток захвата отстал больше чем на
+    MAX_QUEUED_SECONDS, старые кадры отбрасываются. device - номер устройства
+    или часть его названия (None - устройство по умолчанию).
+
+    native=True открывает устройство с его собственной частотой и числом
+    каналов (многие USB-микрофоны и массивы работают только на 44,1/48 кГц),
+    а сведение в моно и передискретизацию до sample_rate делает Resampler в
+    потоке захвата. Если устройство так не открывается, частоту приводит
+    драйвер, как при native=False.
+    """
+    MAX_QUEUED_SECONDS = 2
+    MAX_CHANNELS = 8  # Больше каналов не запрашиваем (виртуальные устройства сообщают десятки)
+
+    def __init__(self, sample_rate, chunk_size, device=None, native=True):
+        super().__init__(sample_rate, chunk_size)
+        self.device = device
+        self.native = native
+        self.capture_format = None  # (частота, каналы), с которыми открыто устройство
+        self.resampler = None
+        self.pa = None
+        self.stream = None
+        self.frames = deque()  # (кадр, time.perf_counter() обратного вызова)
+        self.max_frames = max(1, self.MAX_QUEUED_SECONDS * sample_rate // chunk_size)
+        self.overflows = 0  # Кадры, о потере которых сообщил PortAudio
+        self.dropped = 0  # Кадры, отброшенные из-за отставания потока захвата
+        self._cond = threading.Condition()
+        self._closed = False
+        self._continue = None
+
+    def open(self):
+        import pyaudio  # PortAudio нужен только для живого микрофона
+        self.pa = pyaudio.PyAudio()
+        self._continue = pyaudio.paContinue
+        index = find_input_device(self.pa, self.device)
+        formats = [(self.sample_rate, 1)]
+        if self.native:
+            info = (self.pa.get_default_input_device_info() if index is None
+                    else self.pa.get_device_info_by_index(index))
+            native = (int(info['defaultSampleRate']), max(1, min(int(info['maxInputChannels']), self.MAX_CHANNELS)))
+            if native != formats[0]:
+                formats.insert(0, native)
+        for rate, channels in formats:
+            try:
+                self.stream = self.pa.open(
+                    format=pyaudio.paInt16,
+                    channels=channels,
+                    rate=rate,
+                    input=True,
+                    frames_per_buffer=self.chunk_size * rate // self.sample_rate,  # Та же длительность кадра
+                    input_device_index=index,
+                    stream_callback=self._callback,
+                    start=False
+                )
+                break
+            except OSError:
+                if (rate, channels) == formats[-1]:
+                    raise
+        self.capture_format = (rate, channels)
+        self.resampler = None if (rate, channels) == (self.sample_rate, 1) else Resampler(rate, self.sample_rate,
+                                                                                           channels)
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        """Вызывается потоком PortAudio на каждый кадр"""
+        captured = time.perf_counter()
+        with self._cond:
+            if status:
+                self.overflows += 1  # paInputOverflow: драйвер не дождался опроса
+            if len(self.frames) >= self.max_frames:
+                self.frames.popleft()
+                self.dropped += 1
+            self.frames.append((in_data, captured))
+            self._cond.notify()
+        return None, self._continue
+
+    def start(self):
+        if self.stream is None:
+            self.open()
+        with self._cond:
+            self._closed = False
+            self.frames.clear()
+        if self.resampler is not None:
+            self.resampler.reset()
+        self.stream.start_stream()
+
+    def read(self):
+        """Следующий кадр (моно, sample_rate); None - источник закрыт
+
+        После передискретизации кадр - memoryview буфера Resampler: его нужно
+        скопировать (RingBuffer.write) до следующего вызова.
+        """
+        while True:
+            with self._cond:
+                while not self.frames and not self._closed:
+                    self._cond.wait()
+                if not self.frames:
+                    return None
+                data, self.captured = self.frames.popleft()
+            if self.resampler is not None:
+                data = self.resampler.process(data)
+            if data:  # Кадр короче периода передискретизации копится до следующего
+                return data
+
+    def close(self):
+        """Закрывает устройство; можно вызывать из любого потока и повторно (stop() и поток захвата)"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            stream, self.stream = self.stream, None
+            pa, self.pa = self.pa, None
+        if stream is not None:
+            stream.stop_stream()
+            stream.close()
+        if pa is not None:
+            pa.terminate()
+
+
+def read_pcm(path, sample_rate):
+    """Читает WAV или сырой PCM (16 бит, моно) и возвращает bytes"""
+    if not path.lower().endswith('.wav'):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    with wave.open(path, 'rb') as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1:
+            raise ValueError(f"{path}: нужен 16-битный моно WAV")
+        if wf.getframerate() != sample_rate:
+            raise ValueError(f"{path}: частота {wf.getframerate()} Гц, ожидается {sample_rate} Гц")
+        return wf.readframes(wf.getnframes())
+
+
+class FileSource(AudioSource):
+    """Воспроизведение записей (WAV/сырой PCM или бинарный поток) вместо микрофона
+
+    realtime=True выдает чанки с темпом реального времени,
+    realtime=False - так быстро, как их забирает потребитель (без потерь).
+    После каждой записи добавляется gap секунд тишины, чтобы распознаватель
+    закрыл фразу.
+    """
+    def __init__(self, inputs, sample_rate, chunk_size, realtime=False, gap=1.0, loop=False):
+        super().__init__(sample_rate, chunk_size)
+        self.inputs = list(inputs)
+        self.realtime = realtime
+        self.gap = gap
+        self.loop = loop
+        self.utterance_ends = []  # Смещения в байтах, где заканчивается каждая запись
+        self.end_times = {}  # Индекс записи -> time.monotonic() выдачи ее последнего чанка
+        self.bytes_read = 0
+        self._chunks = None
+
+    def _load(self, item):
+        if isinstance(item, (bytes, bytearray)):
+            return bytes(item)
+        if hasattr(item, 'read'):  # Поток с сырым PCM
+            return item.read()
+        return read_pcm(item, self.sample_rate)
+
+    def _iter_chunks(self):
+        chunk_bytes = self.chunk_size * 2
+        silence = bytes(int(self.gap * self.sample_rate) * 2)
+        index = 0
+        while True:
+            for item in self.inputs:
+                data = self._load(item)
+                for pos in range(0, len(data), chunk_bytes):
+                    chunk = data[pos:pos + chunk_bytes]
+                    if pos + chunk_bytes >= len(data):
+                        self.utterance_ends.append(self.bytes_read + len(chunk))
+                        yield chunk, index
+                    else:
+                        yield chunk, None
+                index += 1
+                for pos in range(0, len(silence), chunk_bytes):
+                    yield silence[pos:pos + chunk_bytes], None
+            if not self.loop:
+                return
+
+    def start(self):
+        self._chunks = self._iter_chunks()
+        # Темп отсчитывается так, будто уже выданное аудио записано до этого запуска
+        self._started = time.monotonic() - self.bytes_read / 2 / self.sample_rate
+
+    def read(self):
+        item = next(self._chunks, None)
+        if item is None:
+            return None
+        chunk, finished_index = item
+
+        if self.realtime:
+            # Выдаем чанк не раньше, чем он был бы записан микрофоном
+            due = self._started + (self.bytes_read + len(chunk)) / 2 / self.sample_rate
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        self.bytes_read += len(chunk)
+        if finished_index is not None:
+            self.end_times[finished_index] = time.monotonic()
+        return chunk
+
+    @property
+    def duration(self):
+        """Длительность выданного аудио в секундах"""
+        return self.bytes_read / 2 / self.sample_rate
@@ -0,0 +1,206 @@
+"""Пакетное распознавание записей и проверка команд: пул процессов, JSONL и сводка путаницы намерений
+
+    python batch_eval.py corpus/manifest.jsonl --model models/vosk-model-small-ru-0.22 --out results.jsonl
+
+Корпус - манифест JSONL ({"audio": ..., "text": ...}) или папка с WAV и
+одноименными .txt. Каждый процесс пула один раз загружает модель из папки на
+диске (файлы модели общие через кэш ОС) и распознает записи так же, как
+активный режим ассистента: грамматикой из слов команд, а при [unk] или
+команде с произвольным текстом - полным словарем модели. Текст разбирается
+как в handle_command и process_user_input (ключевое слово, затем
+IntentRouter), но обработчики команд не вызываются. Ожидаемое намерение -
+результат того же разбора для текста разметки.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter
+
+from main import (VoiceAssistant, SAMPLE_RATE, CHUNK_BYTES, MODELS_DIR, LANGUAGES, LANGUAGE, KEYWORDS,
+                  NUMBER_WORDS, EXTRA_COMMAND_WORDS, FREE_TEXT_COMMANDS, WAKE_MIN_CONFIDENCE)
+from audio_source import read_pcm
+from intents import IntentRouter
+from wake_word import WakeWordDetector
+from benchmarks.harness import load_corpus
+
+NO_COMMAND = '-'  # Фраза без команды: нет ключевого слова (в режиме ожидания) или слов после него
+UNKNOWN = 'unknown'  # Команда сказана, но не распознана («Не понял»), как в quant_commands_total
+
+_recognizers = None  # Распознаватели процесса пула: 'command' и 'open' на одной модели
+
+
+def command_router():
+    """Маршрутизатор только для разбора: обработчики не привязаны к ассистенту"""
+    return IntentRouter.from_handlers(VoiceAssistant, NUMBER_WORDS)
+
+
+def command_grammar(router):
+    """Грамматика активного режима, как у VoiceAssistant.command_vocabulary"""
+    words = set(KEYWORDS) | set(NUMBER_WORDS) | set(EXTRA_COMMAND_WORDS) | router.vocabulary()
+    return json.dumps(sorted(words) + ["[unk]"], ensure_ascii=False)
+
+
+def init_worker(model_path):
+    """Загружает модель и создает распознаватели один раз на процесс пула"""
+    global _recognizers
+    from vosk import Model, KaldiRecognizer, SetLogLevel
+    SetLogLevel(-1)
+    model = Model(model_path)
+    router = command_router()
+    _recognizers = {
+        'command': KaldiRecognizer(model, SAMPLE_RATE, command_grammar(router)),
+        'open': KaldiRecognizer(model, SAMPLE_RATE),
+        'router': router,
+    }
+    for name in ('command', 'open'):
+        _recognizers[name].SetWords(True)
+
+
+def decode(recognizer, pcm):
+    """Распознает запись чанками CHUNK_BYTES; результат с текстом и словами, как у redecode"""
+    results = []
+    for pos in range(0, len(pcm), CHUNK_BYTES):
+        if recognizer.AcceptWaveform(pcm[pos:pos + CHUNK_BYTES]):
+            results.append(json.loads(recognizer.Result()))
+    results.append(json.loads(recognizer.FinalResult()))
+    recognizer.Reset()
+    return {"text": " ".join(result.get("text", "") for result in results if result.get("text")),
+            "result": [word for result in results for word in result.get("result", [])]}
+
+
+def transcribe(task):
+    """Распознает одну запись в процессе пула: (номер, результат, словарь, секунды аудио, CPU)"""
+    index, path, open_vocabulary = task
+    started = time.process_time()
+    pcm = read_pcm(path, SAMPLE_RATE)
+    vocabulary = 'open'
+    if not open_vocabulary:
+        result = decode(_recognizers['command'], pcm)
+        vocabulary = 'command'
+    # Неизвестные слова или команда с произвольным текстом: полный словарь, как в finish_utterance
+    if open_vocabulary or "[unk]" in result["text"] \
+            or _recognizers['router'].match(result["text"]).name in FREE_TEXT_COMMANDS:
+        result = decode(_recognizers['open'], pcm)
+        vocabulary = 'open'
+    result["text"] = " ".join(result["text"].replace("[unk]", "").split())
+    return index, result, vocabulary, len(pcm) / 2 / SAMPLE_RATE, time.process_time() - started
+
+
+def interpret(result, detector, router, active):
+    """(команда, IntentMatch или None) для результата без выполнения команды
+
+    Повторяет handle_result, handle_command и process_user_input: команда -
+    слова после принятого ключевого слова, а в активном режиме (active) без
+    ключевого слова - весь текст.
+    """
+    text = result.get("text", "").strip().lower()
+    if not text:
+        return "", None
+    wake = detector.detect(result)
+    if wake is not None and wake.accepted:
+        command = wake.command
+    else:
+        command = text if active else ""
+    return command, router.match(command) if command else None
+
+
+def intent_name(match):
+    if match is None:
+        return NO_COMMAND
+    return match.name or UNKNOWN
+
+
+def format_summary(records, top):
+    """Строки сводки: по каждому ожидаемому намерению - сколько верно и с чем путается"""
+    expected = Counter(record['expected'] for record in records)
+    pairs = Counter((record['expected'], record['intent']) for record in records)
+    lines = [f"{'ожидалось':<16}{'записей':>9}{'верно':>8}{'точность':>10}  чаще всего вместо"]
+    for name, total in sorted(expected.items(), key=lambda item: (-item[1], item[0])):
+        correct = pairs[(name, name)]
+        confused = sorted(((count, got) for (want, got), count in pairs.items() if want == name and got != name),
+                          reverse=True)[:top]
+        lines.append(f"{name:<16}{total:>9}{correct:>8}{correct / total:>10.1%}  "
+                     + ", ".join(f"{got} ({count})" for count, got in confused))
+    return lines
+
+
+def write_records(path, records):
+    """Сохраняет результаты атомарно: прерванный прогон не оставит половину файла"""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+
+
+def evaluate():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', help="Манифест JSONL или папка с WAV")
+    parser.add_argument('--model', default=os.path.join(MODELS_DIR, LANGUAGES[LANGUAGE]),
+                        help="Путь к папке модели Vosk")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Процессов распознавания")
+    parser.add_argument('--out', default="batch_results.jsonl", help="Файл результатов JSONL")
+    parser.add_argument('--active', action='store_true',
+                        help="Записи сказаны в активном режиме: команда без ключевого слова")
+    parser.add_argument('--open', action='store_true', help="Сразу полный словарь модели, без грамматики команд")
+    parser.add_argument('--top', type=int, default=3, help="Сколько частых ошибок показать для намерения")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.model):
+        parser.error(f"модель не найдена: {args.model} (скачивается при первом запуске main.py)")
+    entries = load_corpus(args.corpus)
+    if not entries:
+        parser.error(f"в корпусе нет записей: {args.corpus}")
+    model_path = os.path.abspath(args.model)
+    workers = max(1, min(args.workers, len(entries)))
+    detector = WakeWordDetector(KEYWORDS, WAKE_MIN_CONFIDENCE)
+    router = command_router()
+
+    tasks = [(index, entry['audio'], args.open) for index, entry in enumerate(entries)]
+    records = [None] * len(entries)
+    started = time.perf_counter()
+    with multiprocessing.get_context('spawn').Pool(workers, initializer=init_worker,
+                                                   initargs=(model_path,)) as pool:
+        loaded = None  # Первый результат: модель в процессах загружена
+        for index, result, vocabulary, audio_seconds, cpu in pool.imap_unordered(transcribe, tasks):
+            loaded = loaded or time.perf_counter()
+            entry = entries[index]
+            command, match = interpret(result, detector, router, args.active)
+            label = {"text": entry.get('text', '').lower()}
+            records[index] = {
+                'audio': entry['audio'],
+                'text': label['text'],
+                'transcript': result['text'],
+                'command': command,
+                'intent': intent_name(match),
+                'expected': intent_name(interpret(label, detector, router, args.active)[1]),
+                'slots': {key: value for key, value in match.slots.items() if key != 'text'} if match else {},
+                'vocabulary': vocabulary,
+                'audio_seconds': round(audio_seconds, 3),
+                'decode_seconds': round(cpu, 3),
+            }
+    elapsed = time.perf_counter() - started
+    write_records(args.out, records)
+
+    cores = min(workers, os.cpu_count() or 1)
+    audio = sum(record['audio_seconds'] for record in records)
+    cpu = sum(record['decode_seconds'] for record in records)
+    correct = sum(record['intent'] == record['expected'] for record in records)
+    exact = sum(record['transcript'] == " ".join(record['text'].split()) for record in records)
+    print(f"Записей: {len(records)}, аудио {audio / 60:.1f} мин, результаты: {args.out}")
+    print(f"Намерение верно: {correct}/{len(records)} ({correct / len(records):.1%}), "
+          f"текст совпал с разметкой: {exact} ({exact / len(records):.1%}), "
+          f"полным словарем: {sum(record['vocabulary'] == 'open' for record in records)}")
+    print()
+    for line in format_summary(records, args.top):
+        print(line)
+    print()
+    print(f"Процессов: {workers}, ядер: {cores}, время {elapsed:.1f} с (первый результат через {loaded - started:.1f} с)")
+    print(f"Пропускная способность: {len(records) / elapsed / cores:.2f} файлов/с на ядро, "
+          f"{audio / elapsed:.1f} с аудио в секунду, CPU {cpu / audio * 1000:.0f} мс на секунду аудио")
+
+
+if __name__ == '__main__':
+    evaluate()
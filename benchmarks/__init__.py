@@ -0,0 +1 @@
+"""Замеры производительности конвейера ассистента (запуск: python -m benchmarks.<имя>)"""
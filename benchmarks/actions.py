@@ -0,0 +1,91 @@
+"""Простой распознавания из-за медленного действия команды: выполнение в потоке распознавания против пула действий
+
+    python -m benchmarks.actions corpus/manifest.jsonl --model models/vosk-model-small-ru-0.22 --slow 3
+
+Каждая распознанная команда запускает действие-заглушку, которое длится
+--slow секунд (холодный запуск программы, зависший браузер или COM).
+Аудио подается с темпом микрофона.
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from audio_source import FileSource
+from action_executor import ActionExecutor
+from main import SAMPLE_RATE, CHUNK_SIZE
+from metrics import Metrics
+from benchmarks.harness import StubAssistant, load_corpus, use_model, replay, percentile, format_ms
+
+
+class SlowActionAssistant(StubAssistant):
+    """Ассистент, у которого каждая команда выполняет действие длиной slow секунд"""
+    def __init__(self, audio_source, slow, inline, timeout, metrics):
+        self.slow = slow
+        self.inline = inline
+        self.reads = []  # time.perf_counter() каждого чанка, взятого потоком распознавания
+        self.completed = []  # Через сколько после команды действие сообщило результат, с
+        super().__init__(audio_source, metrics=metrics)
+        self.actions = ActionExecutor(timeout=timeout, metrics=metrics)
+
+    def observe_queue(self, buffer, end):
+        self.reads.append(time.perf_counter())
+        super().observe_queue(buffer, end)
+
+    def process_user_input(self, text):
+        started = time.perf_counter()
+        if self.inline:
+            time.sleep(self.slow)  # Как прежний Popen или browser.open в потоке распознавания
+            self.completed.append(time.perf_counter() - started)
+        else:
+            # Разные имена: действия разных команд не ждут друг друга, как запуск разных программ
+            self.run_action(f'slow{len(self.dispatches)}', lambda: time.sleep(self.slow),
+                            lambda _: self.completed.append(time.perf_counter() - started),
+                            "Не удалось")
+        super().process_user_input(text)
+
+
+def measure(entries, slow, inline, timeout, gap):
+    source = FileSource([e['audio'] for e in entries], SAMPLE_RATE, CHUNK_SIZE, realtime=True, gap=gap)
+    metrics = Metrics()
+    with contextlib.redirect_stdout(io.StringIO()):
+        assistant = SlowActionAssistant(source, slow, inline, timeout, metrics)
+        replay(assistant)
+        # Ждем действия, поставленные последними командами
+        deadline = time.monotonic() + slow + timeout
+        while len(assistant.completed) < len(assistant.dispatches) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assistant.actions.stop()
+    stalls = [b - a for a, b in zip(assistant.reads, assistant.reads[1:])]
+    failures = sum(sample['value'] for sample in metrics.snapshot().get('quant_action_failures_total', []))
+    return {
+        'commands': len(assistant.dispatches),
+        'stall': max(stalls, default=0.0),
+        'stall_p99': percentile(stalls, 99),
+        'dropped': assistant.frames_dropped / SAMPLE_RATE,
+        'completed': assistant.completed,
+        'failures': failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', help="Манифест JSONL или папка с WAV")
+    parser.add_argument('--model', help="Путь к папке модели Vosk")
+    parser.add_argument('--slow', type=float, default=3.0, help="Длительность действия, с")
+    parser.add_argument('--timeout', type=float, default=10.0, help="Таймаут действия в пуле, с")
+    parser.add_argument('--gap', type=float, default=1.0, help="Тишина после каждой фразы, с")
+    args = parser.parse_args()
+
+    use_model(args.model)
+    entries = load_corpus(args.corpus)
+
+    print(f"{'действие':<22}{'команд':>8}{'простой max':>13}{'p99':>10}{'потеряно':>11}{'результат p50':>15}{'ошибок':>8}")
+    for title, inline in (("в распознавании", True), ("в пуле действий", False)):
+        stats = measure(entries, args.slow, inline, args.timeout, args.gap)
+        print(f"{title:<22}{stats['commands']:>8}{format_ms(stats['stall']):>13}{format_ms(stats['stall_p99']):>10}"
+              f"{stats['dropped']:>9.1f} с{format_ms(percentile(stats['completed'], 50)):>15}{stats['failures']:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Размер кадра захвата и чанка распознавателя: задержка команды, CPU и число вызовов
+
+    python -m benchmarks.chunk_size corpus/manifest.jsonl --model models/vosk-model-small-ru-0.22 --configs 250:250,20:100,10:50
+
+Каждая конфигурация - пара «кадр:чанк» в миллисекундах. Кадр - сколько
+аудио источник выдает за раз (FRAME_MS для микрофона, 250 мс - прежнее
+блокирующее чтение), чанк - сколько отдается распознавателю за вызов
+(CHUNK_SIZE). Аудио подается с темпом реального времени, как с микрофона.
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import main as app
+from audio_source import FileSource
+from metrics import Metrics
+from benchmarks.harness import (StubAssistant, load_corpus, use_model, replay,
+                                utterance_index, percentile, format_ms)
+
+
+def parse_configs(text):
+    """'20:100,10:50' -> [(20, 100), (10, 50)]"""
+    configs = []
+    for item in text.split(','):
+        frame, _, chunk = item.partition(':')
+        configs.append((int(frame), int(chunk or frame)))
+    return configs
+
+
+def measure(entries, frame_ms, chunk_ms, gap):
+    """Прогоняет корпус с кадром frame_ms и чанком chunk_ms"""
+    chunk_size = app.SAMPLE_RATE * chunk_ms // 1000
+    saved = app.CHUNK_SIZE, app.CHUNK_BYTES
+    app.CHUNK_SIZE, app.CHUNK_BYTES = chunk_size, chunk_size * 2
+    try:
+        source = FileSource([e['audio'] for e in entries], app.SAMPLE_RATE, app.SAMPLE_RATE * frame_ms // 1000,
+                            realtime=True, gap=gap)
+        metrics = Metrics()
+        with contextlib.redirect_stdout(io.StringIO()):
+            assistant = StubAssistant(source, metrics=metrics)
+            started = time.process_time()
+            replay(assistant)
+            cpu = time.process_time() - started
+    finally:
+        app.CHUNK_SIZE, app.CHUNK_BYTES = saved
+
+    latencies = {}
+    for dispatched_at, position, command in assistant.dispatches:
+        index = utterance_index(source, position)
+        if index >= 0 and index not in latencies:
+            latencies[index] = dispatched_at - source.end_times[index]
+    calls = sum(sample['count'] for sample in metrics.snapshot().get('quant_accept_waveform_seconds', []))
+    return {
+        'latencies': list(latencies.values()),
+        'cpu': cpu / (source.duration or 1),
+        'calls': calls / (source.duration or 1),
+        'frames': source.bytes_read / 2 / source.chunk_size / (source.duration or 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', help="Манифест JSONL или папка с WAV")
+    parser.add_argument('--model', help="Путь к папке модели Vosk")
+    parser.add_argument('--configs', default="250:250,20:50,20:100,10:100",
+                        help="Пары кадр:чанк в мс через запятую")
+    parser.add_argument('--gap', type=float, default=1.0, help="Тишина после каждой фразы, с")
+    args = parser.parse_args()
+
+    use_model(args.model)
+    entries = load_corpus(args.corpus)
+
+    print(f"{'кадр:чанк':<12}{'команд':>8}{'p50':>10}{'p95':>10}{'CPU/с аудио':>14}{'кадров/с':>10}{'вызовов/с':>11}")
+    for frame_ms, chunk_ms in parse_configs(args.configs):
+        stats = measure(entries, frame_ms, chunk_ms, args.gap)
+        latencies = stats['latencies']
+        print(f"{f'{frame_ms}:{chunk_ms}':<12}{len(latencies):>8}"
+              f"{format_ms(percentile(latencies, 50)):>10}{format_ms(percentile(latencies, 95)):>10}"
+              f"{stats['cpu'] * 1000:>11.1f} мс{stats['frames']:>10.0f}{stats['calls']:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
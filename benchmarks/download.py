@@ -0,0 +1,147 @@
+"""Загрузка модели с локального HTTP-сервера: скорость, распаковка на лету и докачка после обрыва
+
+    python -m benchmarks.download --size-mb 50
+"""
+import argparse
+import http.server
+import io
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+
+from model_download import install_model
+
+NAME = "vosk-model-test"
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    """Отдает один архив с поддержкой Range; может оборвать соединение на заданном байте"""
+    def do_GET(self):
+        server = self.server
+        data = server.archive
+        start = 0
+        status = 200
+        header = self.headers.get('Range')
+        if header and header.startswith('bytes=') and server.ranges:
+            start = int(header[6:].split('-')[0])
+            if start >= len(data):
+                self.send_response(416)
+                self.end_headers()
+                return
+            status = 206
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(data) - start))
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{len(data) - 1}/{len(data)}')
+        self.end_headers()
+
+        end = len(data)
+        if server.cuts:
+            end = min(end, server.cuts.pop(0))  # Обрыв связи посреди ответа
+        view = memoryview(data)
+        for pos in range(start, end, 64 * 1024):
+            chunk = view[pos:min(pos + 64 * 1024, end)]
+            self.wfile.write(chunk)
+            server.bytes_sent += len(chunk)
+        if end < len(data):
+            self.close_connection = True
+            self.connection.shutdown(2)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(archive, ranges=True):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    server.archive = archive
+    server.ranges = ranges
+    server.cuts = []
+    server.bytes_sent = 0
+    server.handle_error = lambda request, address: None  # Обрывы соединения ожидаемы
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_archive(size_mb):
+    """Архив, похожий на модель: несжимаемые веса и сжимаемые текстовые файлы"""
+    rng = random.Random(0)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(f"{NAME}/", b"")
+        weights = int(size_mb * 0.8 * 1024 * 1024)
+        zf.writestr(f"{NAME}/am/final.mdl", rng.randbytes(weights))
+        words = "\n".join(f"слово{i} {i}" for i in range(int(size_mb * 12000)))
+        zf.writestr(f"{NAME}/graph/words.txt", words.encode('utf-8'))
+        zf.writestr(f"{NAME}/conf/model.conf", b"--sample-frequency=16000\n")
+    return buffer.getvalue()
+
+
+def legacy_install(url, models_dir):
+    """Прежняя схема: чанки по 1 КБ, без докачки, затем распаковка вторым проходом"""
+    import requests
+    zip_path = os.path.join(models_dir, "temp_model.zip")
+    while True:
+        try:
+            response = requests.get(url, stream=True)
+            with open(zip_path, 'wb') as f:
+                for data in response.iter_content(chunk_size=1024):
+                    f.write(data)
+            break
+        except requests.RequestException:
+            continue  # Следующий запуск начинает загрузку с нуля
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for file in zip_ref.namelist():
+            zip_ref.extract(file, models_dir)
+    os.remove(zip_path)
+
+
+def run(archive, install, cut=None):
+    """Устанавливает модель с локального сервера; возвращает время и байты, отданные сервером"""
+    server = start_server(archive)
+    if cut is not None:
+        server.cuts.append(cut)
+    models_dir = tempfile.mkdtemp(prefix="models-")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/{NAME}.zip"
+        started = time.perf_counter()
+        install(url, models_dir)
+        elapsed = time.perf_counter() - started
+        assert os.path.exists(os.path.join(models_dir, NAME, "am", "final.mdl"))
+    finally:
+        server.shutdown()
+        shutil.rmtree(models_dir, ignore_errors=True)
+    return elapsed, server.bytes_sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=50, help="Размер тестового архива, МБ")
+    parser.add_argument('--cut', type=float, default=0.6, help="На какой доле архива оборвать первую загрузку")
+    args = parser.parse_args()
+
+    archive = make_archive(args.size_mb)
+    size = len(archive)
+    import hashlib
+    sha256 = hashlib.sha256(archive).hexdigest()
+    print(f"Архив: {size / 2 ** 20:.1f} МБ")
+
+    variants = [
+        ("Прежняя", lambda url, d: legacy_install(url, d)),
+        ("Докачка", lambda url, d: install_model(url, d, NAME, sha256, stream_extract=False)),
+        ("Распаковка на лету", lambda url, d: install_model(url, d, NAME, sha256, stream_extract=True)),
+    ]
+    cut = int(size * args.cut)
+    print(f"{'схема':<20}{'до установки':>14}{'МБ/с':>8}{'с обрывом':>12}{'скачано повторно':>18}")
+    for title, install in variants:
+        elapsed, _ = run(archive, install)
+        _, sent = run(archive, install, cut=cut)
+        print(f"{title:<20}{elapsed:>12.2f} с{size / 2 ** 20 / elapsed:>8.0f}"
+              f"{sent / 2 ** 20:>9.1f} МБ{(sent - size) / 2 ** 20:>15.1f} МБ")
+
+
+if __name__ == '__main__':
+    main()
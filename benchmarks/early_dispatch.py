@@ -0,0 +1,58 @@
+"""Выигрыш досрочного вызова команд по промежуточным результатам, по командам
+
+    python -m benchmarks.early_dispatch corpus/manifest.jsonl --model models/vosk-model-small-ru-0.22
+
+Заодно проверяется, что досрочная команда не оставляет следов: фраза после
+нее не должна активировать ассистента без ключевого слова (лишние активации
+по сравнению с обычным прогоном - ошибка, код возврата 1).
+"""
+import argparse
+import sys
+from collections import Counter, defaultdict
+
+from benchmarks.harness import load_corpus, use_model, percentile, format_ms
+from benchmarks.latency import measure
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', help="Манифест JSONL или папка с WAV")
+    parser.add_argument('--model', help="Путь к папке модели Vosk")
+    parser.add_argument('--fast', action='store_true', help="Подавать аудио быстрее реального времени")
+    parser.add_argument('--gap', type=float, default=1.5, help="Тишина после каждой фразы, с")
+    args = parser.parse_args()
+
+    use_model(args.model)
+    entries = load_corpus(args.corpus)
+    baseline_stats = measure(entries, realtime=not args.fast, gap=args.gap, early=False)
+    early_stats = measure(entries, realtime=not args.fast, gap=args.gap, early=True)
+    baseline, early = baseline_stats['results'], early_stats['results']
+
+    # Сравниваем одни и те же фразы, вызванные в обоих прогонах
+    saved = defaultdict(list)
+    mismatched = 0
+    for before, after in zip(baseline, early):
+        if before['latency'] is None or after['latency'] is None:
+            continue
+        if before['intent'] != after['intent']:
+            mismatched += 1
+        saved[before['intent']].append(before['latency'] - after['latency'])
+
+    print(f"{'Команда':<18}{'фраз':>6}{'p50 выигрыш':>14}{'p95 выигрыш':>14}")
+    for intent, values in sorted(saved.items()):
+        print(f"{intent:<18}{len(values):>6}{format_ms(percentile(values, 50)):>14}"
+              f"{format_ms(percentile(values, 95)):>14}")
+    if mismatched:
+        print(f"Команда отличается от итогового результата в {mismatched} фразах")
+
+    # Активации по фразам: с досрочным вызовом их не должно быть больше, чем без него
+    expected = Counter(baseline_stats['activations'])
+    extra = sum((Counter(early_stats['activations']) - expected).values())
+    print(f"Активаций: {len(baseline_stats['activations'])} без досрочного вызова, "
+          f"{len(early_stats['activations'])} с ним, лишних: {extra}")
+    if extra:
+        sys.exit("Досрочная команда повлекла активацию без ключевого слова")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Время, которое поток распознавания тратит на вывод журнала: прежний print_with_time против EventLog
+
+    python -m benchmarks.event_log --messages 200 --delay 5
+"""
+import argparse
+import contextlib
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from event_log import EventLog
+from benchmarks.harness import percentile
+
+
+class SlowConsole:
+    """Консоль, которая принимает строку за delay секунд (медленный терминал или заполненный канал)"""
+    def __init__(self, delay):
+        self.delay = delay
+        self.lines = 0
+
+    def write(self, text):
+        time.sleep(self.delay)
+        self.lines += text.count("\n")
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def print_with_time(message, color=None):
+    """Прежний вывод: форматирование и print в вызывающем потоке"""
+    current_time = datetime.now().strftime("%H:%M:%S")
+    colored_message = f"[{current_time}] {message}"
+    if color == "green":
+        colored_message = f"\033[32m{colored_message}\033[0m"
+    elif color == "bold_green":
+        colored_message = f"\033[1;32m{colored_message}\033[0m"
+    print(colored_message)
+
+
+def measure(log, messages, interval):
+    """Поток «распознавания» пишет messages событий раз в interval секунд; время каждого вызова"""
+    times = []
+
+    def recognition():
+        for index in range(messages):
+            started = time.perf_counter()
+            log(f"Распознано: квант который час {index}")
+            times.append(time.perf_counter() - started)
+            time.sleep(interval)
+    thread = threading.Thread(target=recognition, name="recognition")
+    thread.start()
+    thread.join()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200, help="Сколько событий записать")
+    parser.add_argument('--delay', type=float, default=5.0, help="Сколько консоль принимает одну строку, мс")
+    parser.add_argument('--interval', type=float, default=1.0, help="Пауза между событиями, мс")
+    args = parser.parse_args()
+
+    results = []
+    console = SlowConsole(args.delay / 1000)
+    with contextlib.redirect_stdout(console):
+        results.append(("print_with_time", measure(print_with_time, args.messages, args.interval / 1000), None))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "events.jsonl")
+        # Маленький размер файла, чтобы замер прошел и через переименование журналов
+        log = EventLog(path, max_bytes=8 * 1024, backups=2)
+        console = SlowConsole(args.delay / 1000)
+        with contextlib.redirect_stdout(console):
+            times = measure(log.write, args.messages, args.interval / 1000)
+            started = time.perf_counter()
+            log.flush()
+            drained = time.perf_counter() - started
+        log.close()
+        files = sorted(name for name in os.listdir(directory))
+        results.append(("EventLog", times, (drained, log.written, log.dropped, files)))
+
+    print(f"{'вывод':<18}{'p50':>10}{'p99':>10}{'max':>10}{'всего':>10}")
+    for title, times, _ in results:
+        print(f"{title:<18}" + "".join(f"{percentile(times, p) * 1e6:>6.0f} мкс" for p in (50, 99, 100))
+              + f"{sum(times) * 1000:>7.0f} мс")
+    drained, written, dropped, files = results[-1][2]
+    print(f"Журнал досписал очередь за {drained * 1000:.0f} мс после последнего события: "
+          f"выведено {written}, отброшено {dropped}, файлы: {', '.join(files)}")
+
+
+if __name__ == '__main__':
+    main()
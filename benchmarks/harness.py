@@ -0,0 +1,154 @@
+"""Общие средства для замеров: корпус записей и ассистент с заглушками"""
+import bisect
+import json
+import math
+import os
+import threading
+import time
+
+import main
+from main import VoiceAssistant
+from speech import SpeechOutput, NullBackend, PRIORITY_NORMAL
+from event_log import EVENT_LOG
+
+
+def load_corpus(path):
+    """Загружает размеченный корпус
+
+    path - либо манифест JSONL со строками {"audio": "...", "text": "..."},
+    либо папка с WAV-файлами (разметка берется из одноименных .txt).
+    """
+    entries = []
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if not name.lower().endswith(('.wav', '.pcm', '.raw')):
+                continue
+            audio = os.path.join(path, name)
+            label_path = os.path.splitext(audio)[0] + '.txt'
+            text = ''
+            if os.path.exists(label_path):
+                with open(label_path, encoding='utf-8') as f:
+                    text = f.read().strip().lower()
+            entries.append({'audio': audio, 'text': text})
+        return entries
+
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            entry['audio'] = os.path.join(base, entry['audio'])
+            entries.append(entry)
+    return entries
+
+
+def use_model(model_path):
+    """Указывает ассистенту путь к уже скачанной модели"""
+    if model_path:
+        model_path = os.path.abspath(model_path)
+        main.MODELS_DIR, main.MODEL_NAME = os.path.split(model_path)
+        main.LANGUAGES = dict(main.LANGUAGES, **{main.LANGUAGE: main.MODEL_NAME})
+
+
+def percentile(values, p):
+    """Перцентиль по методу ближайшего ранга"""
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def format_ms(seconds):
+    return f"{seconds * 1000:.0f} мс"
+
+
+class StubBrowser:
+    """Браузер-заглушка: только запоминает адреса"""
+    def __init__(self):
+        self.opened = []
+
+    def open(self, url):
+        self.opened.append(url)
+        return True
+
+
+class StubVolumeController:
+    """Громкость-заглушка без Windows API"""
+    def __init__(self):
+        self.level = 50
+
+    def get_volume(self):
+        return self.level
+
+    def set_volume(self, percent):
+        self.level = max(0, min(100, percent))
+        return self.level
+
+
+class StubAssistant(VoiceAssistant):
+    """Ассистент с заглушками речи и действий для замеров без Windows"""
+    def __init__(self, audio_source, pool=None, metrics=None):
+        self.spoken = []  # (time.monotonic(), текст)
+        self.dispatches = []  # (time.monotonic(), позиция в потоке, команда)
+        self.wakes = []  # Позиции в потоке, где сработало ключевое слово
+        self.activations = []  # Позиции в потоке, где ассистент перешел в активный режим
+        super().__init__(audio_source, pool=pool, metrics=metrics)
+        self.browser = StubBrowser()
+
+    def init_voice_engine(self):
+        self.speech = SpeechOutput(NullBackend())
+        self.speech.start()
+
+    def init_volume_controller(self):
+        self.volume_controller = StubVolumeController()
+
+    def speak(self, text, interrupt=False, priority=PRIORITY_NORMAL, chime=False, started=None):
+        self.spoken.append((time.monotonic(), text))
+
+    def open_program(self, program_name):
+        return True
+
+    def restart(self, reload_config=False):
+        pass
+
+    def get_system_status(self):
+        return "Диски: C: 50%"
+
+    def activate(self):
+        if not self.is_active:
+            self.activations.append(self.stream_position)
+        super().activate()
+
+    def handle_command(self, text, wake=None):
+        if wake is not None:
+            self.wakes.append(self.stream_position)
+        super().handle_command(text, wake)
+
+    def process_user_input(self, text):
+        self.dispatches.append((time.monotonic(), self.stream_position, text))
+        super().process_user_input(text)
+
+
+def utterance_index(source, position):
+    """Индекс последней записи, закончившейся до позиции position в потоке"""
+    return bisect.bisect_right(source.utterance_ends, position) - 1
+
+
+def replay(assistant):
+    """Прогоняет источник ассистента до конца и возвращает время в секундах"""
+    capture = threading.Thread(target=assistant.audio_capture, name="capture")
+    process = threading.Thread(target=assistant.process_audio, name="recognition")
+    started = time.perf_counter()
+    capture.start()
+    process.start()
+
+    # Захват закрывает буфер в конце записи, распознавание дочитывает остаток и выходит
+    capture.join()
+    process.join()
+    elapsed = time.perf_counter() - started
+    assistant.stop()
+    EVENT_LOG.flush()  # Журнал прогона выводится до таблицы результатов
+    return elapsed
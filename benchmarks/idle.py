@@ -0,0 +1,95 @@
+"""Пробуждения потоков ассистента в простое: события против опроса каждые 0.1 с
+
+    python -m benchmarks.idle --seconds 10
+"""
+import argparse
+import os
+import threading
+import time
+
+from audio_source import FileSource
+from main import SAMPLE_RATE, CHUNK_SIZE
+from benchmarks.harness import StubAssistant, use_model
+
+
+class PollingAssistant(StubAssistant):
+    """Прежняя схема: основной цикл и распознавание просыпаются по таймауту 0.1 с"""
+    def __init__(self, audio_source):
+        super().__init__(audio_source)
+        peek = self.audio_buffer.peek
+
+        def polling_peek(max_bytes, min_bytes=1, timeout=None):
+            return peek(max_bytes, min_bytes, timeout=0.1)
+        self.audio_buffer.peek = polling_peek
+
+    def wait_for_deadline(self):
+        time.sleep(0.1)
+        self.loop_wakeups += 1
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.deadline = None
+            return self.is_active
+        return False
+
+
+def context_switches():
+    """Добровольные переключения контекста всех потоков процесса (только Linux)"""
+    total = 0
+    try:
+        tasks = os.listdir('/proc/self/task')
+    except OSError:
+        return None
+    for task in tasks:
+        try:
+            with open(f'/proc/self/task/{task}/status') as f:
+                for line in f:
+                    if line.startswith('voluntary_ctxt_switches'):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return total
+
+
+def measure(assistant_class, seconds):
+    """Держит ассистента в режиме ожидания на тишине и считает пробуждения"""
+    # Тишина с темпом микрофона: VAD закрыт, распознаватель простаивает
+    source = FileSource([bytes(CHUNK_SIZE * 2)], SAMPLE_RATE, CHUNK_SIZE, realtime=True, loop=True)
+    assistant = assistant_class(source)
+    runner = threading.Thread(target=assistant.run)
+    runner.start()
+    time.sleep(1.0)  # Пропускаем запуск потоков
+
+    loop_before = assistant.loop_wakeups
+    buffer_before = assistant.audio_buffer.wakeups
+    switches_before = context_switches()
+    time.sleep(seconds)
+    loop = (assistant.loop_wakeups - loop_before) / seconds
+    buffer = (assistant.audio_buffer.wakeups - buffer_before) / seconds
+    switches = context_switches()
+    if switches is not None:
+        switches = (switches - switches_before) / seconds
+
+    stop_started = time.perf_counter()
+    assistant.stop()
+    runner.join()
+    return loop, buffer, switches, time.perf_counter() - stop_started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', help="Путь к папке модели Vosk")
+    parser.add_argument('--seconds', type=float, default=10.0, help="Длительность замера простоя, с")
+    args = parser.parse_args()
+
+    use_model(args.model)
+    rows = []
+    for title, assistant_class in (("Опрос 0.1 с", PollingAssistant), ("События", StubAssistant)):
+        rows.append((title,) + measure(assistant_class, args.seconds))
+
+    print(f"\n{'схема':<14}{'осн. цикл/с':>13}{'распознавание/с':>17}{'переключений/с':>16}{'остановка':>12}")
+    for title, loop, buffer, switches, shutdown in rows:
+        switches = f"{switches:.1f}" if switches is not None else "-"
+        print(f"{title:<14}{loop:>13.1f}{buffer:>17.1f}{switches:>16}{shutdown * 1000:>10.0f} мс")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Маршрутизатор команд против прежней цепочки if/elif: фраз в секунду
+
+    python -m benchmarks.intents --repeat 20000 --extra 200
+
+--extra добавляет маршрутизатору столько вымышленных команд с тремя
+триггерами каждая: скорость разбора не должна падать с числом команд.
+"""
+import argparse
+import random
+import re
+import time
+from datetime import datetime
+
+from intents import IntentRouter
+from main import VoiceAssistant, NUMBER_WORDS
+
+UTTERANCES = [
+    "который час", "поставь громкость на пятьдесят", "громкость", "засеки пять минут",
+    "поставь таймер на 30 секунд", "найди рецепт борща", "открой телеграм", "нейросеть",
+    "загрузка системы", "привет", "какая погода", "спасибо", "что ты умеешь", "абракадабра",
+]
+
+# Прежние шаблоны в порядке проверки цепочки if/elif
+LEGACY_PATTERNS = [
+    ('volume_set', re.compile(r'(громкость на|установи громкость|поставь громкость|громкость)')),
+    ('timer', re.compile(r'(таймер|засеки|засечь|поставь таймер)')),
+    ('search', re.compile(r'(поиск|найди|найти)')),
+    ('open_paint', re.compile(r'(paint|рисовать)')),
+    ('open_telegram', re.compile(r'(telegram|телеграм|телега)')),
+    ('open_yandex', re.compile(r'(яндекс|браузер)')),
+    ('deepseek_search', re.compile(r'(нейронка|нейросеть)')),
+    ('system_status', re.compile(r'(состояние системы|загрузка системы|диск|диски)')),
+    ('greeting', re.compile(r'(привет|здравствуй|добрый день)')),
+    ('time', re.compile(r'(время|час|который час|сколько времени)')),
+    ('weather', re.compile(r'(погода|погоду|прогноз погоды)')),
+    ('thanks', re.compile(r'(спасибо|благодарю|пасиб|спс)')),
+    ('restart', re.compile(r'(перезапуск|перезагрузись|обновись|рестарт)')),
+    ('help', re.compile(r'(помощь|помоги|что ты умеешь|команды|возможности)')),
+]
+
+
+def legacy_match(text, number_words):
+    """Прежний разбор: словарь ответов на каждый вызов и поиск шаблонов по очереди"""
+    responses = {
+        'greeting': ["Приветствую!", "Здравствуйте!", "Привет!"],
+        'time': [datetime.now().strftime('%H:%M')],
+        'weather': ["Посмотрите погоду в приложении", "Не могу узнать погоду, проверьте сами",
+                    "Погоду лучше уточнить в интернете"],
+        'thanks': ["Всегда пожалуйста!", "Не за что!", "Рад помочь!"],
+        'help': ["Команды: время, погода, перезагрузка.", "Просто скажите 'квант'"],
+        'volume_set': ["{}"], 'search': ["Ищу информацию в интернете"],
+        'open_paint': ["Открываю Paint"], 'open_telegram': ["Открываю Telegram"],
+        'open_yandex': ["Открываю Яндекс Браузер"], 'deepseek_search': ["Открываю DeepSeek в браузере"],
+        'system_status': ["{}"], 'timer': ["Таймер {}"], 'restart': ["Выполняю перезапуск"],
+        'default': ["Не понял", "Повторите, пожалуйста"],
+    }
+    for name, pattern in LEGACY_PATTERNS:
+        if pattern.search(text):
+            if name in ('volume_set', 'timer'):
+                numbers = re.findall(r'\d+', text)
+                if not numbers:
+                    next((number_words[w] for w in text.split() if w in number_words), None)
+                re.search(r'(\d+)\s*(минут[а-я]*|секунд[а-я]*)', text)
+            elif name == 'search':
+                re.sub(r'(поиск|найди|найти)\s*', '', text)
+            return name, responses
+    return 'default', responses
+
+
+def throughput(func, utterances):
+    started = time.perf_counter()
+    for text in utterances:
+        func(text)
+    return len(utterances) / (time.perf_counter() - started)
+
+
+def with_extra_intents(count):
+    """Маршрутизатор с count дополнительными командами, триггеры которых не встречаются в фразах"""
+    router = IntentRouter.from_handlers(VoiceAssistant, NUMBER_WORDS)
+    for index in range(count):
+        router.register(f"extra{index}", [f"команда{index}", f"сделай номер{index}", f"запусти задачу{index}"],
+                        index % 100, None)
+    router.compile()
+    return router
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20000, help="Сколько раз прогнать набор фраз")
+    parser.add_argument('--extra', type=int, default=200, help="Сколько вымышленных команд добавить")
+    args = parser.parse_args()
+
+    router = IntentRouter.from_handlers(VoiceAssistant, NUMBER_WORDS)
+    utterances = UTTERANCES * args.repeat
+    random.Random(0).shuffle(utterances)
+
+    legacy = throughput(lambda text: legacy_match(text, NUMBER_WORDS), utterances)
+    compiled = throughput(router.match, utterances)
+    print(f"Цепочка if/elif: {legacy:,.0f} фраз/с")
+    print(f"Маршрутизатор:   {compiled:,.0f} фраз/с (x{compiled / legacy:.1f})")
+    if args.extra:
+        extended = throughput(with_extra_intents(args.extra).match, utterances)
+        print(f"Еще {args.extra} команд: {extended:,.0f} фраз/с (x{extended / compiled:.2f} к маршрутизатору)")
+
+    print("\nРазбор тестовых фраз:")
+    for text in UTTERANCES:
+        match = router.match(text)
+        print(f"  {text!r:36} -> {match.name or 'default':16} "
+              f"число={match.slots['number']} единица={match.slots['unit']}")
+
+
+if __name__ == '__main__':
+    main()
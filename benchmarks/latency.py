@@ -0,0 +1,80 @@
+"""Сквозная задержка: от конца речи до вызова команды на размеченном корпусе
+
+    python -m benchmarks.latency corpus/manifest.jsonl --model models/vosk-model-small-ru-0.22
+"""
+import argparse
+import json
+import time
+
+from audio_source import FileSource
+from main import SAMPLE_RATE, CHUNK_SIZE
+from benchmarks.harness import (StubAssistant, load_corpus, use_model, replay,
+                                utterance_index, percentile, format_ms)
+
+
+def measure(entries, realtime=False, gap=1.0, early=False):
+    """Прогоняет корпус через конвейер и возвращает результаты по фразам"""
+    source = FileSource([e['audio'] for e in entries], SAMPLE_RATE, CHUNK_SIZE,
+                        realtime=realtime, gap=gap)
+    assistant = StubAssistant(source)
+    assistant.early_dispatch = early
+
+    cpu_started = time.process_time()
+    elapsed = replay(assistant)
+    cpu = time.process_time() - cpu_started
+
+    # Каждый вызов команды относим к последней записи, закончившейся до этой позиции
+    results = [{'audio': e['audio'], 'text': e.get('text', ''), 'command': None,
+                'intent': None, 'latency': None} for e in entries]
+    for dispatched_at, position, command in assistant.dispatches:
+        index = utterance_index(source, position)
+        if index < 0 or results[index]['command'] is not None:
+            continue
+        results[index]['command'] = command
+        results[index]['intent'] = assistant.router.match(command).name or 'default'
+        results[index]['latency'] = dispatched_at - source.end_times[index]
+
+    return {
+        'results': results,
+        'audio_seconds': source.duration,
+        'elapsed': elapsed,
+        'cpu': cpu,
+        'frames_dropped': assistant.frames_dropped,
+        'activations': [utterance_index(source, position) for position in assistant.activations],
+    }
+
+
+def report(stats):
+    latencies = [r['latency'] for r in stats['results'] if r['latency'] is not None]
+    audio = stats['audio_seconds'] or 1
+    print(f"Фраз: {len(stats['results'])}, вызвано команд: {len(latencies)}")
+    for p in (50, 95, 99):
+        print(f"  p{p}: {format_ms(percentile(latencies, p))}")
+    print(f"Аудио: {stats['audio_seconds']:.1f} с, обработка: {stats['elapsed']:.1f} с")
+    print(f"RTF (время): {stats['elapsed'] / audio:.3f}, RTF (CPU): {stats['cpu'] / audio:.3f}")
+    print(f"Потеряно сэмплов: {stats['frames_dropped']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', help="Манифест JSONL или папка с WAV")
+    parser.add_argument('--model', help="Путь к папке модели Vosk")
+    parser.add_argument('--realtime', action='store_true', help="Подавать аудио в реальном времени")
+    parser.add_argument('--gap', type=float, default=1.0, help="Тишина после каждой фразы, с")
+    parser.add_argument('--early', action='store_true', help="Досрочный вызов по промежуточным результатам")
+    parser.add_argument('--out', help="Сохранить результаты по фразам в JSONL")
+    args = parser.parse_args()
+
+    use_model(args.model)
+    stats = measure(load_corpus(args.corpus), realtime=args.realtime, gap=args.gap,
+                    early=args.early)
+    report(stats)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            for r in stats['results']:
+                f.write(json.dumps(r, ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Метрики конвейера: их стоимость и задержки этапов на корпусе
+
+    python -m benchmarks.metrics corpus/manifest.jsonl --model models/vosk-model-small-ru-0.22 --repeat 3
+"""
+import argparse
+import contextlib
+import io
+import time
+import timeit
+
+from audio_source import FileSource
+from metrics import Metrics, Histogram, Counter, NULL_METRIC
+from main import SAMPLE_RATE, CHUNK_SIZE
+from benchmarks.harness import StubAssistant, load_corpus, use_model, replay
+
+# Гистограммы этапов в порядке прохождения чанка
+STAGES = [
+    ('quant_capture_enqueue_seconds', "захват -> буфер"),
+    ('quant_queue_wait_seconds', "ожидание в буфере"),
+    ('quant_accept_waveform_seconds', "AcceptWaveform"),
+    ('quant_result_dispatch_seconds', "результат -> команда"),
+]
+
+
+def format_us(seconds):
+    """Этапы бывают короче миллисекунды - выводим в микросекундах"""
+    return "-" if seconds is None else f"{seconds * 1e6:.0f} мкс"
+
+
+def call_cost(method, number=200000):
+    """Время одного вызова, с (лучшее из трех повторов)"""
+    return min(timeit.repeat(lambda: method(0.003), number=number, repeat=3)) / number
+
+
+def run(entries, metrics, gap):
+    """Прогоняет корпус без пауз; возвращает CPU процесса на секунду аудио"""
+    source = FileSource([e['audio'] for e in entries], SAMPLE_RATE, CHUNK_SIZE, gap=gap)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assistant = StubAssistant(source, metrics=metrics)
+        started = time.process_time()
+        replay(assistant)
+        cpu = time.process_time() - started
+    return cpu / (source.bytes_read / 2 / SAMPLE_RATE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', help="Манифест JSONL или папка с WAV")
+    parser.add_argument('--model', help="Путь к папке модели Vosk")
+    parser.add_argument('--gap', type=float, default=1.0, help="Тишина после каждой записи, с")
+    parser.add_argument('--repeat', type=int, default=3, help="Сколько раз прогонять корпус в каждом режиме")
+    args = parser.parse_args()
+
+    use_model(args.model)
+    entries = load_corpus(args.corpus)
+
+    histogram, counter = Histogram(), Counter()
+    print(f"Наблюдение гистограммы: {call_cost(histogram.observe) * 1e9:.0f} нс, "
+          f"счетчика: {call_cost(counter.inc) * 1e9:.0f} нс, "
+          f"выключенной метрики: {call_cost(NULL_METRIC.observe) * 1e9:.0f} нс")
+
+    # Режимы чередуются, чтобы прогрев и фоновая нагрузка доставались обоим
+    enabled = Metrics()
+    costs = {True: [], False: []}
+    for _ in range(args.repeat):
+        costs[True].append(run(entries, enabled, args.gap))
+        costs[False].append(run(entries, Metrics(enabled=False), args.gap))
+    on, off = min(costs[True]), min(costs[False])
+    print(f"CPU на секунду аудио: с метриками {format_us(on)}, без {format_us(off)}, "
+          f"разница {format_us(on - off)} ({(on - off) / off if off else 0.0:+.1%})")
+
+    snapshot = enabled.snapshot()
+    print(f"{'этап':<24}{'замеров':>9}{'p50':>12}{'p95':>12}{'p99':>12}")
+    for name, title in STAGES:
+        for sample in snapshot.get(name, []):
+            label = " ".join(sample['labels'].values())
+            if not sample['count']:
+                continue
+            print(f"{(title + ' ' + label).strip():<24}{sample['count']:>9}"
+                  + "".join(f"{format_us(sample[p]):>12}" for p in ('p50', 'p95', 'p99')))
+    for name in ('quant_audio_overflows_total', 'quant_recognizer_resets_total', 'quant_commands_total'):
+        for sample in snapshot.get(name, []):
+            labels = ",".join(f"{k}={v}" for k, v in sample['labels'].items())
+            print(f"{name}{'{' + labels + '}' if labels else ''} {sample['value']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Пропускная способность распознавания: пул процессов от 1 до N против декодирования в процессе
+
+    python -m benchmarks.pool corpus/manifest.jsonl --model models/vosk-model-small-ru-0.22 --sessions 8
+"""
+import argparse
+import contextlib
+import io
+import os
+import threading
+import time
+
+from audio_source import FileSource
+from main import SAMPLE_RATE, CHUNK_SIZE
+from recognition_pool import RecognitionPool
+from benchmarks.harness import StubAssistant, load_corpus, use_model, replay
+
+
+def measure(entries, sessions, pool=None):
+    """Прогоняет корпус через sessions ассистентов одновременно; аудио/с и число вызванных команд"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        assistants = [StubAssistant(FileSource([e['audio'] for e in entries], SAMPLE_RATE, CHUNK_SIZE), pool)
+                      for _ in range(sessions)]
+        threads = [threading.Thread(target=replay, args=(assistant,)) for assistant in assistants]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        for assistant in assistants:
+            assistant.speech.stop()
+            assistant.scheduler.stop()
+            if assistant.pool_session is not None:
+                assistant.pool_session.close()
+    audio = sum(assistant.audio_source.duration for assistant in assistants)
+    return audio / elapsed, sum(len(assistant.dispatches) for assistant in assistants)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', help="Манифест JSONL или папка с WAV")
+    parser.add_argument('--model', help="Путь к папке модели Vosk")
+    parser.add_argument('--sessions', type=int, default=8, help="Сколько ассистентов распознают одновременно")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Наибольшее число процессов пула")
+    args = parser.parse_args()
+
+    use_model(args.model)
+    entries = load_corpus(args.corpus)
+    print(f"{'декодирование':<16}{'аудио, с/с':>12}{'ускорение':>11}{'команд':>8}")
+    base, commands = measure(entries, args.sessions)
+    print(f"{'в процессе':<16}{base:>12.1f}{1.0:>10.2f}x{commands:>8}")
+    for workers in range(1, args.workers + 1):
+        pool = RecognitionPool(workers, SAMPLE_RATE)
+        try:
+            measure(entries, workers, pool)  # Прогрев: процессы загружают модель
+            speed, commands = measure(entries, args.sessions, pool)
+        finally:
+            pool.close()
+        print(f"{f'пул, {workers}':<16}{speed:>12.1f}{speed / base:>10.2f}x{commands:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""CPU декодирования на секунду аудио по режимам: грамматики против полного словаря
+
+    python -m benchmarks.recognition corpus/manifest.jsonl --model models/vosk-model-small-ru-0.22
+"""
+import argparse
+
+from audio_source import FileSource
+from main import SAMPLE_RATE, CHUNK_SIZE
+from benchmarks.harness import StubAssistant, load_corpus, use_model, replay
+
+
+def run(entries, grammars, gap):
+    """Прогоняет корпус и возвращает CPU на секунду аудио по режимам и число команд"""
+    source = FileSource([e['audio'] for e in entries], SAMPLE_RATE, CHUNK_SIZE, gap=gap)
+    assistant = StubAssistant(source)
+    assistant.vad = None  # Сравниваем только стоимость декодирования
+    if not grammars:
+        # Прежнее поведение: один распознаватель с полным словарем во всех режимах
+        assistant.wake_recognizer = assistant.command_recognizer = assistant.open_recognizer
+        assistant.recognizer = assistant.open_recognizer
+    replay(assistant)
+    return assistant.decode_report(), assistant.decode_stats, len(assistant.dispatches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', help="Манифест JSONL или папка с WAV")
+    parser.add_argument('--model', help="Путь к папке модели Vosk")
+    parser.add_argument('--gap', type=float, default=1.0, help="Тишина между фразами, с")
+    args = parser.parse_args()
+
+    use_model(args.model)
+    entries = load_corpus(args.corpus)
+    for title, grammars in (("Полный словарь", False), ("Грамматики", True)):
+        report, stats, dispatched = run(entries, grammars, args.gap)
+        print(f"{title} (команд вызвано: {dispatched}):")
+        for mode, cost in report.items():
+            seconds = stats[mode][1] / 2 / SAMPLE_RATE
+            print(f"  {mode}: {cost * 1000:.0f} мс CPU на секунду аудио ({seconds:.1f} с аудио)")
+
+
+if __name__ == '__main__':
+    main()
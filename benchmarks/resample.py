@@ -0,0 +1,100 @@
+"""Захват на родной частоте устройства: CPU передискретизации и точность распознавания против приведения драйвером
+
+    python -m benchmarks.resample corpus/manifest.jsonl --model models/vosk-model-small-ru-0.22 --formats 48000:2,44100:1
+
+Записи корпуса (16 кГц) переводятся в формат устройства («частота:каналы»),
+затем обратно в SAMPLE_RATE двумя способами: Resampler кадрами по FRAME_MS,
+как в MicrophoneSource, и линейной интерполяцией, как делают простые
+преобразователи частоты в драйверах. Точность - доля записей, на которых
+вызвана размеченная команда; исходные 16 кГц - эталон.
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from audio_source import FileSource, read_pcm
+from main import SAMPLE_RATE, CHUNK_SIZE, FRAME_MS
+from resampler import Resampler
+from benchmarks.harness import StubAssistant, load_corpus, use_model, replay, utterance_index
+
+
+def parse_formats(text):
+    """'48000:2,44100' -> [(48000, 2), (44100, 1)]"""
+    formats = []
+    for item in text.split(','):
+        rate, _, channels = item.partition(':')
+        formats.append((int(rate), int(channels or 1)))
+    return formats
+
+
+def to_device(pcm, rate, channels):
+    """Запись 16 кГц моно -> формат устройства (каналы - копии с разным уровнем)"""
+    data = np.frombuffer(Resampler(SAMPLE_RATE, rate).process(pcm), dtype=np.int16)
+    levels = np.linspace(1.0, 0.8, channels, dtype=np.float32)
+    return (data[:, None] * levels[None, :]).astype(np.int16).tobytes()
+
+
+def polyphase(data, rate, channels):
+    """Как MicrophoneSource: кадры по FRAME_MS через один Resampler; возвращает (PCM, CPU)"""
+    resampler = Resampler(rate, SAMPLE_RATE, channels)
+    frame = rate * FRAME_MS // 1000 * 2 * channels
+    started = time.process_time()
+    out = bytearray()
+    for pos in range(0, len(data), frame):
+        out += resampler.process(data[pos:pos + frame])  # Результат перезапишется следующим кадром
+    return bytes(out), time.process_time() - started
+
+
+def linear(data, rate, channels):
+    """Приведение частоты линейной интерполяцией без фильтра; возвращает (PCM, CPU)"""
+    started = time.process_time()
+    samples = np.frombuffer(data, dtype=np.int16).reshape(-1, channels).mean(axis=1)
+    positions = np.arange(0, len(samples) - 1, rate / SAMPLE_RATE)
+    out = np.rint(np.interp(positions, np.arange(len(samples)), samples)).astype(np.int16).tobytes()
+    return out, time.process_time() - started
+
+
+def accuracy(entries, recordings, gap):
+    """Доля записей, на которых вызвана размеченная команда"""
+    source = FileSource(recordings, SAMPLE_RATE, CHUNK_SIZE, gap=gap)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assistant = StubAssistant(source)
+        replay(assistant)
+    recognized = {}
+    for _, position, command in assistant.dispatches:
+        recognized.setdefault(utterance_index(source, position), assistant.router.match(command).name)
+    correct = sum(1 for index, entry in enumerate(entries)
+                  if recognized.get(index) == assistant.router.match(entry.get('text', '')).name)
+    return correct / len(entries) if entries else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', help="Манифест JSONL или папка с WAV")
+    parser.add_argument('--model', help="Путь к папке модели Vosk")
+    parser.add_argument('--formats', default="48000:2,44100:1", help="Форматы устройства частота:каналы через запятую")
+    parser.add_argument('--gap', type=float, default=1.0, help="Тишина после каждой записи, с")
+    args = parser.parse_args()
+
+    use_model(args.model)
+    entries = load_corpus(args.corpus)
+    originals = [read_pcm(e['audio'], SAMPLE_RATE) for e in entries]
+    seconds = sum(len(pcm) for pcm in originals) / 2 / SAMPLE_RATE
+    reference = accuracy(entries, originals, args.gap)
+    print(f"Эталон 16 кГц: точность {reference:.1%} на {len(entries)} записях ({seconds:.1f} с)")
+
+    print(f"{'формат':<14}{'способ':<14}{'CPU/с аудио':>13}{'точность':>10}{'разница':>10}")
+    for rate, channels in parse_formats(args.formats):
+        recordings = [to_device(pcm, rate, channels) for pcm in originals]
+        for title, convert in (("полифазный", polyphase), ("линейный", linear)):
+            converted, cpu = zip(*(convert(data, rate, channels) for data in recordings))
+            score = accuracy(entries, list(converted), args.gap)
+            print(f"{f'{rate}:{channels}':<14}{title:<14}{sum(cpu) / seconds * 1000:>10.2f} мс"
+                  f"{score:>10.1%}{(score - reference) * 100:>+9.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Время до первого звука ответа: синтез, кэш на диске и кэш в памяти
+
+    python -m benchmarks.responses --synthesis-delay 0.15
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+
+from response_cache import ResponseCache
+from speech import SpeechOutput, NullBackend
+from main import VoiceAssistant
+from benchmarks.harness import percentile, format_ms
+
+DYNAMIC = ["Громкость установлена на 40%", "Таймер 2 отменен", "Диски: C: 50% D: 70%", "12:30"]
+
+
+def make_backend(args):
+    if sys.platform == 'win32' and not args.simulate:
+        from speech import SapiBackend
+        return SapiBackend()
+    return NullBackend(chars_per_second=args.cps, synthesis_delay=args.synthesis_delay)
+
+
+def first_audio(output, phrases):
+    """Произносит фразы по одной и возвращает время до первого звука по источникам"""
+    start = len(output.first_audio)
+    for text in phrases:
+        output.say(text)
+        output.wait_idle()
+    by_source = {}
+    for source, seconds in output.first_audio[start:]:
+        by_source.setdefault(source, []).append(seconds)
+    return by_source
+
+
+def make_cache(directory):
+    return ResponseCache(directory, phrases=VoiceAssistant.static_phrases(),
+                         prefixes=VoiceAssistant.PHRASE_PREFIXES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--simulate', action='store_true', help="Имитировать движок даже при наличии SAPI")
+    parser.add_argument('--synthesis-delay', type=float, default=0.15,
+                        help="Имитация: задержка синтеза до первого звука, с")
+    parser.add_argument('--cps', type=float, default=60.0, help="Имитация: скорость речи, символов в секунду")
+    args = parser.parse_args()
+
+    phrases = sorted(VoiceAssistant.static_phrases())
+    directory = tempfile.mkdtemp(prefix="responses-")
+    rows = []
+    try:
+        output = SpeechOutput(make_backend(args))
+        output.start()
+        rows.append(("Без кэша", first_audio(output, phrases + DYNAMIC)))
+        output.stop()
+
+        # Первый запуск: все неизменные фразы рендерятся в простое
+        output = SpeechOutput(make_backend(args), make_cache(directory))
+        output.start()
+        output.ready.wait()
+        started = time.perf_counter()
+        while output.rendering_left:
+            time.sleep(0.05)
+        render_time = time.perf_counter() - started
+        output.stop()
+
+        # Следующий запуск: фразы читаются с диска, затем из памяти
+        output = SpeechOutput(make_backend(args), make_cache(directory))
+        output.start()
+        rows.append(("Кэш, диск", first_audio(output, phrases)))
+        rows.append(("Кэш, память", first_audio(output, phrases)))
+        rows.append(("Начало из кэша", first_audio(output, DYNAMIC)))
+        output.stop()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"Движок речи: {type(make_backend(args)).__name__}")
+    print(f"Рендеринг {len(phrases)} фраз и начал фраз в кэш: {render_time:.1f} с")
+    print(f"{'прогон':<16}{'источник':<10}{'фраз':>6}{'p50':>10}{'p95':>10}")
+    for title, by_source in rows:
+        for source, values in sorted(by_source.items(), key=lambda item: str(item[0])):
+            print(f"{title:<16}{str(source):<10}{len(values):>6}"
+                  f"{format_ms(percentile(values, 50)):>10}{format_ms(percentile(values, 95)):>10}")
+
+
+if __name__ == '__main__':
+    main()
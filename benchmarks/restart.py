@@ -0,0 +1,112 @@
+"""Время от команды перезапуска до «Готов»: мягкий перезапуск в процессе против exec
+
+    python -m benchmarks.restart --model models/vosk-model-small-ru-0.22 --repeat 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from audio_source import FileSource
+from main import VoiceAssistant, SAMPLE_RATE, CHUNK_SIZE
+from benchmarks.harness import StubAssistant, use_model, percentile, format_ms
+
+
+class RestartingAssistant(StubAssistant):
+    """Ассистент с заглушками и настоящим перезапуском; ready - произнесено «Готов»"""
+    def __init__(self, audio_source):
+        self.ready = threading.Event()
+        super().__init__(audio_source)
+
+    def restart(self, reload_config=False):
+        VoiceAssistant.restart(self, reload_config)
+
+    def speak(self, text, *args, **kwargs):
+        super().speak(text, *args, **kwargs)
+        if text == "Готов":
+            self.ready.set()
+
+
+def silence():
+    """Тишина с темпом микрофона"""
+    return FileSource([bytes(CHUNK_SIZE * 2)], SAMPLE_RATE, CHUNK_SIZE, realtime=True, loop=True)
+
+
+def measure_soft(repeat):
+    """Мягкие перезапуски одного ассистента; возвращает времена и сохранился ли таймер"""
+    assistant = RestartingAssistant(silence())
+    runner = threading.Thread(target=assistant.run)
+    runner.start()
+    assistant.ready.wait()
+    timer_id = assistant.set_timer(600)
+
+    times = []
+    for _ in range(repeat):
+        assistant.ready.clear()
+        started = time.perf_counter()
+        assistant.restart()
+        assistant.ready.wait()
+        times.append(time.perf_counter() - started)
+    kept = assistant.scheduler.get(timer_id) is not None
+    assistant.stop()
+    runner.join()
+    return times, kept
+
+
+def measure_exec(model_path):
+    """Новый процесс, как после os.execl; таймер передается через окружение"""
+    saved = json.dumps({'saved': time.time(), 'timers': [(1, 600, 600.0)]})
+    env = dict(os.environ, **{VoiceAssistant.TIMERS_ENV: saved})
+    command = [sys.executable, '-m', 'benchmarks.restart', '--child']
+    if model_path:
+        command += ['--model', model_path]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, env=env, text=True, encoding='utf-8')
+    elapsed, kept = None, False
+    for line in process.stdout:
+        if line.startswith("READY"):
+            elapsed = time.perf_counter() - started
+            kept = int(line.split()[1]) > 0
+    process.wait()
+    return elapsed, kept
+
+
+def child():
+    """Запуск в дочернем процессе: сообщает о готовности и числе восстановленных таймеров"""
+    assistant = RestartingAssistant(silence())
+    runner = threading.Thread(target=assistant.run)
+    runner.start()
+    assistant.ready.wait()
+    print(f"READY {len(assistant.scheduler.timers)}", flush=True)
+    assistant.stop()
+    runner.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', help="Путь к папке модели Vosk")
+    parser.add_argument('--repeat', type=int, default=5, help="Сколько раз перезапускать")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    use_model(args.model)
+    if args.child:
+        child()
+        return
+
+    soft, soft_kept = measure_soft(args.repeat)
+    execs = []
+    for _ in range(args.repeat):
+        elapsed, exec_kept = measure_exec(args.model)
+        execs.append(elapsed)
+
+    print(f"{'перезапуск':<12}{'p50':>10}{'max':>10}  таймеры")
+    for title, times, kept in (("exec", execs, exec_kept), ("мягкий", soft, soft_kept)):
+        print(f"{title:<12}{format_ms(percentile(times, 50)):>10}{format_ms(max(times)):>10}"
+              f"  {'сохранены' if kept else 'потеряны'}")
+
+
+if __name__ == '__main__':
+    main()
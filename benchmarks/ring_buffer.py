@@ -0,0 +1,140 @@
+"""Кольцевой буфер против queue.Queue: выделения памяти и пробуждения потребителя
+
+    python -m benchmarks.ring_buffer --seconds 60 --speed 20
+
+Выделения считаются вместе с передачей чанка распознавателю: AcceptWaveform
+принимает только bytes, поэтому срез кольца либо копируется в bytes, либо
+отдается в C API vosk через ffi.from_buffer (как в VoiceAssistant.accept_waveform).
+"""
+import argparse
+import queue
+import threading
+import time
+import tracemalloc
+
+from main import SAMPLE_RATE, CHUNK_SIZE, CHUNK_BYTES, BUFFER_SECONDS, vosk_ffi
+from ring_buffer import RingBuffer
+
+
+def device_chunks(seconds):
+    """Имитация драйвера: чанки - срезы одного буфера, который драйвер переиспользует"""
+    device = memoryview(bytearray(CHUNK_BYTES))
+    for _ in range(int(seconds * SAMPLE_RATE / CHUNK_SIZE)):
+        yield device
+
+
+def allocations(pipeline, handoff, seconds):
+    """Считает выделения памяти на чанк однопоточным прогоном производитель -> распознаватель"""
+    put, get, done = pipeline
+    allocated = 0
+    chunk_allocations = 0
+    tracemalloc.start()
+    started = time.perf_counter()
+    for chunk in device_chunks(seconds):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        put(chunk)
+        data = get()
+        accepted = handoff(data)  # Что получит распознаватель
+        done(data)
+        del accepted
+        _, peak = tracemalloc.get_traced_memory()
+        allocated += peak - before
+        if peak - before >= CHUNK_BYTES // 2:
+            chunk_allocations += 1
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    return allocated, chunk_allocations, elapsed
+
+
+def queue_pipeline():
+    q = queue.Queue(maxsize=20)
+    # Очередь хранит ссылки, поэтому переиспользуемый буфер драйвера нужно копировать
+    return (lambda chunk: q.put(bytes(chunk)), lambda: q.get(), lambda data: q.task_done())
+
+
+def ring_pipeline():
+    rb = RingBuffer(BUFFER_SECONDS * SAMPLE_RATE * 2, preroll=SAMPLE_RATE * 2)
+    return (rb.write, lambda: rb.peek(CHUNK_BYTES), lambda data: rb.consume(len(data)))
+
+
+def queue_wakeups(seconds, speed):
+    """Пробуждения потребителя в цикле как в прежнем process_audio"""
+    q = queue.Queue(maxsize=20)
+    stop = threading.Event()
+    wakeups = 0
+
+    def consumer():
+        nonlocal wakeups
+        while not stop.is_set():
+            try:
+                q.get(timeout=0.1)
+                q.task_done()
+            except queue.Empty:
+                pass
+            wakeups += 1
+
+    return paced_run(lambda chunk: q.put(bytes(chunk)), consumer, stop, seconds, speed,
+                     lambda: wakeups)
+
+
+def ring_wakeups(seconds, speed):
+    rb = RingBuffer(BUFFER_SECONDS * SAMPLE_RATE * 2, preroll=SAMPLE_RATE * 2)
+    stop = threading.Event()
+
+    def consumer():
+        while not stop.is_set():
+            data = rb.peek(CHUNK_BYTES, min_bytes=CHUNK_BYTES, timeout=0.1)
+            if data is not None:
+                rb.consume(len(data))
+
+    def finish():
+        rb.close()
+        return rb.wakeups
+
+    return paced_run(rb.write, consumer, stop, seconds, speed, finish)
+
+
+def paced_run(put, consumer, stop, seconds, speed, result):
+    """Производитель подает чанки мелкими порциями с ускоренным темпом реального времени"""
+    thread = threading.Thread(target=consumer)
+    thread.start()
+    # Драйвер отдает данные порциями по 10 мс
+    piece = SAMPLE_RATE // 100 * 2
+    device = memoryview(bytearray(piece))
+    period = 0.01 / speed
+    started = time.perf_counter()
+    for i in range(int(seconds * 100)):
+        put(device)
+        delay = started + (i + 1) * period - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    count = result()
+    thread.join()
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=60, help="Длительность аудио, с")
+    parser.add_argument('--speed', type=float, default=20, help="Ускорение относительно реального времени")
+    args = parser.parse_args()
+
+    # bytes(bytes) возвращает тот же объект: чанк очереди уходит в AcceptWaveform без новой копии
+    runs = [('queue.Queue', queue_pipeline, bytes), ('RingBuffer + bytes()', ring_pipeline, bytes)]
+    if vosk_ffi is not None:
+        runs.append(('RingBuffer + from_buffer', ring_pipeline, vosk_ffi.from_buffer))
+    for name, pipeline, handoff in runs:
+        allocated, chunk_allocations, elapsed = allocations(pipeline(), handoff, args.seconds)
+        print(f"{name}: выделено {allocated / elapsed / 1024:.0f} КиБ/с, "
+              f"выделений размером с чанк {chunk_allocations / args.seconds:.1f} в секунду аудио")
+
+    print(f"Пробуждения потребителя (ускорение x{args.speed:g}):")
+    print(f"  queue.Queue: {queue_wakeups(args.seconds, args.speed):.1f} в секунду")
+    print(f"  RingBuffer:  {ring_wakeups(args.seconds, args.speed):.1f} в секунду")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Нагрузка на сервер распознавания: N клиентов одновременно передают записи корпуса
+
+    python -m benchmarks.server corpus/manifest.jsonl --model models/vosk-model-small-ru-0.22 --clients 1,4,16
+"""
+import argparse
+import bisect
+import contextlib
+import io
+import json
+import os
+import socket
+import threading
+import time
+
+from asr_server import AsrServer
+from recognition_pool import RecognitionPool
+from audio_source import read_pcm
+from main import SAMPLE_RATE, CHUNK_SIZE
+from benchmarks.harness import load_corpus, use_model, percentile, format_ms
+
+
+def run_client(address, recordings, gap, speed):
+    """Один клиент: передает записи с темпом микрофона (ускоренным в speed раз) и собирает ответы"""
+    sock = socket.create_connection(address)
+    sock.sendall(b"{}\n")
+    messages = []  # (time.monotonic(), сообщение)
+
+    def receive():
+        with sock.makefile('rb') as f:
+            for line in f:
+                messages.append((time.monotonic(), json.loads(line)))
+    receiver = threading.Thread(target=receive)
+    receiver.start()
+
+    chunk_bytes = CHUNK_SIZE * 2
+    silence = bytes(int(gap * SAMPLE_RATE) * 2)
+    ends = []  # Позиция конца каждой записи в потоке (байт)
+    end_times = []  # Когда отправлен ее последний байт
+    started = time.monotonic()
+    sent = 0
+    for pcm in recordings:
+        for data in (pcm, silence):
+            for pos in range(0, len(data), chunk_bytes):
+                chunk = data[pos:pos + chunk_bytes]
+                delay = started + (sent + len(chunk)) / 2 / SAMPLE_RATE / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                sock.sendall(chunk)
+                sent += len(chunk)
+            if data is pcm:
+                ends.append(sent)
+                end_times.append(time.monotonic())
+    sock.shutdown(socket.SHUT_WR)  # Сервер дораспознает остаток и закроет соединение
+    receiver.join()
+    sock.close()
+
+    ready = next((at - started for at, message in messages
+                  if message['type'] == 'speech' and message['text'] == "Готов"), None)
+    latencies = {}
+    for at, message in messages:
+        if message['type'] != 'intent':
+            continue
+        # Команду относим к последней записи, закончившейся до ее позиции в потоке
+        index = bisect.bisect_right(ends, message['position']) - 1
+        if index >= 0 and index not in latencies:
+            latencies[index] = at - end_times[index]
+    return {'ready': ready, 'latencies': list(latencies.values()), 'audio': sent / 2 / SAMPLE_RATE}
+
+
+def cpu_time(pool):
+    """CPU процесса и процессов пула, с"""
+    total = time.process_time()
+    if pool is not None:
+        import psutil
+        for worker in pool.workers:
+            times = psutil.Process(worker.process.pid).cpu_times()
+            total += times.user + times.system
+    return total
+
+
+def measure(server, recordings, clients, gap, speed):
+    """Запускает clients клиентов одновременно; возвращает их результаты, время и CPU процесса"""
+    results = [None] * clients
+    address = server.server_address
+
+    def client(index):
+        results[index] = run_client(address, recordings, gap, speed)
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    cpu_started = cpu_time(server.pool)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # Журнал сессий не смешиваем с таблицей
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        while server.sessions:  # Сессии дописывают журнал после закрытия соединения
+            time.sleep(0.01)
+    return results, time.perf_counter() - started, cpu_time(server.pool) - cpu_started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', help="Манифест JSONL или папка с WAV")
+    parser.add_argument('--model', help="Путь к папке модели Vosk")
+    parser.add_argument('--clients', default="1,4,16", help="Числа одновременных клиентов через запятую")
+    parser.add_argument('--gap', type=float, default=1.0, help="Тишина после каждой записи, с")
+    parser.add_argument('--speed', type=float, default=1.0, help="Во сколько раз быстрее реального времени передавать аудио")
+    parser.add_argument('--workers', type=int, default=0, help="Декодировать в пуле из стольких процессов")
+    args = parser.parse_args()
+
+    use_model(args.model)
+    recordings = [read_pcm(entry['audio'], SAMPLE_RATE) for entry in load_corpus(args.corpus)]
+    pool = RecognitionPool(args.workers, SAMPLE_RATE) if args.workers else None
+    server = AsrServer(('127.0.0.1', 0), pool=pool)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # CPU считается по всему процессу (и процессам пула), вместе с клиентами - оценка сверху
+    print(f"{'клиентов':>8}{'команд':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'готов p50':>11}"
+          f"{'ядер':>7}{'потоков/ядро':>14}")
+    for clients in (int(n) for n in args.clients.split(',')):
+        results, elapsed, cpu = measure(server, recordings, clients, args.gap, args.speed)
+        latencies = [latency for r in results for latency in r['latencies']]
+        ready = [r['ready'] for r in results if r['ready'] is not None]
+        cores = cpu / elapsed
+        # Поток - клиент, передающий аудио с темпом реального времени
+        streams = sum(r['audio'] for r in results) / elapsed
+        print(f"{clients:>8}{len(latencies):>5}/{clients * len(recordings):<4}"
+              f"{format_ms(percentile(latencies, 50)):>9}{format_ms(percentile(latencies, 95)):>9}"
+              f"{format_ms(percentile(latencies, 99)):>9}{format_ms(percentile(ready, 50)):>11}"
+              f"{cores:>7.2f}{streams / cores if cores else float('inf'):>14.1f}")
+    print(f"Ядер в системе: {os.cpu_count()}, загруженных моделей: {len(server.models.report())}")
+    server.stop()
+    if pool is not None:
+        pool.close()
+
+
+if __name__ == '__main__':
+    main()
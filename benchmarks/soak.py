@@ -0,0 +1,233 @@
+"""Долгий прогон: рост памяти, потоков и задержек этапов на часах речи вперемешку с тишиной
+
+    python -m benchmarks.soak corpus/manifest.jsonl --model models/vosk-model-small-ru-0.22 --hours 4 --speed 50
+
+Записи корпуса в случайном порядке чередуются с тишиной случайной длины и
+подаются в конвейер с ускорением --speed (0 - так быстро, как успевает
+распознавание); речь и действия - заглушки. Каждые --interval секунд
+снимаются RSS, память Python (tracemalloc), число потоков и таймеров,
+p95 этапов за интервал. Если рост превышает пороги, печатается отчет с
+главными источниками новых выделений; итог сохраняется в --report (JSON).
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+import psutil
+
+import main as app
+from audio_source import AudioSource, read_pcm
+from event_log import EVENT_LOG
+from metrics import Metrics
+from benchmarks.harness import StubAssistant, load_corpus, use_model, replay, format_ms
+
+# Этапы, задержки которых сравниваются с первым интервалом
+STAGES = [
+    ('quant_queue_wait_seconds', {}, "ожидание в буфере"),
+    ('quant_accept_waveform_seconds', {'mode': 'standby'}, "AcceptWaveform ожидание"),
+    ('quant_accept_waveform_seconds', {'mode': 'active'}, "AcceptWaveform команды"),
+    ('quant_result_dispatch_seconds', {}, "результат -> команда"),
+]
+
+
+class SoakSource(AudioSource):
+    """Речь корпуса вперемешку с тишиной: duration секунд аудио с ускорением speed"""
+    realtime = False  # Без потерь: замер не должен зависеть от переполнений буфера
+
+    def __init__(self, recordings, sample_rate, chunk_size, duration, speed, gap, seed=0):
+        super().__init__(sample_rate, chunk_size)
+        self.recordings = recordings
+        self.duration = duration
+        self.speed = speed
+        self.gap = gap  # (от, до) секунд тишины после записи
+        self.random = random.Random(seed)
+        self.bytes_read = 0
+        self.utterances = 0
+        self._chunks = None
+        self._started = None
+
+    def _iter_chunks(self):
+        chunk_bytes = self.chunk_size * 2
+        total = int(self.duration * self.sample_rate) * 2
+        silence = bytes(int(self.gap[1] * self.sample_rate) * 2)
+        while self.bytes_read < total:
+            data = self.random.choice(self.recordings)
+            for pos in range(0, len(data), chunk_bytes):
+                yield data[pos:pos + chunk_bytes]
+            self.utterances += 1
+            pause = int(self.random.uniform(*self.gap) * self.sample_rate) * 2
+            for pos in range(0, pause, chunk_bytes):
+                yield silence[:min(chunk_bytes, pause - pos)]
+
+    def start(self):
+        self._chunks = self._iter_chunks()
+        self._started = time.monotonic()
+
+    def read(self):
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return None
+        if self.speed:
+            delay = self._started + self.bytes_read / 2 / self.sample_rate / self.speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.bytes_read += len(chunk)
+        return chunk
+
+    @property
+    def seconds(self):
+        return self.bytes_read / 2 / self.sample_rate
+
+
+class SoakAssistant(StubAssistant):
+    """Заглушка с ограниченной историей: сам замер не должен расти"""
+    def __init__(self, audio_source, metrics):
+        super().__init__(audio_source, metrics=metrics)
+        self.spoken = deque(maxlen=100)
+        self.dispatches = deque(maxlen=100)
+        self.wakes = deque(maxlen=100)
+
+
+class Sampler:
+    """Снимки состояния процесса и задержек этапов за интервал"""
+    def __init__(self, assistant, source, metrics, top):
+        self.assistant = assistant
+        self.source = source
+        self.metrics = metrics
+        self.top = top
+        self.process = psutil.Process()
+        self.samples = []
+        self._states = {}  # Этап -> состояние гистограммы на прошлом снимке
+        self._baseline = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+
+    def stage_p95(self, name, labels):
+        """p95 этапа по наблюдениям с прошлого снимка"""
+        histogram = self.metrics.histogram(name, "", **labels)
+        counts, total, count = histogram.state()
+        previous = self._states.get((name, tuple(labels.items())))
+        self._states[(name, tuple(labels.items()))] = (counts, total, count)
+        if previous is not None:
+            counts = [now - before for now, before in zip(counts, previous[0])]
+            count -= previous[2]
+        return histogram.quantile(0.95, (counts, 0.0, count))
+
+    def take(self):
+        assistant = self.assistant
+        sample = {
+            'wall': time.monotonic(),
+            'audio_hours': self.source.seconds / 3600,
+            'utterances': self.source.utterances,
+            'rss_mb': self.process.memory_info().rss / 2 ** 20,
+            'threads': threading.active_count(),
+            'timers': len(assistant.scheduler.timers),
+            'recycles': assistant.reset_counts['recycle'].value,
+            'stages': {title: self.stage_p95(name, labels) for name, labels, title in STAGES},
+        }
+        if tracemalloc.is_tracing():
+            sample['traced_mb'] = tracemalloc.get_traced_memory()[0] / 2 ** 20
+        self.samples.append(sample)
+        return sample
+
+    def top_allocations(self):
+        """Строки кода с наибольшим ростом памяти с начала прогона"""
+        if self._baseline is None:
+            return []
+        stats = tracemalloc.take_snapshot().compare_to(self._baseline, 'lineno')
+        return [{'where': str(stat.traceback[0]), 'size_kb': round(stat.size_diff / 1024, 1),
+                 'count': stat.count_diff} for stat in stats[:self.top]]
+
+
+def format_latency(seconds):
+    return "-" if seconds is None else format_ms(seconds)
+
+
+def check(samples, args):
+    """Пороги, превышенные последним снимком относительно первого: {что выросло: описание}"""
+    first, last = samples[0], samples[-1]
+    problems = {}
+    if last['rss_mb'] - first['rss_mb'] > args.rss_growth:
+        problems['rss'] = f"RSS вырос на {last['rss_mb'] - first['rss_mb']:.1f} МБ"
+    if last['threads'] - first['threads'] > args.thread_growth:
+        problems['threads'] = f"потоков стало {last['threads']} (было {first['threads']})"
+    for title, value in last['stages'].items():
+        # Основа - первый интервал, в котором этап вообще был
+        base = next((sample['stages'][title] for sample in samples if sample['stages'][title]), None)
+        if value and base and value > base * args.latency_drift:
+            problems[title] = f"p95 «{title}» {format_ms(value)} (было {format_ms(base)})"
+    return problems
+
+
+def write_report(path, report):
+    """Сохраняет отчет атомарно: прерванный прогон не оставит половину файла"""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', help="Манифест JSONL или папка с WAV")
+    parser.add_argument('--model', help="Путь к папке модели Vosk")
+    parser.add_argument('--hours', type=float, default=4.0, help="Сколько часов аудио прогнать")
+    parser.add_argument('--speed', type=float, default=0.0, help="Ускорение относительно реального времени (0 - без пауз)")
+    parser.add_argument('--gap', default="1:30", help="Тишина после записи от:до, с")
+    parser.add_argument('--interval', type=float, default=10.0, help="Как часто снимать состояние, с")
+    parser.add_argument('--recycle', type=int, help="Пересоздавать распознаватели через столько фраз "
+                                                    "(по умолчанию RECOGNIZER_RECYCLE_UTTERANCES, 0 - никогда)")
+    parser.add_argument('--rss-growth', type=float, default=50.0, help="Порог роста RSS, МБ")
+    parser.add_argument('--thread-growth', type=int, default=2, help="Порог роста числа потоков")
+    parser.add_argument('--latency-drift', type=float, default=2.0, help="Порог роста p95 этапа, раз")
+    parser.add_argument('--top', type=int, default=10, help="Сколько источников выделений показать")
+    parser.add_argument('--no-tracemalloc', action='store_true', help="Без tracemalloc (он замедляет прогон)")
+    parser.add_argument('--report', default="soak_report.json", help="Файл отчета JSON")
+    args = parser.parse_args()
+
+    use_model(args.model)
+    if args.recycle is not None:
+        app.RECOGNIZER_RECYCLE_UTTERANCES = args.recycle or None
+    EVENT_LOG.configure(None, console=False)  # Журнал тысяч фраз не нужен
+    recordings = [read_pcm(e['audio'], app.SAMPLE_RATE) for e in load_corpus(args.corpus)]
+    gap = tuple(float(value) for value in args.gap.split(':'))
+    source = SoakSource(recordings, app.SAMPLE_RATE, app.SAMPLE_RATE * app.FRAME_MS // 1000,
+                        args.hours * 3600, args.speed, gap)
+    metrics = Metrics()
+    assistant = SoakAssistant(source, metrics)
+    if not args.no_tracemalloc:
+        tracemalloc.start()
+    sampler = Sampler(assistant, source, metrics, args.top)
+
+    runner = threading.Thread(target=replay, args=(assistant,), name="soak")
+    runner.start()
+    reported = set()
+    print(f"Этапы: {', '.join(title for _, _, title in STAGES)}")
+    print(f"{'аудио, ч':>9}{'фраз':>8}{'RSS, МБ':>9}{'Python, МБ':>11}{'потоков':>9}{'таймеров':>10}"
+          f"{'пересозд.':>10}  p95 этапов")
+    while runner.is_alive():
+        runner.join(args.interval)
+        sample = sampler.take()
+        print(f"{sample['audio_hours']:>9.2f}{sample['utterances']:>8}{sample['rss_mb']:>9.1f}"
+              f"{sample.get('traced_mb', float('nan')):>11.1f}{sample['threads']:>9}{sample['timers']:>10}"
+              f"{sample['recycles']:>10.0f}  " + ", ".join(map(format_latency, sample['stages'].values())))
+        # О каждом превышении сообщаем один раз, с источниками выделений на этот момент
+        problems = {key: text for key, text in check(sampler.samples, args).items() if key not in reported}
+        if problems:
+            reported.update(problems)
+            print("ПРЕВЫШЕН ПОРОГ: " + "; ".join(problems.values()))
+            for top in sampler.top_allocations():
+                print(f"  {top['size_kb']:>10.1f} КБ {top['count']:>+8}  {top['where']}")
+
+    report = {'args': vars(args), 'samples': sampler.samples, 'problems': list(check(sampler.samples, args).values()),
+              'top_allocations': sampler.top_allocations()}
+    write_report(args.report, report)
+    print(f"Аудио: {source.seconds / 3600:.2f} ч, фраз: {source.utterances}, "
+          f"пересозданий распознавателей: {report['samples'][-1]['recycles']:.0f}, отчет: {args.report}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Очередь вывода речи против синхронного Speak: блокировка вызывающего, перебивание, приоритеты
+
+    python -m benchmarks.speech --wav-dir out/speech
+"""
+import argparse
+import time
+
+from speech import SpeechOutput, NullBackend, WaveFileBackend, PRIORITY_NORMAL, PRIORITY_ALARM
+from benchmarks.harness import percentile, format_ms
+
+PHRASES = ["Готов", "Приветствую!", "Громкость установлена на 50%", "Таймер 1 установлен на 5 минут",
+           "Ищу информацию в интернете", "Режим ожидания", "Диски: C: 50%, D: 70%"]
+
+
+def make_backend(args):
+    if args.wav_dir:
+        return WaveFileBackend(args.wav_dir, chars_per_second=args.cps)
+    return NullBackend(chars_per_second=args.cps)
+
+
+def blocking_time(say, phrases):
+    """Сколько вызывающий поток (распознавание) стоит на каждой фразе"""
+    stalls = []
+    for text in phrases:
+        started = time.perf_counter()
+        say(text)
+        stalls.append(time.perf_counter() - started)
+    return stalls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cps', type=float, default=15.0, help="Скорость имитируемой речи, символов в секунду")
+    parser.add_argument('--wav-dir', help="Писать произнесенное в WAV-файлы в этой папке")
+    args = parser.parse_args()
+
+    # Прежняя схема: синхронный Speak в потоке распознавания
+    legacy = blocking_time(NullBackend(chars_per_second=args.cps).say, PHRASES)
+
+    output = SpeechOutput(make_backend(args))
+    output.start()
+    queued = blocking_time(output.say, PHRASES)
+    output.wait_idle()
+    print(f"Блокировка вызывающего потока: синхронно p50 {format_ms(percentile(legacy, 50))}, "
+          f"сумма {format_ms(sum(legacy))}; очередь p50 {format_ms(percentile(queued, 50))}, "
+          f"p99 {format_ms(percentile(queued, 99))}")
+
+    # Перебивание: пользователь сказал ключевое слово посреди длинного ответа
+    delays = []
+    for _ in range(10):
+        output.say("Это длинный ответ, который пользователь не станет дослушивать до конца")
+        time.sleep(0.2)
+        started = time.perf_counter()
+        output.cancel()
+        output.wait_idle()
+        delays.append(time.perf_counter() - started)
+    print(f"Перебивание: речь смолкает через p50 {format_ms(percentile(delays, 50))}, "
+          f"p99 {format_ms(percentile(delays, 99))}")
+
+    # Таймер важнее ответов: обрывает текущий и отбрасывает ожидающие
+    backend = output.backend
+    first = len(backend.spoken)
+    for text in PHRASES[1:4]:
+        output.say(text, PRIORITY_NORMAL)
+    time.sleep(0.1)
+    output.say("Таймер 1 на 5 минут завершил работу!", PRIORITY_ALARM, interrupt=True)
+    output.say("Режим ожидания", PRIORITY_NORMAL)
+    output.wait_idle()
+    print("Порядок с сигналом таймера:")
+    for _, text, finished in backend.spoken[first:]:
+        print(f"  {'полностью' if finished else 'оборвано ':<10} {text}")
+    print(f"Оборвано или отброшено фраз всего: {output.interrupted}")
+    output.stop()
+
+
+if __name__ == '__main__':
+    main()
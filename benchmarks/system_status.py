@@ -0,0 +1,107 @@
+"""Задержка команды «состояние системы» с зависающим сетевым диском: опрос в команде против фонового снимка
+
+    python -m benchmarks.system_status --slow 5 --repeat 5
+
+Модель не нужна: команда вызывается на объекте, у которого есть только system_monitor.
+"""
+import argparse
+import time
+from collections import namedtuple
+from types import SimpleNamespace
+
+from main import VoiceAssistant
+from metrics import Metrics
+from system_monitor import SystemMonitor
+from benchmarks.harness import percentile, format_ms
+
+Partition = namedtuple('Partition', 'device mountpoint fstype opts')
+Usage = namedtuple('Usage', 'total used free percent')
+Memory = namedtuple('Memory', 'total available percent')
+Battery = namedtuple('Battery', 'percent secsleft power_plugged')
+LOCAL, NETWORK = 'C:\\', 'Z:\\'
+
+
+class SlowMountSystem:
+    """Заглушка psutil: два локальных диска и сетевой, который отвечает за slow секунд"""
+    def __init__(self, slow):
+        self.slow = slow
+        self.usage_calls = {}  # Точка монтирования -> сколько раз опрошена
+        self.partitions = [Partition('C:\\', 'C:\\', 'NTFS', 'rw,fixed'),
+                           Partition('D:\\', 'D:\\', 'NTFS', 'rw,fixed'),
+                           Partition('\\\\nas\\share', 'Z:\\', 'NTFS', 'rw,remote')]
+
+    def disk_partitions(self, all=False):
+        return self.partitions
+
+    def disk_usage(self, path):
+        self.usage_calls[path] = self.usage_calls.get(path, 0) + 1
+        if path == NETWORK:
+            time.sleep(self.slow)
+        return Usage(100, 50, 50, 50.0)
+
+    def cpu_percent(self, interval=None):
+        if interval:
+            time.sleep(interval)
+        return 12.0
+
+    def virtual_memory(self):
+        return Memory(100, 52, 48.0)
+
+    def sensors_battery(self):
+        return Battery(80.0, 3600, False)
+
+
+def inline_status(psutil):
+    """Прежняя команда: опрос дисков в потоке распознавания"""
+    disk_status = []
+    for partition in psutil.disk_partitions(all=False):
+        if partition.fstype and 'cdrom' not in partition.opts:
+            try:
+                usage = psutil.disk_usage(partition.mountpoint)
+                disk_status.append(f"{partition.mountpoint[0]}: {round(usage.percent)}%")
+            except Exception:
+                continue
+    return f"Диски: {' '.join(disk_status)}"
+
+
+def measure(command, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = command()
+        times.append(time.perf_counter() - started)
+    return times, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--slow', type=float, default=5.0, help="Сколько отвечает сетевой диск, с")
+    parser.add_argument('--timeout', type=float, default=1.0, help="Сколько монитор ждет одного диска, с")
+    parser.add_argument('--repeat', type=int, default=5, help="Сколько раз выполнить команду")
+    args = parser.parse_args()
+
+    system = SlowMountSystem(args.slow)
+    rows = [("в команде",) + measure(lambda: inline_status(system), args.repeat)]
+
+    system = SlowMountSystem(args.slow)
+    monitor = SystemMonitor(ttl=args.slow / 2, mount_timeout=args.timeout, source=system, metrics=Metrics())
+    # get_system_status читает только снимок монитора - ассистент с моделью не нужен
+    assistant = SimpleNamespace(system_monitor=monitor)
+    started = time.perf_counter()
+    monitor.start()
+    monitor.ready.wait()
+    first = time.perf_counter() - started
+    rows.append(("фоновый снимок",) + measure(lambda: VoiceAssistant.get_system_status(assistant), args.repeat))
+    # Опросы продолжаются, но к сетевому диску, пока он не ответил, новые запросы не идут
+    time.sleep(args.slow)
+    monitor.stop()
+
+    print(f"{'опрос':<16}{'p50':>10}{'max':>10}  ответ")
+    for title, times, response in rows:
+        print(f"{title:<16}{format_ms(percentile(times, 50)):>10}{format_ms(max(times)):>10}  {response}")
+    print(f"Первый снимок через {format_ms(first)}, опросов: {monitor.refreshes}, "
+          f"запросов к локальному диску: {system.usage_calls[LOCAL]}, к сетевому: {system.usage_calls[NETWORK]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Планировщик таймеров против потока на каждый таймер: потоки, пробуждения, точность
+
+    python -m benchmarks.timers --counts 1 10 100 1000 10000
+"""
+import argparse
+import random
+import threading
+import time
+
+from scheduler import TimerScheduler
+from benchmarks.harness import percentile, format_ms
+
+
+def run_scheduler(count, spread):
+    """Ставит count таймеров со сроками в пределах spread секунд и ждет их срабатывания"""
+    lateness = []
+    done = threading.Event()
+
+    def on_fire(timer):
+        lateness.append(time.monotonic() - timer.deadline)
+        if len(lateness) == count:
+            done.set()
+
+    scheduler = TimerScheduler(on_fire)
+    scheduler.start()
+    threads_before = threading.active_count()
+    rng = random.Random(0)
+    for _ in range(count):
+        scheduler.add(rng.uniform(spread / 2, spread))
+    threads = threading.active_count()
+    done.wait()
+    scheduler.stop()
+    return threads, threads_before, scheduler.wakeups, lateness
+
+
+def run_legacy(count, spread):
+    """Прежняя схема: поток на таймер, проверка раз в секунду"""
+    lateness = []
+    wakeups = 0
+    lock = threading.Lock()
+
+    def timer_thread(duration):
+        nonlocal wakeups
+        start_time = time.time()
+        deadline = time.monotonic() + duration
+        time_left = duration
+        while time_left > 0:
+            time.sleep(1)
+            with lock:
+                wakeups += 1
+            time_left = duration - (time.time() - start_time)
+        with lock:
+            lateness.append(time.monotonic() - deadline)
+
+    threads_before = threading.active_count()
+    rng = random.Random(0)
+    workers = [threading.Thread(target=timer_thread, args=(rng.uniform(spread / 2, spread),), daemon=True)
+               for _ in range(count)]
+    for worker in workers:
+        worker.start()
+    threads = threading.active_count()
+    for worker in workers:
+        worker.join()
+    return threads, threads_before, wakeups, lateness
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counts', type=int, nargs='+', default=[1, 10, 100, 1000, 10000])
+    parser.add_argument('--spread', type=float, default=3.0, help="Максимальная длительность таймера, с")
+    parser.add_argument('--legacy-limit', type=int, default=1000,
+                        help="Наибольшее число таймеров для прежней схемы")
+    args = parser.parse_args()
+
+    print(f"{'схема':<12}{'таймеров':>10}{'потоков':>10}{'пробуждений':>13}{'опоздание p50':>15}{'p99':>10}")
+    for count in args.counts:
+        runs = [('планировщик', run_scheduler)]
+        if count <= args.legacy_limit:
+            runs.append(('поток/таймер', run_legacy))
+        for name, run in runs:
+            threads, threads_before, wakeups, lateness = run(count, args.spread)
+            print(f"{name:<12}{count:>10}{threads - threads_before:>+10}{wakeups:>13}"
+                  f"{format_ms(percentile(lateness, 50)):>15}{format_ms(percentile(lateness, 99)):>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""VAD перед распознавателем: доля пропущенного аудио, экономия CPU и полнота активации
+
+    python -m benchmarks.vad corpus/manifest.jsonl --model models/vosk-model-small-ru-0.22 --gap 5
+"""
+import argparse
+
+from audio_source import FileSource
+from main import SAMPLE_RATE, CHUNK_SIZE, KEYWORDS
+from benchmarks.harness import StubAssistant, load_corpus, use_model, replay, utterance_index
+
+
+def run(entries, use_vad, gap):
+    """Прогоняет корпус и возвращает статистику декодирования и найденные активации"""
+    source = FileSource([e['audio'] for e in entries], SAMPLE_RATE, CHUNK_SIZE, gap=gap)
+    assistant = StubAssistant(source)
+    if not use_vad:
+        assistant.vad = None
+    elapsed = replay(assistant)
+
+    woken = {utterance_index(source, position) for position in assistant.wakes}
+    expected = [i for i, e in enumerate(entries)
+                if set(e.get('text', '').split()) & set(KEYWORDS)]
+    recall = sum(1 for i in expected if i in woken) / len(expected) if expected else float('nan')
+    return assistant.vad_report(), recall, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', help="Манифест JSONL или папка с WAV")
+    parser.add_argument('--model', help="Путь к папке модели Vosk")
+    parser.add_argument('--gap', type=float, default=5.0, help="Тишина между фразами, с")
+    args = parser.parse_args()
+
+    use_model(args.model)
+    entries = load_corpus(args.corpus)
+    baseline, baseline_recall, baseline_elapsed = run(entries, False, args.gap)
+    gated, gated_recall, gated_elapsed = run(entries, True, args.gap)
+
+    print(f"Без VAD: декодирование {baseline['decode_time']:.2f} с CPU, "
+          f"полнота активации {baseline_recall:.1%}, прогон {baseline_elapsed:.1f} с")
+    print(f"С VAD:   декодирование {gated['decode_time']:.2f} с CPU, "
+          f"полнота активации {gated_recall:.1%}, прогон {gated_elapsed:.1f} с")
+    print(f"Пропущено аудио: {gated['skipped_fraction']:.1%}, "
+          f"сэкономлено CPU: {baseline['decode_time'] - gated['decode_time']:.2f} с "
+          f"(оценка по стоимости чанка: {gated['cpu_saved']:.2f} с)")
+    if gated_recall < baseline_recall:
+        print("ВНИМАНИЕ: VAD снижает полноту активации")
+
+
+if __name__ == '__main__':
+    main()
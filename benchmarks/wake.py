@@ -0,0 +1,93 @@
+"""Ложные активации на записях без ключевого слова: подстрока в тексте против целых слов с уверенностью
+
+    python -m benchmarks.wake noise/manifest.jsonl --model models/vosk-model-small-ru-0.22
+
+Корпус - речь и шум без обращения к ассистенту («диван», «ванна», телевизор).
+Записи, в разметке которых ключевое слово есть целым словом, пропускаются.
+Для каждого результата распознавания прежнее правило (ключевое слово
+подстрокой, команда - текст без подстрок ключевых слов) сравнивается с
+WakeWordDetector; лишний вызов команды - это ответ «Не понял» или действие.
+"""
+import argparse
+import contextlib
+import io
+import re
+
+from audio_source import FileSource
+from main import SAMPLE_RATE, CHUNK_SIZE, KEYWORDS, WAKE_MIN_CONFIDENCE
+from metrics import Metrics
+from wake_word import WakeWordDetector
+from benchmarks.harness import StubAssistant, load_corpus, use_model, replay
+
+
+def legacy_wake(text):
+    """Прежнее правило: (ключевое слово найдено, команда после удаления ключевых слов)"""
+    return any(keyword in text for keyword in KEYWORDS), re.sub('|'.join(KEYWORDS), '', text).strip()
+
+
+class WakeProbe(StubAssistant):
+    """Запоминает результаты распознавания вместе с режимом, в котором они получены"""
+    def __init__(self, audio_source, metrics):
+        self.results = []  # (активный режим, результат)
+        super().__init__(audio_source, metrics=metrics)
+
+    def handle_result(self, result):
+        self.results.append((self.is_active, result))
+        super().handle_result(result)
+
+
+def label_rates(entries, detector):
+    """Сработавшие активации по тексту разметки: прежнее правило и детектор"""
+    legacy = new = 0
+    for entry in entries:
+        text = entry.get('text', '').lower()
+        legacy += legacy_wake(text)[0]
+        match = detector.detect({'text': text})
+        new += match is not None and match.accepted
+    return legacy, new
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', help="Манифест JSONL или папка с WAV")
+    parser.add_argument('--model', help="Путь к папке модели Vosk")
+    parser.add_argument('--gap', type=float, default=1.0, help="Тишина после каждой записи, с")
+    parser.add_argument('--min-confidence', type=float, default=WAKE_MIN_CONFIDENCE,
+                        help="Порог уверенности ключевого слова")
+    args = parser.parse_args()
+
+    use_model(args.model)
+    detector = WakeWordDetector(KEYWORDS, args.min_confidence)
+    entries = [e for e in load_corpus(args.corpus)
+               if not set(e.get('text', '').lower().split()) & set(KEYWORDS)]
+
+    source = FileSource([e['audio'] for e in entries], SAMPLE_RATE, CHUNK_SIZE, gap=args.gap)
+    metrics = Metrics()
+    with contextlib.redirect_stdout(io.StringIO()):
+        assistant = WakeProbe(source, metrics)
+        assistant.wake_detector = detector
+        replay(assistant)
+    hours = source.duration / 3600 or 1
+
+    legacy_wakes = legacy_dispatches = 0
+    for active, result in assistant.results:
+        found, command = legacy_wake(result.get('text', '').strip().lower())
+        legacy_wakes += found and not active
+        legacy_dispatches += bool(command) if found else active
+    rejected = assistant.wake_counts['low_confidence'].value
+    new_wakes, new_dispatches = len(assistant.wakes), len(assistant.dispatches)
+
+    print(f"Записей без ключевого слова: {len(entries)}, аудио {source.duration / 60:.1f} мин, "
+          f"результатов распознавания: {len(assistant.results)}")
+    print(f"{'правило':<22}{'активаций':>11}{'в час':>9}{'лишних команд':>15}{'в час':>9}")
+    for title, wakes, dispatches in (("подстрока (прежнее)", legacy_wakes, legacy_dispatches),
+                                     ("целые слова", new_wakes, new_dispatches)):
+        print(f"{title:<22}{wakes:>11}{wakes / hours:>9.1f}{dispatches:>15}{dispatches / hours:>9.1f}")
+    print(f"Отклонено по уверенности (< {args.min_confidence:g}): {rejected:.0f}, "
+          f"лишних команд меньше на {legacy_dispatches - new_dispatches}")
+    legacy, new = label_rates(entries, detector)
+    print(f"По тексту разметки: подстрока срабатывает на {legacy} записях, целые слова - на {new}")
+
+
+if __name__ == '__main__':
+    main()
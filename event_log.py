@@ -0,0 +1,182 @@
+"""Журнал событий: строки JSON в файл и цветная консоль, вывод - в фоновом потоке"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+COLORS = {'green': "\033[32m", 'bold_green': "\033[1;32m", 'red': "\033[31m"}
+
+
+class EventLog:
+    """События ставятся в ограниченную очередь, файл и консоль обслуживает поток журнала
+
+    write() не форматирует и не ждет вывода, поэтому медленная консоль или
+    заполненный канал задерживают только поток журнала. Если очередь
+    заполнена, событие отбрасывается и учитывается в dropped. В файле каждое
+    событие - строка JSON с монотонным временем (разности между событиями не
+    зависят от перевода часов), временем на часах, уровнем, этапом (по умолчанию
+    имя потока) и номером сессии. Когда файл превышает max_bytes, он
+    переименовывается в .1, прежние - в .2 и так далее до backups.
+    """
+    def __init__(self, path=None, max_bytes=5 * 1024 * 1024, backups=3, console=True, capacity=4096):
+        self.path = path  # None - без файла
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.console = console  # Дублировать события в консоль (sys.stdout на момент события)
+        self.capacity = capacity
+        self.written = 0  # Сколько событий выведено
+        self.dropped = 0  # Сколько событий отброшено из-за заполненной очереди
+        self._queue = deque()  # (монотонное время, время, уровень, этап, сессия, текст, цвет, поля, консоль)
+        self._cond = threading.Condition()
+        self._busy = False  # Поток журнала выводит очередную порцию
+        self._running = False
+        self._thread = None
+        self._file = None
+        self._size = 0
+        atexit.register(self.close)  # События последних секунд не теряются при выходе
+
+    def configure(self, path=None, max_bytes=None, backups=None, console=None):
+        """Меняет файл и консоль; события, поставленные раньше, выводятся по старым настройкам"""
+        self.flush()
+        with self._cond:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.path = path
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if backups is not None:
+                self.backups = backups
+            if console is not None:
+                self.console = console
+
+    def write(self, message, level='info', stage=None, session=None, color=None, **fields):
+        """Ставит событие в очередь и сразу возвращается"""
+        record = (time.monotonic(), time.time(), level, stage or threading.current_thread().name, session,
+                  message, color, fields, sys.stdout if self.console else None)
+        with self._cond:
+            if len(self._queue) >= self.capacity:
+                self.dropped += 1
+                return
+            self._queue.append(record)
+            if not self._running:
+                self._running = True
+                self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+                self._thread.start()
+            elif len(self._queue) == 1:
+                self._cond.notify()  # Поток журнала ждет только на пустой очереди
+
+    def flush(self, timeout=None):
+        """Ждет, пока все поставленные события будут выведены; False - не дождались"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while (self._queue or self._busy) and self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self):
+        """Выводит оставшееся и останавливает поток; следующее событие запустит его снова"""
+        self.flush(timeout=5)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._queue:
+                    self._cond.wait()
+                if not self._queue:
+                    break
+                batch = list(self._queue)
+                self._queue.clear()
+                self._busy = True
+            try:
+                self._emit(batch)
+            finally:
+                with self._cond:
+                    self.written += len(batch)
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _emit(self, batch):
+        streams = set()
+        for monotonic, wall, level, stage, session, message, color, fields, stream in batch:
+            moment = datetime.fromtimestamp(wall)
+            if self.path:
+                event = {'time': moment.isoformat(timespec='milliseconds'), 'mono': round(monotonic, 6),
+                         'level': level, 'stage': stage, 'session': session, 'message': message}
+                event.update(fields)
+                self._write_line(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+            if stream is not None:
+                line = f"[{moment.strftime('%H:%M:%S')}] "
+                if session is not None:
+                    line += f"#{session} "
+                line += message
+                color = color or ('red' if level == 'error' else None)
+                if color in COLORS:
+                    line = f"{COLORS[color]}{line}\033[0m"
+                try:
+                    stream.write(line + "\n")
+                    streams.add(stream)
+                except (OSError, ValueError):
+                    pass  # Консоль закрыта - событие остается только в файле
+        for stream in streams:
+            try:
+                stream.flush()
+            except (OSError, ValueError):
+                pass
+        if self._file is not None:
+            self._file.flush()
+
+    def _write_line(self, line):
+        data = line.encode('utf-8')
+        try:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, 'ab')
+                self._size = self._file.tell()
+            if self.max_bytes and self._size and self._size + len(data) > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._size += len(data)
+        except OSError:
+            pass  # Диск недоступен: журнал не должен останавливать ассистента
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, 'ab')
+        self._size = 0
+
+
+EVENT_LOG = EventLog()  # Журнал процесса; файл задается в main.py (LOG_FILE)
+
+
+def log_event(message, level='info', stage=None, color=None, session=None, **fields):
+    """Событие в журнал процесса (без ожидания вывода)"""
+    EVENT_LOG.write(message, level, stage, session, color, **fields)
@@ -0,0 +1,163 @@
+"""Маршрутизатор команд: триггеры проиндексированы по первому слову"""
+import re
+
+
+def intent(name, triggers, priority=0, early=True):
+    """Декоратор: объявляет метод ассистента обработчиком команды
+
+    triggers - фразы, по которым команда узнается в тексте;
+    priority - при нескольких найденных командах выигрывает наибольший;
+    early - можно ли выполнять команду по промежуточному результату:
+    True, False или кортеж слотов, которые для этого должны быть заполнены.
+    """
+    def decorator(func):
+        func.intent = (name, list(triggers), priority, early)
+        return func
+    return decorator
+
+
+class Intent:
+    """Команда: имя, фразы-триггеры, приоритет и обработчик"""
+    def __init__(self, name, triggers, priority, handler, early=True):
+        self.name = name
+        self.triggers = triggers
+        self.priority = priority
+        self.handler = handler
+        self.early = early
+
+
+class IntentMatch:
+    """Результат разбора текста: выигравшая команда, слоты и число найденных команд"""
+    def __init__(self, intent, slots, candidates):
+        self.intent = intent
+        self.slots = slots
+        self.candidates = candidates
+
+    @property
+    def name(self):
+        return self.intent.name if self.intent else None
+
+    def is_complete(self):
+        """Однозначная команда со всеми слотами, нужными для досрочного вызова"""
+        if self.intent is None or self.candidates != 1 or not self.intent.early:
+            return False
+        if self.intent.early is True:
+            return True
+        return all(self.slots.get(slot) is not None for slot in self.intent.early)
+
+
+class IntentRouter:
+    """Находит команду и ее параметры за один проход по словам текста
+
+    Триггеры всех команд проиндексированы по первому слову: в начале каждого
+    слова текста словарь отдает только фразы, которые могут там начинаться,
+    поэтому скорость разбора не зависит от числа команд. Числа и единицы
+    времени отмечаются в том же проходе, затем выбирается команда
+    с наибольшим приоритетом.
+    """
+    UNITS = {'минут': 'минут', 'секунд': 'секунд'}
+    WORD = re.compile(r"\w+")
+    DIGITS = re.compile(r"\d+")
+
+    def __init__(self, number_words):
+        self.number_words = number_words
+        self.intents = {}
+        self.index = None
+
+    @classmethod
+    def from_handlers(cls, owner, number_words):
+        """Собирает команды из методов owner, помеченных декоратором intent
+
+        owner - экземпляр (обработчики привязаны к нему) или класс (только разбор).
+        """
+        router = cls(number_words)
+        owner_type = owner if isinstance(owner, type) else type(owner)
+        for attr in dir(owner_type):
+            spec = getattr(getattr(owner_type, attr), 'intent', None)
+            if spec:
+                name, triggers, priority, early = spec
+                router.register(name, triggers, priority, getattr(owner, attr), early)
+        router.compile()
+        return router
+
+    def register(self, name, triggers, priority, handler, early=True):
+        self.intents[name] = Intent(name, triggers, priority, handler, early)
+        self.index = None
+
+    def compile(self):
+        """Строит индекс: первое слово триггера -> [(порядок, фраза, команда)]"""
+        # Длинные фразы раньше коротких, чтобы в одной позиции
+        # "сколько времени осталось" выигрывало у "сколько времени"
+        phrases = sorted(((phrase, item) for item in self.intents.values() for phrase in item.triggers),
+                         key=lambda pair: len(pair[0]), reverse=True)
+        self.index = {}
+        for order, (phrase, item) in enumerate(phrases):
+            self.index.setdefault(phrase.split(" ", 1)[0], []).append((order, phrase, item))
+        # Однословный триггер может быть началом слова ("диск" в "диски", "час" в "часа"),
+        # поэтому в слове проверяются начала всех длин, с которых начинаются триггеры
+        self.prefix_lengths = sorted({len(word) for word in self.index})
+
+    def find_trigger(self, text, start, word):
+        """Самая длинная фраза-триггер, которая начинается с позиции start, или None"""
+        found = None
+        for length in self.prefix_lengths:
+            if length > len(word):
+                break
+            for order, phrase, item in self.index.get(word[:length], ()):
+                if text.startswith(phrase, start):
+                    if found is None or order < found[0]:
+                        found = (order, phrase, item)
+                    break
+        return found
+
+    def match(self, text):
+        """Возвращает IntentMatch для текста (intent=None, если команда не найдена)"""
+        if self.index is None:
+            self.compile()
+
+        best = None
+        best_span = None
+        hits = set()
+        digits = word_number = unit = None
+        covered = 0  # Конец последнего найденного триггера: слова внутри него не разбираются
+        # Триггер должен начинаться с начала слова: "час" не находится в "сейчас"
+        for m in self.WORD.finditer(text):
+            start, word = m.start(), m.group()
+            if start < covered:
+                continue
+            found = self.find_trigger(text, start, word)
+            if found is not None:
+                _, phrase, item = found
+                covered = start + len(phrase)
+                hits.add(item.name)
+                if best is None or item.priority > best.priority:
+                    best, best_span = item, (start, covered)
+                continue
+            number = self.DIGITS.match(word)
+            if number:
+                if digits is None:
+                    digits = int(number.group())
+            elif word in self.number_words:
+                if word_number is None:
+                    word_number = self.number_words[word]
+            elif unit is None:
+                unit = next((self.UNITS[name] for name in self.UNITS if word.startswith(name)), None)
+
+        slots = {
+            'text': text,
+            'number': digits if digits is not None else word_number,
+            'unit': unit,
+            'query': None,
+        }
+        if best is not None:
+            query = (text[:best_span[0]] + " " + text[best_span[1]:]).split()
+            slots['query'] = " ".join(query)
+        return IntentMatch(best, slots, len(hits))
+
+    def vocabulary(self):
+        """Все слова триггеров - для грамматики распознавателя"""
+        words = set()
+        for item in self.intents.values():
+            for phrase in item.triggers:
+                words.update(re.findall(r'[а-яёa-z]+', phrase))
+        return words
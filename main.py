@@ -1,37 +1,102 @@
+import time
+STARTED = time.perf_counter()  # Начало импорта - отсчет для отчета о запуске
 import json
-import queue
 import threading
-import time
 from datetime import datetime
-import pyaudio
 from vosk import Model, KaldiRecognizer, SetLogLevel
 SetLogLevel(-1)  # Отключаем логирование Vosk
+try:
+    # AcceptWaveform принимает только bytes (cffi отклоняет memoryview и bytearray);
+    # C API vosk получает буфер кольца через ffi.from_buffer без копии
+    from vosk import _c as vosk_c, _ffi as vosk_ffi
+except ImportError:
+    vosk_c = vosk_ffi = None
 import os
-import win32com.client
 import sys
-import re
 import random
-import ctypes
-from ctypes import cast, POINTER
-from comtypes import CLSCTX_ALL
-from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
-import zipfile
-import shutil
-from tqdm import tqdm
-import requests
-import webbrowser
-import psutil
-import subprocess
+from collections import deque
+# Зависимости отдельных команд (pycaw, psutil, webbrowser, requests, tqdm)
+# импортируются при первом использовании, чтобы не задерживать запуск
 from datetime import datetime, timedelta
+from audio_source import MicrophoneSource, input_devices
+from ring_buffer import RingBuffer
+from vad import VoiceActivityDetector
+from intents import IntentRouter, intent
+from scheduler import TimerScheduler
+from model_cache import ModelCache
+from metrics import METRICS, MetricsExporter
+from event_log import EVENT_LOG, log_event
+from system_monitor import SystemMonitor
+from action_executor import ActionExecutor
+from wake_word import WakeWordDetector
+from response_cache import ResponseCache
+from speech import SpeechOutput, SapiBackend, NullBackend, PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_ALARM
 
 # Конфигурационные параметры
 MODELS_DIR = "models"  # Папка для хранения моделей распознавания речи
 MODEL_NAME = "vosk-model-small-ru-0.22"  # Название модели Vosk
 MODEL_URL = "https://alphacephei.com/vosk/models/vosk-model-small-ru-0.22.zip"  # URL для скачивания модели
+MODEL_SHA256 = None  # SHA-256 архива модели; None - взять из models/SHA256SUMS, а без него архив не проверяется
+MODEL_STREAM_EXTRACT = True  # Распаковывать архив модели во время скачивания
+# Язык распознавания -> модель Vosk; модели других языков скачиваются при первом переключении
+LANGUAGES = {
+    'ru': MODEL_NAME,
+    'en': "vosk-model-small-en-us-0.15",
+}
+LANGUAGE = 'ru'  # Язык распознавания при запуске
+MODEL_CACHE_MEMORY = 1024 * 1024 * 1024  # Сколько памяти могут занимать загруженные модели
+RECOGNITION_WORKERS = 0  # Процессов для декодирования (0 - декодировать в процессе ассистента)
 SAMPLE_RATE = 16000  # Частота дискретизации аудио
-CHUNK_SIZE = 4000  # Размер чанка для аудиопотока
-KEYWORDS = ["квант", "кван", "ван"]  # Ключевые слова для активации
+FRAME_MS = 20  # Кадр захвата с микрофона, мс (10-50): PyAudio отдает его сразу, без блокирующего чтения
+CHUNK_SIZE = 1600  # Сколько сэмплов отдавать распознавателю за раз (100 мс): меньше - быстрее решение, больше - меньше вызовов
+CHUNK_BYTES = CHUNK_SIZE * 2  # Размер чанка в байтах (16 бит на сэмпл)
+INPUT_DEVICE = None  # Микрофон: номер устройства или часть его названия (None - устройство по умолчанию)
+CAPTURE_NATIVE = True  # Открывать микрофон с его частотой и каналами, приводить к SAMPLE_RATE самим (False - драйвером)
+BUFFER_SECONDS = 5  # Емкость буфера аудио между захватом и распознаванием
+PREROLL_SECONDS = 1.0  # Сколько аудио сохранять при активации, чтобы не обрезать команду
+VAD_ENABLED = True  # Не отдавать распознавателю тишину и фоновый шум
+VAD_PREPAD_SECONDS = 0.3  # Сколько аудио до начала речи вернуть распознавателю
+MAX_UTTERANCE_SECONDS = 10  # Сколько аудио фразы хранить для повторного распознавания
+# Распознаватели пересоздаются между фразами в режиме ожидания после стольких фраз
+# или секунд декодированного аудио (None - не пересоздавать): их память не растет неделями
+RECOGNIZER_RECYCLE_UTTERANCES = 2000
+RECOGNIZER_RECYCLE_SECONDS = 6 * 3600
+# Формы слов, которых нет в регулярных выражениях команд, но которые нужны грамматике
+EXTRA_COMMAND_WORDS = ["минута", "минуты", "минуту", "минут", "секунда", "секунды", "секунду", "секунд"]
+FREE_TEXT_COMMANDS = ["search"]  # Команды с произвольным текстом: распознаются без грамматики
+EARLY_DISPATCH = False  # Выполнять команду по стабильному промежуточному результату
+EARLY_DISPATCH_STABLE_CHUNKS = 5  # Сколько чанков подряд (по CHUNK_SIZE) промежуточный текст не должен меняться
+KEYWORDS = ["квант", "кван", "ван", "quant"]  # Ключевые слова для активации (для всех языков)
+WAKE_MIN_CONFIDENCE = 0.7  # Ниже этой уверенности Vosk в ключевом слове активации нет
 ACTIVE_TIMEOUT = 7  # Таймаут неактивности в секундах
+RESPONSE_CACHE_DIR = os.path.join("cache", "responses")  # Озвученные неизменные ответы (None - без кэша)
+RESPONSE_CACHE_MEMORY = 8 * 1024 * 1024  # Сколько байт озвученных ответов держать в памяти
+MUTE_WAKE_WHILE_SPEAKING = False  # Не реагировать на ключевое слово, пока ассистент говорит
+SOFT_RESTART = True  # Перезапуск без выхода из процесса: модель и таймеры сохраняются
+METRICS_PORT = 9108  # Порт метрик Prometheus на localhost (None - без HTTP)
+METRICS_SNAPSHOT = os.path.join("cache", "metrics.json")  # Снимок метрик в JSON (None - без снимка)
+METRICS_SNAPSHOT_SECONDS = 60  # Как часто сохранять снимок метрик
+SYSTEM_STATUS_TTL = 30  # Как часто обновлять состояние системы (диски, процессор, память, батарея), с
+SYSTEM_MOUNT_TIMEOUT = 1.0  # Сколько ждать ответа одного диска при опросе, с
+ACTION_WORKERS = 2  # Потоки для действий команд (программы, браузер, громкость)
+ACTION_QUEUE = 8  # Сколько действий может ждать выполнения; лишние отклоняются
+ACTION_TIMEOUT = 10.0  # Через сколько секунд сообщить, что действие не выполнено
+LOG_FILE = os.path.join("logs", "events.jsonl")  # Журнал событий, строки JSON (None - без файла)
+LOG_MAX_BYTES = 5 * 1024 * 1024  # Размер файла журнала, после которого он переименовывается в .1
+LOG_BACKUPS = 3  # Сколько прежних файлов журнала хранить
+LOG_CONSOLE = True  # Выводить события и в консоль
+
+# Словарь для преобразования слов в числа
+NUMBER_WORDS = {
+    'ноль': 0, 'один': 1, 'два': 2, 'три': 3, 'четыре': 4,
+    'пять': 5, 'шесть': 6, 'семь': 7, 'восемь': 8, 'девять': 9,
+    'десять': 10, 'одиннадцать': 11, 'двенадцать': 12, 'тринадцать': 13,
+    'четырнадцать': 14, 'пятнадцать': 15, 'шестнадцать': 16,
+    'семнадцать': 17, 'восемнадцать': 18, 'девятнадцать': 19,
+    'двадцать': 20, 'тридцать': 30, 'сорок': 40,
+    'пятьдесят': 50, 'шестьдесят': 60, 'семьдесят': 70,
+    'восемьдесят': 80, 'девяносто': 90, 'сто': 100
+}
 
 # Пути к программам и браузерам
 BROWSER_PATH = 'C:/Program Files/Google/Chrome/Application/chrome.exe %s'
@@ -40,75 +105,101 @@ PROGRAM_PATHS = {
     'telegram': r'C:\Users\User\AppData\Roaming\Telegram Desktop\Telegram.exe',
     'yandex': r'C:\Users\User\AppData\Local\Yandex\YandexBrowser\Application\browser.exe'
 }
-browser = webbrowser.get(BROWSER_PATH)
 
-def print_with_time(message, color=None):
-    """Выводит сообщение с текущим временем и опциональным цветом"""
-    current_time = datetime.now().strftime("%H:%M:%S")
-    colored_message = f"[{current_time}] {message}"
-    
-    if color == "green":
-        colored_message = f"\033[32m{colored_message}\033[0m"
-    elif color == "bold_green":
-        colored_message = f"\033[1;32m{colored_message}\033[0m"
-    
-    print(colored_message)
+def format_duration(seconds):
+    """Форматирует длительность: '5 минут 3 секунд' или '30 сек'"""
+    seconds = int(round(seconds))
+    if seconds >= 60:
+        minutes, seconds = divmod(seconds, 60)
+        if seconds > 0:
+            return f"{minutes} минут {seconds} секунд"
+        return f"{minutes} минут"
+    return f"{seconds} сек"
 
-def download_file(url, filename):
-    """Скачивает файл с отображением прогресса через tqdm"""
-    response = requests.get(url, stream=True)
-    total_size = int(response.headers.get('content-length', 0))
-    
-    with open(filename, 'wb') as f, tqdm(
-        desc=filename,
-        total=total_size,
-        unit='iB',
-        unit_scale=True,
-        unit_divisor=1024,
-    ) as bar:
-        for data in response.iter_content(chunk_size=1024):
-            size = f.write(data)
-            bar.update(size)
-
-def ensure_model_exists():
-    """Проверяет наличие модели речи и скачивает при необходимости"""
-    model_path = os.path.join(MODELS_DIR, MODEL_NAME)
-    os.makedirs(MODELS_DIR, exist_ok=True)
+cli_settings = {}  # Настройки из командной строки (--device): сильнее значений в файле и при перечитывании
+
+
+def read_settings(path=__file__):
+    """Перечитывает настройки - константы верхнего уровня - из исходного файла
+
+    Выполняются только присваивания имен в верхнем регистре: импорты, классы
+    и загруженные модули остаются прежними; заданное в командной строке
+    (cli_settings) не перезаписывается. Возвращает измененные настройки.
+    """
+    import ast
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    body = [node for node in tree.body if isinstance(node, ast.Assign)
+            and all(isinstance(target, ast.Name) and target.id.isupper() and target.id != 'STARTED'
+                    for target in node.targets)]
+    namespace = {'os': os}
+    exec(compile(ast.Module(body=body, type_ignores=[]), path, 'exec'), namespace)
+    namespace.update(cli_settings)
+    changed = {name: value for name, value in namespace.items()
+               if name.isupper() and globals().get(name) != value}
+    globals().update(changed)
+    return changed
+
+
+def ensure_model_exists(name=None):
+    """Проверяет наличие модели речи (по умолчанию MODEL_NAME) и скачивает при необходимости"""
+    name = name or MODEL_NAME
+    model_path = os.path.join(MODELS_DIR, name)
     
     if os.path.exists(model_path):
-        print_with_time("Модель для распознавания речи готова", color="green")
+        log_event("Модель для распознавания речи готова", color="green")
         return True
     
-    print_with_time(f"Модель {MODEL_NAME} не найдена, начинаю загрузку...", color="green")
+    log_event(f"Модель {name} не найдена, начинаю загрузку...", color="green")
     
     try:
-        zip_path = os.path.join(MODELS_DIR, "temp_model.zip")
-        download_file(MODEL_URL, zip_path)
+        from tqdm import tqdm
+        from model_download import install_model, read_manifest
+        # Архивы других моделей лежат рядом с архивом основной
+        url = MODEL_URL if name == MODEL_NAME else f"{MODEL_URL.rsplit('/', 1)[0]}/{name}.zip"
+        sha256 = MODEL_SHA256 if name == MODEL_NAME else None
+        sha256 = sha256 or read_manifest(os.path.join(MODELS_DIR, "SHA256SUMS")).get(name + ".zip")
+        if not sha256:
+            log_event("Контрольная сумма модели не задана (MODEL_SHA256 или models/SHA256SUMS), "
+                      "архив не проверяется", "warning")
         
-        # Распаковываем архив с моделью
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            file_list = zip_ref.namelist()
-            for file in tqdm(file_list, desc="Распаковка"):
-                zip_ref.extract(file, MODELS_DIR)
-        
-        os.remove(zip_path)
-        
-        # Проверяем корректность распаковки
-        if not os.path.exists(model_path):
-            extracted_dir = os.path.join(MODELS_DIR, file_list[0].split('/')[0])
-            if os.path.exists(extracted_dir):
-                shutil.move(extracted_dir, model_path)
+        with tqdm(desc=name, unit='iB', unit_scale=True, unit_divisor=1024) as bar:
+            def progress(done, total):
+                bar.total = total
+                bar.update(done - bar.n)
+            
+            # Обрыв не теряет скачанное: повторный запуск докачает архив
+            install_model(url, MODELS_DIR, name, sha256,
+                          stream_extract=MODEL_STREAM_EXTRACT, on_progress=progress)
         
-        print_with_time("Модель для распознавания готова", color="green")
+        log_event("Модель для распознавания готова", color="green")
         return True
     
     except Exception as e:
-        print_with_time(f"Ошибка при загрузке модели: {e}")
+        log_event(f"Ошибка при загрузке модели: {e}", "error")
         return False
 
+def open_model(name):
+    """Загружает модель с диска, при необходимости скачав ее (вызывается кэшем моделей)"""
+    if not ensure_model_exists(name):
+        raise Exception("Не удалось загрузить модель распознавания")
+    model_path = os.path.join(MODELS_DIR, name)
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Модель не найдена: {model_path}")
+    
+    started = time.perf_counter()
+    model = Model(model_path)
+    elapsed = time.perf_counter() - started
+    log_event(f"Модель {name} загружена за {elapsed:.1f} с", color="green", model=name, seconds=round(elapsed, 3))
+    return model
+
+
 class VolumeController:
     """Контроллер громкости системы через Windows API"""
     def __init__(self):
+        from ctypes import cast, POINTER
+        from comtypes import CLSCTX_ALL
+        from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
         self.devices = AudioUtilities.GetSpeakers()
         self.interface = self.devices.Activate(
             IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
@@ -126,513 +217,1137 @@ class VolumeController:
 
 class VoiceAssistant:
     """Основной класс голосового ассистента"""
-    def __init__(self):
+    # Фиксированные ответы команд
+    RESPONSES = {
+        'greeting': ["Приветствую!", "Здравствуйте!", "Привет!"],
+        'weather': [
+            "Посмотрите погоду в приложении",
+            "Не могу узнать погоду, проверьте сами",
+            "Погоду лучше уточнить в интернете"
+        ],
+        'thanks': ["Всегда пожалуйста!", "Не за что!", "Рад помочь!"],
+        'help': [
+            "Команды: время, погода, перезагрузка. Скажите 'квант' перед командой.",
+            "Просто скажите 'квант' и что вам нужно: время, погода, громкость и т.д."
+        ],
+        'search': ["Ищу информацию в интернете"],
+        'open_paint': ["Открываю Paint"],
+        'open_telegram': ["Открываю Telegram"],
+        'open_yandex': ["Открываю Яндекс Браузер"],
+        'deepseek_search': ["Открываю DeepSeek в браузере"],
+        'timer': [
+            "Таймер {}",
+        ],
+        'restart': ["Выполняю перезапуск"],
+        'reload': ["Перечитываю настройки"],
+        'default': ["Не понял", "Повторите, пожалуйста"]
+    }
+    # Другие неизменные фразы: их аудио тоже берется из кэша
+    STATIC_PHRASES = ["Готов", "Режим ожидания", "Нет активных таймеров", "Назовите номер таймера",
+                      "Что нужно найти?", "Сколько времени поставить на таймер? (например, 5 минут или 30 секунд)",
+                      "Данные о системе еще собираются", "Не удалось открыть браузер",
+                      "Не удалось узнать громкость", "Не удалось изменить громкость"]
+    # Неизменные начала фраз с числами: начало из кэша, остальное синтезируется
+    PHRASE_PREFIXES = ["Громкость установлена на", "Текущая громкость", "До таймера", "Таймер", "Таймеры", "Диски:",
+                       "Язык распознавания:"]
+    # Слова команды смены языка -> язык
+    LANGUAGE_WORDS = {'английский': 'en', 'english': 'en', 'русский': 'ru', 'russian': 'ru'}
+    LANGUAGE_NAMES = {'ru': "русский", 'en': "английский"}
+    TIMERS_ENV = "QUANT_TIMERS"  # Переменная окружения с таймерами при перезапуске через exec
+    JOIN_TIMEOUT = 5  # Сколько ждать потоки захвата и распознавания при выходе, с (потоки - демоны)
+    session_id = None  # Номер сессии сервера распознавания - для журнала (см. asr_server.py)
+
+    def __init__(self, audio_source=None, models=None, language=None, pool=None, metrics=None,
+                 system_monitor=None):
         self.start_time = datetime.now()
-        print_with_time("Запуск ассистента", color="bold_green")
-        
-        # Проверяем наличие модели распознавания речи
-        if not ensure_model_exists():
-            raise Exception("Не удалось загрузить модель распознавания")
+        init_started = time.perf_counter()
+        # Время этапов запуска: этап -> (начало от STARTED, длительность), в секундах
+        self.startup_times = {'imports': (0.0, init_started - STARTED)}
+        self.log("Запуск ассистента", color="bold_green")
         
-        # Очередь для аудиоданных между потоками
-        self.audio_queue = queue.Queue(maxsize=20)
+        # Источник аудио: по умолчанию микрофон, для тестов - запись
+        self.audio_source = audio_source or MicrophoneSource(SAMPLE_RATE, SAMPLE_RATE * FRAME_MS // 1000, INPUT_DEVICE,
+                                                                  CAPTURE_NATIVE)
+        self.vad_skipped_bytes = 0  # Аудио, не отданное распознавателю
+        # Время CPU в AcceptWaveform и объем декодированного аудио по режимам
+        self.decode_stats = {mode: [0.0, 0] for mode in ('standby', 'active', 'open')}
         self.is_running = True  # Флаг работы основного цикла
-        self.is_active = False  # Флаг активного режима (после ключевого слова)
         self.last_activity = 0  # Время последней активности
+        # Основной цикл спит на условии до срока отключения или до остановки
+        self.state = threading.Condition()
+        self.loop_wakeups = 0  # Сколько раз просыпался основной цикл
+        self.recognition_wakeups = 0  # Пробуждения распознавания до последнего перезапуска
         self.last_command_time = 0  # Время последней команды
         self.min_command_interval = 1.0  # Минимальный интервал между командами
+        self.restart_requested = False  # Основной цикл должен пересобрать конвейер (см. run())
+        self.reload_requested = False  # ... и перед этим перечитать настройки
+        self.restart_times = []  # Длительность мягких перезапусков, с
+        # Метрики переживают мягкий перезапуск; у сессий сервера реестр общий
+        self.metrics = metrics or METRICS
+        self.init_metrics()
+        self.result_time = None  # Когда получен результат фразы - для задержки до выполнения команды
+        self.command_started = None  # Начало обработки текущей команды (time.monotonic()) - для ответов действий
+        # Состояние системы опрашивается в фоне (запускается в run()), команда читает готовый снимок
+        self.system_monitor = system_monitor or SystemMonitor(SYSTEM_STATUS_TTL, SYSTEM_MOUNT_TIMEOUT,
+                                                              metrics=self.metrics)
+        # Модели загружаются при первом обращении и общие для всех распознавателей
+        # (и для всех ассистентов, которым передан один кэш - см. asr_server.py)
+        self.models = models or ModelCache(open_model, MODEL_CACHE_MEMORY, MODELS_DIR, self.metrics)
+        self.language = language or LANGUAGE
+        self.pending_language = None  # (язык, модель), загруженные в фоне для потока распознавания
+        # С пулом процессов (recognition_pool.py) распознаватели живут в процессе сессии
+        self.pool = pool
+        self.pool_session = None
+        self.init_pipeline()
         
-        # Инициализация голосового движка (SAPI)
-        self.voice_engine_ready = False
-        self.speaker_lock = threading.Lock()  # Блокировка для синхронизации речи
+        # Речь выводится отдельным потоком (SAPI), распознавание при этом не останавливается
         self.init_voice_engine()
         
-        self.volume_controller = VolumeController()
-        self.timers = {}  # Словарь для хранения активных таймеров
-        self.timer_counter = 0  # Счетчик для идентификаторов таймеров
+        self.volume_controller = None  # См. volume()
+        self.browser = None  # См. open_url()
+        # Все таймеры обслуживает один поток планировщика
+        self.scheduler = TimerScheduler(self.on_timer_fired)
+        self.restore_timers()
+        self.scheduler.start()
+        # Программы, браузер и громкость не задерживают поток распознавания
+        self.actions = ActionExecutor(ACTION_WORKERS, ACTION_QUEUE, ACTION_TIMEOUT, self.metrics)
         
         # Словарь для преобразования слов в числа
-        self.number_words = {
-            'ноль': 0, 'один': 1, 'два': 2, 'три': 3, 'четыре': 4,
-            'пять': 5, 'шесть': 6, 'семь': 7, 'восемь': 8, 'девять': 9,
-            'десять': 10, 'одиннадцать': 11, 'двенадцать': 12, 'тринадцать': 13,
-            'четырнадцать': 14, 'пятнадцать': 15, 'шестнадцать': 16,
-            'семнадцать': 17, 'восемнадцать': 18, 'девятнадцать': 19,
-            'двадцать': 20, 'тридцать': 30, 'сорок': 40,
-            'пятьдесят': 50, 'шестьдесят': 60, 'семьдесят': 70,
-            'восемьдесят': 80, 'девяносто': 90, 'сто': 100
-        }
+        self.number_words = NUMBER_WORDS
+        
+        # Команды собираются из методов, помеченных декоратором @intent
+        self.router = IntentRouter.from_handlers(self, self.number_words)
         
-        # Инициализация распознавания речи
-        self.init_asr()
+        # Модель и аудиоустройство готовятся параллельно (голосовой движок - в своем потоке)
+        self.run_startup({'model': self.load_model, 'audio': self.audio_source.open})
         
         self.welcome_message = f"Готов. Скажите '{KEYWORDS[0]}'..."
+        self.startup_times['init'] = (init_started - STARTED, time.perf_counter() - init_started)
+
+    def log(self, message, level='info', color=None, **fields):
+        """Событие в журнал с номером сессии; вывод не задерживает вызывающий поток"""
+        log_event(message, level, color=color, session=self.session_id, **fields)
+
+    def init_metrics(self):
+        """Метрики конвейера; те, что пишутся на каждый чанк, берутся из реестра один раз"""
+        metrics = self.metrics
+        self.capture_latency = metrics.histogram(
+            'quant_capture_enqueue_seconds', "От получения чанка из источника до записи в буфер")
+        self.queue_wait = metrics.histogram(
+            'quant_queue_wait_seconds', "Сколько аудио ждало в буфере до распознавания")
+        self.queue_depth = metrics.histogram(
+            'quant_queue_depth_seconds', "Аудио в буфере, когда распознавание берет чанк",
+            buckets=(0.25, 0.5) + tuple(range(1, BUFFER_SECONDS + 1)))
+        self.accept_latency = {mode: metrics.histogram('quant_accept_waveform_seconds',
+                                                       "Время AcceptWaveform на чанк", mode=mode)
+                               for mode in self.decode_stats}
+        self.dispatch_latency = metrics.histogram(
+            'quant_result_dispatch_seconds', "От результата распознавания до выполнения команды")
+        self.first_audio_latency = {source: metrics.histogram('quant_first_audio_seconds',
+                                                              "От выполнения команды до первого звука ответа",
+                                                              source=source)
+                                    for source in ('memory', 'disk', 'synth')}
+        self.overflow_count = metrics.counter('quant_audio_overflows_total', "Чанки, не поместившиеся в буфер")
+        self.dropped_count = metrics.counter('quant_dropped_frames_total', "Сэмплы, потерянные при переполнении буфера")
+        self.reset_counts = {reason: metrics.counter('quant_recognizer_resets_total',
+                                                     "Сбросы распознавателя", reason=reason)
+                             for reason in ('mode', 'migrate', 'language', 'recycle')}
+        self.error_counts = {stage: metrics.counter('quant_errors_total', "Ошибки потоков конвейера", stage=stage)
+                             for stage in ('capture', 'recognition')}
+        self.wake_counts = {result: metrics.counter('quant_wake_words_total', "Найденные ключевые слова",
+                                                    result=result)
+                            for result in ('accepted', 'low_confidence')}
+
+    def init_pipeline(self):
+        """Буфер, VAD и состояние распознавания; создаются заново при мягком перезапуске"""
+        # Кольцевой буфер для аудиоданных между потоками
+        self.preroll_bytes = int(PREROLL_SECONDS * SAMPLE_RATE) * 2
+        self.audio_buffer = RingBuffer(BUFFER_SECONDS * SAMPLE_RATE * 2, preroll=self.preroll_bytes)
+        # (позиция конца чанка в потоке, когда записан) - для времени ожидания в буфере
+        self.enqueue_times = deque(maxlen=2 * BUFFER_SECONDS * SAMPLE_RATE // self.audio_source.chunk_size)
+        self.stream_position = 0  # Позиция в аудиопотоке (байт), до которой дошло распознавание
         
-        # Регулярные выражения для распознавания команд
-        self.patterns = {
-            'greeting': re.compile(r'(привет|здравствуй|добрый день)'),
-            'time': re.compile(r'(время|час|который час|сколько времени)'),
-            'weather': re.compile(r'(погода|погоду|прогноз погоды)'),
-            'thanks': re.compile(r'(спасибо|благодарю|пасиб|спс)'),
-            'restart': re.compile(r'(перезапуск|перезагрузись|обновись|рестарт)'),
-            'help': re.compile(r'(помощь|помоги|что ты умеешь|команды|возможности)'),
-            'volume_set': re.compile(r'(громкость на|установи громкость|поставь громкость|громкость)'),
-            'search': re.compile(r'(поиск|найди|найти)'),
-            'open_paint': re.compile(r'(paint|рисовать)'),
-            'open_telegram': re.compile(r'(telegram|телеграм|телега)'),
-            'open_yandex': re.compile(r'(яндекс|браузер)'),
-            'deepseek_search': re.compile(r'(нейронка|нейросеть)'),
-            'system_status': re.compile(r'(состояние системы|загрузка системы|диск|диски)'),
-            'timer': re.compile(r'(таймер|засеки|засечь|поставь таймер)')
-        }
+        # Детектор речи отсекает тишину перед распознавателем
+        self.vad = VoiceActivityDetector(SAMPLE_RATE) if VAD_ENABLED else None
+        self.vad_prepad_bytes = int(VAD_PREPAD_SECONDS * SAMPLE_RATE) * 2
+        # Аудио текущей фразы для повторного распознавания другой грамматикой
+        self.utterance_audio = bytearray(MAX_UTTERANCE_SECONDS * SAMPLE_RATE * 2)
+        self.utterance_length = 0
+        self.utterance_speech = False  # Распознаватель получил речь после прошлого результата
+        self.early_dispatch = EARLY_DISPATCH
+        self.utterance_dispatched = False  # Команда текущей фразы уже выполнена досрочно
+        self.partial_text = ""  # Последний промежуточный результат
+        self.partial_stable = 0  # Сколько чанков подряд он не менялся
+        self.is_active = False  # Флаг активного режима (после ключевого слова)
+        self.deadline = None  # Срок отключения активного режима по time.monotonic()
+        self.mute_wake_while_speaking = MUTE_WAKE_WHILE_SPEAKING
+        self.wake_detector = WakeWordDetector(KEYWORDS, WAKE_MIN_CONFIDENCE)
 
-    def init_asr(self):
-        """Инициализация системы распознавания речи (ASR)"""
-        model_path = os.path.join(MODELS_DIR, MODEL_NAME)
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(f"Модель не найдена: {model_path}")
+    def run_startup(self, steps):
+        """Выполняет шаги запуска параллельно и пробрасывает первую ошибку"""
+        errors = []
+        
+        def run(phase, step):
+            try:
+                self.timed(phase, step)
+            except Exception as e:
+                errors.append(e)
         
-        self.model = Model(model_path)
-        self.recognizer = KaldiRecognizer(self.model, SAMPLE_RATE)
-        self.recognizer.SetWords(True)  # Включаем распознавание отдельных слов
+        threads = [threading.Thread(target=run, args=item, name=f"startup-{item[0]}") for item in steps.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
 
-    def init_voice_engine(self):
-        """Инициализация голосового движка (SAPI) с несколькими попытками"""
-        max_retries = 3
-        for attempt in range(max_retries):
+    def timed(self, phase, step):
+        """Выполняет шаг запуска и записывает его время в startup_times"""
+        started = time.perf_counter()
+        try:
+            return step()
+        finally:
+            self.startup_times[phase] = (started - STARTED, time.perf_counter() - started)
+
+    def startup_report(self):
+        """Этапы запуска по времени начала и время до готовности сказать «Готов»"""
+        self.speech.ready.wait()
+        phases = sorted(self.startup_times.items(), key=lambda item: item[1])
+        # "Готов" можно произнести, когда готовы и распознавание, и голос
+        ready = max(start + duration for _, (start, duration) in phases)
+        return phases + [('ready', (0.0, ready))]
+
+    def load_model(self):
+        """Берет модель текущего языка и строит распознаватели"""
+        self.model = self.get_model(LANGUAGES[self.language])
+        self.init_recognizers()
+
+    def get_model(self, name):
+        """Модель из кэша моделей, а с пулом процессов - путь к модели, загруженной в процесс сессии"""
+        if self.pool is None:
+            return self.models.get(name)
+        if not ensure_model_exists(name):
+            raise Exception("Не удалось загрузить модель распознавания")
+        if self.pool_session is None:
+            self.pool_session = self.pool.session()
+        model_path = os.path.join(MODELS_DIR, name)
+        self.pool_session.load(model_path)
+        return model_path
+
+    def init_recognizers(self):
+        """Строит распознаватели на уже загруженной модели"""
+        # Распознаватели строятся один раз и переиспользуются при смене режима:
+        # в ожидании - только ключевые слова, в активном режиме - словарь команд,
+        # для произвольного текста - полный словарь модели
+        if self.pool_session is not None:
+            self.pool_session.release()  # Прежние распознаватели сессии в процессе пула
+        self.wake_recognizer = self.create_recognizer(KEYWORDS)
+        self.command_recognizer = self.create_recognizer(self.command_vocabulary())
+        self.open_recognizer = self.create_recognizer()
+        self.recognizer = self.wake_recognizer
+        # Фразы и декодированное аудио (байт) с создания распознавателей - для их пересоздания
+        self.recognizer_utterances = 0
+        self.recognizer_decoded = self.decoded_bytes()
+
+    def decoded_bytes(self):
+        """Сколько аудио (байт) отдано распознавателям во всех режимах"""
+        return sum(stats[1] for stats in self.decode_stats.values())
+
+    def recycle_due(self):
+        """Пора ли пересоздать распознаватели (см. RECOGNIZER_RECYCLE_UTTERANCES и _SECONDS)"""
+        if RECOGNIZER_RECYCLE_UTTERANCES and self.recognizer_utterances >= RECOGNIZER_RECYCLE_UTTERANCES:
+            return True
+        decoded = (self.decoded_bytes() - self.recognizer_decoded) / 2 / SAMPLE_RATE
+        return bool(RECOGNIZER_RECYCLE_SECONDS) and decoded >= RECOGNIZER_RECYCLE_SECONDS
+
+    def recycle_recognizers(self):
+        """Пересоздает распознаватели между фразами (только из потока распознавания)"""
+        self.reset_counts['recycle'].inc()
+        self.log(f"Распознаватели пересозданы после {self.recognizer_utterances} фраз",
+                 utterances=self.recognizer_utterances)
+        self.init_recognizers()
+        self.reset_utterance()
+
+    def switch_language(self, language):
+        """Переключает распознавание на другой язык без перезапуска
+
+        Модель загружается в фоне (при первом переключении - с диска или
+        из сети), распознаватели меняет поток распознавания между чанками.
+        """
+        def prepare():
             try:
-                self.speaker = win32com.client.Dispatch("SAPI.SpVoice")
-                time.sleep(1)  # Даем время на инициализацию
-                self.voice_engine_ready = True
-                print_with_time("Голосовой движок готов", color="green")
-                return
+                model = self.get_model(LANGUAGES[language])
             except Exception as e:
-                if attempt < max_retries - 1:
-                    time.sleep(2)
+                self.log(f"Модель языка {language} не загружена: {e}", "error")
+                return
+            self.pending_language = (language, model)
         
-        self.voice_engine_ready = False
-        print_with_time("Ошибка инициализации голосового движка")
+        threading.Thread(target=prepare, name=f"model-{language}", daemon=True).start()
 
-    def speak(self, text, interrupt=False):
-        """Произносит текст с возможностью прерывания текущей речи"""
-        if not self.voice_engine_ready:
-            return
-            
-        print_with_time(f"Ответ: {text}")
+    def apply_language(self):
+        """Переводит распознавание на модель нового языка (только из потока распознавания)"""
+        self.language, self.model = self.pending_language
+        self.pending_language = None
+        self.recognizer.Reset()
+        self.reset_counts['language'].inc()
+        self.init_recognizers()
+        self.reset_utterance()
+        self.log(f"Язык распознавания: {self.LANGUAGE_NAMES.get(self.language, self.language)}",
+                 color="green", language=self.language)
+
+    def create_recognizer(self, words=None):
+        """Создает распознаватель, ограниченный словами words (None - без ограничений)"""
+        grammar = None if words is None else json.dumps(sorted(set(words)) + ["[unk]"], ensure_ascii=False)
+        if self.pool_session is not None:
+            recognizer = self.pool_session.recognizer(self.model, grammar)  # Декодирует процесс пула
+        elif grammar is None:
+            recognizer = KaldiRecognizer(self.model, SAMPLE_RATE)
+        else:
+            recognizer = KaldiRecognizer(self.model, SAMPLE_RATE, grammar)
+        recognizer.SetWords(True)  # Включаем распознавание отдельных слов
+        return recognizer
+
+    def command_vocabulary(self):
+        """Слова для грамматики активного режима: из шаблонов команд и числительных"""
+        return set(KEYWORDS) | set(self.number_words) | set(EXTRA_COMMAND_WORDS) | self.router.vocabulary()
+
+    def init_volume_controller(self):
+        """Инициализация управления громкостью системы"""
+        self.volume_controller = VolumeController()
+
+    def volume(self):
+        """Контроллер громкости; создается при первой команде громкости"""
+        if self.volume_controller is None:
+            self.init_volume_controller()
+        return self.volume_controller
+
+    def open_url(self, url):
+        """Открывает адрес в браузере; браузер находится при первом вызове"""
+        if self.browser is None:
+            import webbrowser
+            self.browser = webbrowser.get(BROWSER_PATH)
+        self.browser.open(url)
+
+    def init_voice_engine(self):
+        """Запускает поток вывода речи (SAPI, а без Windows - без звука)"""
+        self.voice_started = time.perf_counter()
+        backend = SapiBackend() if sys.platform == 'win32' else NullBackend()
+        cache = None
+        if RESPONSE_CACHE_DIR and backend.renders:
+            cache = ResponseCache(RESPONSE_CACHE_DIR, RESPONSE_CACHE_MEMORY,
+                                  phrases=self.static_phrases(), prefixes=self.PHRASE_PREFIXES)
+        self.speech = SpeechOutput(backend, cache, on_ready=self.on_voice_ready)
+        self.speech.on_first_audio = self.on_first_audio
+        self.speech.start()
+
+    @classmethod
+    def static_phrases(cls):
+        """Все ответы без подстановок - их стоит озвучить один раз и хранить"""
+        phrases = set(cls.STATIC_PHRASES)
+        for variants in cls.RESPONSES.values():
+            phrases.update(text for text in variants if '{' not in text)
+        return phrases
+
+    def on_voice_ready(self, ready):
+        """Вызывается потоком вывода после открытия голосового движка"""
+        self.startup_times['voice'] = (self.voice_started - STARTED, time.perf_counter() - self.voice_started)
+        if ready:
+            self.log("Голосовой движок готов", color="green")
+        else:
+            self.log("Ошибка инициализации голосового движка", "error")
+
+    def on_first_audio(self, source, delay):
+        """Первый звук ответа на команду (вызывается потоком вывода)"""
+        histogram = self.first_audio_latency.get(source)
+        if histogram is not None:
+            histogram.observe(delay)
+
+    def speak(self, text, interrupt=False, priority=PRIORITY_NORMAL, chime=False, started=None):
+        """Ставит фразу в очередь вывода; interrupt - оборвать текущую речь
+
+        started - начало выполнения команды, на которую это ответ (time.monotonic()).
+        """
+        self.log(f"Ответ: {text}", text=text)
         self.last_command_time = time.time()  # Обновляем время последней команды
-        
-        try:
-            with self.speaker_lock:  # Блокируем для потокобезопасности
-                if interrupt and self.speaker.Status.RunningState == 2:  # 2 = speaking
-                    self.speaker.Speak("", 2)  # Прерываем текущую речь
-                
-                # Флаг 1 - асинхронное произношение, 0 - синхронное
-                self.speaker.Speak(text, 1 if interrupt else 0)
-        except Exception as e:
-            # При ошибке пытаемся переинициализировать движок
-            self.init_voice_engine()
+        self.speech.say(text, priority, interrupt, chime, started)
+
+    def wake_muted(self):
+        """Ключевое слово не принимается, пока ассистент говорит (если так настроено)"""
+        return self.mute_wake_while_speaking and not self.is_active and self.speech.speaking
 
     def deactivate(self, silent=False):
         """Переводит ассистента в режим ожидания"""
         if self.is_active:
             self.is_active = False
+            with self.state:
+                self.deadline = None  # Основной цикл снова уснет без таймаута
             if not silent:
                 self.speak("Режим ожидания", interrupt=True)
-            self.audio_queue.queue.clear()  # Очищаем очередь аудио
+            self.drop_pending_audio()  # Очищаем буфер аудио
+
+    def drop_pending_audio(self, keep=0):
+        """Пропускает накопившееся аудио, оставляя последние keep байт"""
+        if self.audio_source.realtime:  # Записи воспроизводятся без потерь
+            self.audio_buffer.discard(keep)
+
+    @property
+    def frames_dropped(self):
+        """Сэмплы, потерянные при переполнении буфера или пропущенные в режиме ожидания"""
+        return (self.audio_buffer.dropped_bytes + self.audio_buffer.skipped_bytes) // 2
 
     def set_timer(self, duration_sec, timer_id=None):
-        """Устанавливает таймер и запускает его в отдельном потоке"""
-        if timer_id is None:
-            self.timer_counter += 1
-            timer_id = self.timer_counter
-        
-        def timer_thread():
-            start_time = time.time()
-            time_left = duration_sec
-            
-            # Периодически проверяем оставшееся время
-            while time_left > 0 and self.is_running:
-                time.sleep(1)
-                time_left = duration_sec - (time.time() - start_time)
-            
-            if not self.is_running:
-                return
-                
-            # Проигрываем звуковое уведомление
-            try:
-                import winsound
-                for _ in range(3):  # Три сигнала
-                    winsound.Beep(1000, 500)  # Частота 1000 Гц, длительность 500 мс
-                    time.sleep(0.3)
-            except:
-                pass
-                
-            # Форматируем длительность таймера
-            if duration_sec >= 60:
-                minutes = duration_sec // 60
-                seconds = duration_sec % 60
-                if seconds > 0:
-                    duration_str = f"{minutes} минут {seconds} секунд"
-                else:
-                    duration_str = f"{minutes} минут"
-            else:
-                duration_str = f"{duration_sec} сек"
-                
-            # Произносим сообщение с информацией о длительности
-            with self.speaker_lock:
-                self.speak(f"Таймер {timer_id} на {duration_str} завершил работу!", interrupt=True)
-                if timer_id in self.timers:
-                    del self.timers[timer_id]
-        
-        timer = threading.Thread(target=timer_thread)
-        timer.daemon = True
-        self.timers[timer_id] = {
-            'thread': timer,
-            'end_time': time.time() + duration_sec,
-            'duration': duration_sec
-        }
-        timer.start()
-        return timer_id
+        """Устанавливает таймер в планировщике и возвращает его номер"""
+        return self.scheduler.add(duration_sec, timer_id)
+
+    def on_timer_fired(self, timer):
+        """Вызывается планировщиком: сигнал и объявление идут через очередь речи"""
+        self.speak(f"Таймер {timer.id} на {format_duration(timer.duration)} завершил работу!",
+                   interrupt=True, priority=PRIORITY_ALARM, chime=True)
 
     def audio_capture(self):
-        """Поток для захвата аудио с микрофона"""
-        p = pyaudio.PyAudio()
-        stream = p.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=SAMPLE_RATE,
-            input=True,
-            frames_per_buffer=CHUNK_SIZE,
-            input_device_index=None,
-            stream_callback=None,
-            start=False
-        )
-        
-        print_with_time(self.welcome_message, color="bold_green")
-        print("-" * 40)
-        self.speak("Готов")
-        stream.start_stream()
+        """Поток для захвата аудио из источника (микрофон или запись)"""
+        source = self.audio_source
+        buffer = self.audio_buffer  # При мягком перезапуске у нового конвейера свой буфер
+        enqueue_times = self.enqueue_times
+        source.start()
+        
+        self.log(self.welcome_message, color="bold_green")
+        self.log("-" * 40)
+        self.speak("Готов", priority=PRIORITY_LOW)
         
         try:
             while self.is_running:
                 try:
-                    # Читаем данные с микрофона без блокировки при переполнении
-                    data = stream.read(CHUNK_SIZE, exception_on_overflow=False)
+                    data = source.read()
+                    if data is None:  # Запись закончилась
+                        break
+                    captured = source.captured or time.perf_counter()  # Микрофон знает время кадра
                     
-                    # Очищаем очередь, если в режиме ожидания и очередь переполнена
-                    if not self.is_active and self.audio_queue.qsize() > 5:
-                        self.audio_queue.queue.clear()
-                        
-                    self.audio_queue.put(data, timeout=0.1)
-                except queue.Full:
-                    continue
+                    if not source.realtime:
+                        # Воспроизведение без потерь: ждем, пока потребитель освободит место
+                        while not buffer.wait_writable(len(data)):
+                            if buffer.closed:
+                                return  # Остановка: буфер закрыт
+                    
+                    # При переполнении чанк отбрасывается и учитывается в счетчиках
+                    if buffer.write(data):
+                        enqueue_times.append((buffer.write_pos, time.monotonic()))
+                        self.capture_latency.observe(time.perf_counter() - captured)
+                    else:
+                        self.overflow_count.inc()
+                        self.dropped_count.inc(len(data) // 2)
                 except Exception as e:
+                    self.error_counts['capture'].inc()
+                    if self.is_running:  # Ошибка при остановке - закрытое устройство
+                        self.log(f"Ошибка захвата аудио: {e}", "error")
                     break
         finally:
-            # Гарантированно останавливаем поток
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
+            # Гарантированно останавливаем поток и будим распознавание
+            source.close()
+            buffer.close()
+
+    def accept_waveform(self, recognizer, data, mode):
+        """Передает аудио распознавателю; KaldiRecognizer процесса получает буфер без копирования"""
+        started = time.thread_time()
+        wall_started = time.perf_counter()
+        handle = getattr(recognizer, '_handle', None)  # Нет у распознавателей пула процессов
+        if handle is not None and vosk_ffi is not None:
+            accepted = vosk_c.vosk_recognizer_accept_waveform(handle, vosk_ffi.from_buffer(data), len(data))
+            if accepted < 0:
+                raise Exception("Failed to process waveform")
+        else:
+            accepted = recognizer.AcceptWaveform(data)
+        
+        self.accept_latency[mode].observe(time.perf_counter() - wall_started)
+        stats = self.decode_stats[mode]
+        stats[0] += time.thread_time() - started
+        stats[1] += len(data)
+        return accepted
+
+    def select_recognizer(self):
+        """Переключает распознаватель по текущему режиму (только из потока распознавания)"""
+        recognizer = self.command_recognizer if self.is_active else self.wake_recognizer
+        if recognizer is not self.recognizer:
+            self.recognizer.Reset()  # Сбрасываем незаконченную фразу прежнего режима
+            self.reset_counts['mode'].inc()
+            self.recognizer = recognizer
+            self.reset_utterance()
+        return recognizer
+
+    def reset_utterance(self):
+        """Сбрасывает состояние текущей фразы"""
+        self.utterance_length = 0
+        self.utterance_speech = False
+        self.utterance_dispatched = False
+        self.partial_text = ""
+        self.partial_stable = 0
 
     def process_audio(self):
         """Поток для обработки аудио и распознавания команд"""
-        last_processed_text = ""
-        last_processed_time = 0
+        buffer = self.audio_buffer
         
         while self.is_running:
+            # Пропускаем отставание в режиме ожидания, сохраняя последнюю секунду
+            if not self.is_active and buffer.available() > self.preroll_bytes + CHUNK_BYTES:
+                self.drop_pending_audio(keep=self.preroll_bytes)
+            
+            # Ждем целый чанк без таймаута: поток будят запись данных или close()
+            data = buffer.peek(CHUNK_BYTES, min_bytes=CHUNK_BYTES)
+            if data is None:
+                if buffer.closed and not buffer.available():
+                    break  # Источник закончился, все аудио обработано
+                continue
+            
             try:
-                data = self.audio_queue.get(timeout=0.1)
+                self.stream_position = buffer.read_pos + len(data)
+                self.observe_queue(buffer, self.stream_position)
+                if self.pending_language is not None:
+                    self.apply_language()  # Модель нового языка загружена в фоне
                 
-                if self.recognizer.AcceptWaveform(data):
-                    result = json.loads(self.recognizer.Result())
-                    text = result.get("text", "").strip().lower()
-                    
-                    # Обрабатываем только новые команды (защита от дублирования)
-                    if text and (time.time() - last_processed_time > 0.5 or text != last_processed_text):
-                        keyword_detected = any(keyword in text for keyword in KEYWORDS)
-                        
-                        # Выводим в консоль только если есть ключевое слово или в активном режиме
-                        if keyword_detected or self.is_active:
-                            print_with_time(f"Распознано: {text}")
-                        
-                        self.handle_command(text)
-                        last_processed_text = text
-                        last_processed_time = time.time()
+                if self.vad is not None:
+                    was_open = self.vad.is_open
+                    if not self.gate_audio(data):
+                        buffer.consume(len(data))
+                        continue
+                    if not was_open and buffer.rewind(self.vad_prepad_bytes):
+                        continue  # Перечитываем чанк вместе с началом речи из истории
                 
-                self.audio_queue.task_done()
+                recognizer = self.select_recognizer()
+                self.keep_utterance_audio(data)
+                if self.vad is None or self.vad.speech:
+                    self.utterance_speech = True
+                mode = 'active' if self.is_active else 'standby'
+                
+                if self.accept_waveform(recognizer, data, mode):
+                    self.finish_utterance(recognizer.Result())
+                elif self.early_dispatch:
+                    self.check_partial(recognizer)
                 
-            except queue.Empty:
-                continue
             except Exception as e:
-                print_with_time(f"Ошибка обработки аудио: {e}")
+                self.error_counts['recognition'].inc()
+                self.log(f"Ошибка обработки аудио: {type(e).__name__}: {e}", "error")
+            buffer.consume(len(data))
+        
+        # Запись закончилась или ассистент остановлен - будим основной цикл
+        self.stop()
+
+    def observe_queue(self, buffer, end):
+        """Записывает глубину буфера и сколько ждал в нем чанк, заканчивающийся на позиции end"""
+        self.queue_depth.observe(buffer.available() / 2 / SAMPLE_RATE)
+        times = self.enqueue_times
+        enqueued = None
+        while times and times[0][0] <= end:  # Пропущенное (VAD, режим ожидания) тоже снимается
+            enqueued = times.popleft()[1]
+        if enqueued is not None:
+            self.queue_wait.observe(time.monotonic() - enqueued)
+
+    def gate_audio(self, data):
+        """Пропускает чанк через VAD; True - чанк нужно отдать распознавателю"""
+        was_open = self.vad.is_open
+        if self.vad.process(data):
+            return True
+        
+        self.vad_skipped_bytes += len(data)
+        # Речь закончилась: забираем у распознавателя остаток фразы. Если Vosk уже
+        # закрыл ее сам (Result), а после этого шло только удержание VAD без речи,
+        # фраза завершена - FinalResult вернул бы пустой текст и посчитал ее дважды
+        if was_open and self.utterance_speech:
+            self.finish_utterance(self.recognizer.FinalResult())
+        return False
+
+    def keep_utterance_audio(self, data):
+        """Сохраняет аудио текущей фразы (до MAX_UTTERANCE_SECONDS)"""
+        size = min(len(data), len(self.utterance_audio) - self.utterance_length)
+        self.utterance_audio[self.utterance_length:self.utterance_length + size] = data[:size]
+        self.utterance_length += size
+
+    def redecode(self, recognizer, mode):
+        """Повторно распознает сохраненное аудио фразы другим распознавателем; возвращает результат с текстом и словами"""
+        audio = memoryview(self.utterance_audio)[:self.utterance_length]
+        results = []
+        if self.accept_waveform(recognizer, audio, mode):
+            results.append(json.loads(recognizer.Result()))
+        results.append(json.loads(recognizer.FinalResult()))
+        return {"text": " ".join(result.get("text", "") for result in results if result.get("text")),
+                "result": [word for result in results for word in result.get("result", [])]}
+
+    def finish_utterance(self, raw_result):
+        """Завершает фразу: при необходимости уточняет текст и обрабатывает результат"""
+        self.result_time = time.monotonic()
+        result = json.loads(raw_result)
+        text = result.get("text", "")
+        decoded_by = self.recognizer
+        
+        # Ключевое слово и что-то еще: команду распознаем словарем команд
+        if decoded_by is self.wake_recognizer and "[unk]" in text \
+                and any(keyword in text.split() for keyword in KEYWORDS):
+            result = self.redecode(self.command_recognizer, 'active')
+            text = result["text"]
+            decoded_by = self.command_recognizer
+        
+        # Неизвестные слова или команда с произвольным текстом: полный словарь модели.
+        # Только для команды: в режиме ожидания фраза без ключевого слова осталась
+        # у распознавателя ожидания, и ее [unk] просто отбрасывается
+        if decoded_by is self.command_recognizer and (
+                "[unk]" in text or self.router.match(text).name in FREE_TEXT_COMMANDS):
+            result = self.redecode(self.open_recognizer, 'open')
+            text = result["text"]
+        
+        dispatched = self.utterance_dispatched
+        self.reset_utterance()
+        self.recognizer_utterances += 1
+        if not dispatched:  # Иначе команда этой фразы уже выполнена по промежуточному результату
+            result["text"] = text.replace("[unk]", "")
+            self.handle_result(result)
+        # Между фразами в режиме ожидания незаконченного распознавания нет
+        if not self.is_active and self.recycle_due():
+            self.recycle_recognizers()
+
+    def check_partial(self, recognizer):
+        """Досрочно выполняет команду, если промежуточный текст стабилен и однозначен"""
+        if self.utterance_dispatched:
+            return
+        partial = json.loads(recognizer.PartialResult()).get("partial", "")
+        if partial != self.partial_text:
+            self.partial_text = partial
+            self.partial_stable = 1
+            return
+        self.partial_stable += 1
+        if not partial or self.partial_stable < EARLY_DISPATCH_STABLE_CHUNKS:
+            return
+        
+        words = partial.split()
+        if recognizer is self.wake_recognizer:
+            # Грамматика ожидания знает только ключевые слова: переносим фразу в словарь команд
+            if any(keyword in words for keyword in KEYWORDS) and not self.wake_muted():
+                self.activate()
+                self.migrate_utterance(self.command_recognizer)
+            return
+        
+        command = " ".join(word for word in words if word not in KEYWORDS)
+        if "[unk]" in command or not self.router.match(command).is_complete():
+            return
+        self.utterance_dispatched = True
+        self.result_time = time.monotonic()
+        self.handle_result({"text": partial})
+
+    def migrate_utterance(self, recognizer):
+        """Переводит начатую фразу на другой распознаватель"""
+        # Прежний распознаватель тоже сбрасывается: иначе начало фразы («квант»), которое
+        # он уже декодировал, всплывет результатом позже и снова активирует ассистента
+        self.recognizer.Reset()
+        recognizer.Reset()
+        self.reset_counts['migrate'].inc(2)
+        self.recognizer = recognizer
+        self.partial_text = ""
+        self.partial_stable = 0
+        audio = memoryview(self.utterance_audio)[:self.utterance_length]
+        if self.accept_waveform(recognizer, audio, 'active'):
+            self.finish_utterance(recognizer.Result())
+
+    def vad_report(self):
+        """Доля аудио, пропущенного VAD, и оценка сэкономленного времени CPU"""
+        decode_time = sum(stats[0] for stats in self.decode_stats.values())
+        decoded = sum(stats[1] for stats in self.decode_stats.values())
+        total = decoded + self.vad_skipped_bytes
+        cost = decode_time / decoded if decoded else 0.0
+        return {
+            'skipped_fraction': self.vad_skipped_bytes / total if total else 0.0,
+            'cpu_saved': self.vad_skipped_bytes * cost,
+            'decode_time': decode_time,
+        }
+
+    def decode_report(self):
+        """Время CPU декодирования на секунду аудио по режимам распознавания"""
+        return {mode: cpu / (size / 2 / SAMPLE_RATE) if size else 0.0
+                for mode, (cpu, size) in self.decode_stats.items()}
 
-    def handle_command(self, text):
-        """Определяет и выполняет команды из распознанного текста"""
+    def handle_result(self, result):
+        """Обрабатывает итоговый результат распознавания фразы"""
+        text = result.get("text", "").strip().lower()
+        
+        # Повторы исключены на уровне фразы (см. finish_utterance)
+        if text:
+            # Ключевое слово - целое слово результата с достаточной уверенностью
+            wake = self.wake_detector.detect(result)
+            if wake is not None:
+                self.wake_counts['accepted' if wake.accepted else 'low_confidence'].inc()
+                if not wake.accepted:
+                    self.log(f"Ключевое слово '{wake.keyword}' отклонено: уверенность {wake.confidence:.2f}",
+                             keyword=wake.keyword, confidence=wake.confidence)
+                    wake = None
+            
+            # Выводим в консоль только если есть ключевое слово или в активном режиме
+            if wake is not None or self.is_active:
+                self.log(f"Распознано: {text}", text=text)
+            
+            self.handle_command(text, wake)
+
+    def handle_command(self, text, wake=None):
+        """Определяет и выполняет команды из распознанного текста
+
+        wake - ключевое слово фразы (WakeMatch); команда - слова после него.
+        """
         text_lower = text.lower()
-        keyword_detected = any(keyword in text_lower for keyword in KEYWORDS)
         
         # Активация по ключевому слову
-        if keyword_detected:
+        if wake is not None:
+            if self.wake_muted():
+                return  # Вероятно, ассистент услышал сам себя
             if not self.is_active:
                 self.activate()
-            # Удаляем ключевое слово из команды
-            command = re.sub('|'.join(KEYWORDS), '', text_lower).strip()
-            if command:
-                self.process_user_input(command)
+            if wake.command:
+                self.process_user_input(wake.command)
             return
         
         # Обработка команд в активном режиме
         if self.is_active:
-            self.last_activity = time.time()  # Обновляем время активности
+            self.keep_active()  # Обновляем время активности
             self.process_user_input(text_lower)
 
     def activate(self):
         """Активирует режим ожидания команд"""
         if not self.is_active:
             self.is_active = True
+            self.keep_active()
+            self.speech.cancel()  # Перебивание: пользователь заговорил - замолкаем
+            # Пропускаем накопившееся, но сохраняем начало команды после ключевого слова
+            self.drop_pending_audio(keep=self.preroll_bytes)
+
+    def keep_active(self):
+        """Отодвигает отключение активного режима на ACTIVE_TIMEOUT"""
+        with self.state:
             self.last_activity = time.time()
-            self.audio_queue.queue.clear()  # Очищаем накопившиеся данные
+            armed = self.deadline is not None
+            self.deadline = time.monotonic() + ACTIVE_TIMEOUT
+            # Более поздний срок основной цикл увидит сам, когда проснется по старому
+            if not armed:
+                self.state.notify()
 
-    def restart(self):
-        """Перезапускает ассистента"""
-        self.is_running = False
+    def wait_for_deadline(self):
+        """Спит до срока отключения активного режима или до остановки; True - срок истек"""
+        with self.state:
+            while self.is_running:
+                timeout = None
+                if self.deadline is not None:
+                    timeout = self.deadline - time.monotonic()
+                    if timeout <= 0:
+                        self.deadline = None
+                        return self.is_active
+                self.state.wait(timeout)
+                self.loop_wakeups += 1
+        return False
+
+    def stop(self):
+        """Останавливает ассистента: будит основной цикл, захват и распознавание"""
+        with self.state:
+            self.is_running = False
+            self.state.notify_all()
+        self.audio_buffer.close()
+        self.audio_source.close()  # Будит захват, ждущий кадра (например, от отключенного микрофона)
+
+    def restart(self, reload_config=False):
+        """Перезапускает ассистента; сам перезапуск выполняет основной цикл (см. run())
+
+        reload_config - перед перезапуском перечитать настройки из main.py.
+        """
+        with self.state:
+            self.restart_requested = True
+            self.reload_requested = reload_config
+        self.stop()
+
+    def soft_restart(self, threads):
+        """Пересобирает конвейер в том же процессе и возвращает новые потоки
+
+        Захват, распознаватели, вывод речи и команды создаются заново, а
+        загруженные модели (см. ModelCache) и планировщик с таймерами остаются.
+        Микрофон открывается заново с новыми INPUT_DEVICE и CAPTURE_NATIVE;
+        SAMPLE_RATE и FRAME_MS источника аудио меняются только полным перезапуском.
+        """
+        started = time.perf_counter()
+        capture, recognition = threads
+        recognition.join()
+        # Пока вывод речи пересоздается, сигнал таймера попал бы в остановленную очередь:
+        # таймеры не срабатывают до нового вывода, просроченные сработают сразу после
+        self.scheduler.stop()
+        self.speech.wait_idle(timeout=5)  # Даем договорить ответ
+        self.speech.stop()
+        if self.reload_requested:
+            changed = read_settings()
+            self.log(f"Настройки перечитаны: {', '.join(changed) or 'без изменений'}", changed=changed)
+            self.number_words = NUMBER_WORDS
+        
+        self.recognition_wakeups += self.audio_buffer.wakeups
+        self.init_pipeline()
+        self.init_voice_engine()
+        self.scheduler.start()
+        self.router = IntentRouter.from_handlers(self, self.number_words)
+        
+        def reopen_audio():
+            capture.join()  # Захват дочитывает текущий чанк и закрывает источник
+            source = self.audio_source
+            if isinstance(source, MicrophoneSource) and (source.device, source.native) != (INPUT_DEVICE,
+                                                                                           CAPTURE_NATIVE):
+                self.log(f"Микрофон переключен: {INPUT_DEVICE if INPUT_DEVICE is not None else 'по умолчанию'}",
+                         device=INPUT_DEVICE, native=CAPTURE_NATIVE)
+                source.device, source.native = INPUT_DEVICE, CAPTURE_NATIVE
+            source.open()
+        self.run_startup({'model': self.load_model, 'audio': reopen_audio})
+        with self.state:
+            self.restart_requested = False
+            self.is_running = True
+        self.restart_times.append(time.perf_counter() - started)
+        self.log(f"Перезапуск за {self.restart_times[-1] * 1000:.0f} мс", color="green",
+                 seconds=round(self.restart_times[-1], 3))
+        return self.start_pipeline()
+
+    def exec_restart(self):
+        """Перезапуск новым процессом: модель загружается заново, таймеры передаются через окружение"""
+        self.speech.wait_idle(timeout=5)  # Даем договорить ответ
+        self.scheduler.stop()
+        os.environ[self.TIMERS_ENV] = json.dumps({'saved': time.time(), 'timers': self.scheduler.snapshot()})
         python = sys.executable
-        print("-" * 40)
+        self.log("-" * 40)
+        EVENT_LOG.close()  # exec не вызывает обработчики выхода: выводим журнал сейчас
         os.execl(python, python, *sys.argv)
 
+    def restore_timers(self):
+        """Возвращает таймеры, сохраненные перед перезапуском через exec"""
+        saved = os.environ.pop(self.TIMERS_ENV, None)
+        if saved:
+            state = json.loads(saved)
+            self.scheduler.restore(state['timers'], elapsed=time.time() - state['saved'])
+
     def open_program(self, program_name):
         """Открывает указанную программу"""
         try:
             if program_name in PROGRAM_PATHS:
+                import subprocess
                 path = PROGRAM_PATHS[program_name]
                 subprocess.Popen(path)
                 return True
         except Exception as e:
-            print_with_time(f"Ошибка при открытии программы {program_name}: {e}")
+            self.log(f"Ошибка при открытии программы {program_name}: {e}", "error")
         return False
 
+    def run_action(self, name, action, done=None, failed=None):
+        """Выполняет действие команды в пуле действий, не задерживая распознавание
+
+        done(результат) возвращает ответ, который произносится, когда действие
+        закончится (None - без ответа); failed - ответ при ошибке, таймауте или
+        заполненной очереди. Обработчик команды может сразу вернуть
+        подтверждение («Открываю...»), а о неудаче будет сказано позже.
+        """
+        started = self.command_started
+
+        def finish(result):
+            response = done(result) if done is not None else None
+            if response:
+                self.speak(response, started=started)
+
+        def fail(error):
+            self.log(f"Действие {name} не выполнено: {error}", "error", action=name)
+            if failed:
+                self.speak(failed, started=started)
+        return self.actions.submit(name, action, finish, fail)
+
     def get_system_status(self):
-        """Возвращает информацию только о загруженности дисков в формате 'C: 88% D: 90%'"""
-        disk_status = []
-        for partition in psutil.disk_partitions(all=False):
-            if partition.fstype and 'cdrom' not in partition.opts:
-                try:
-                    usage = psutil.disk_usage(partition.mountpoint)
-                    drive_letter = partition.mountpoint[0]
-                    percent = round(usage.percent)  # Округляем до целого числа
-                    disk_status.append(f"{drive_letter}: {percent}%")
-                except Exception:
-                    continue
-        
-        return f"Диски: {' '.join(disk_status)}"
+        """Состояние системы из последнего снимка: 'Диски: C: 88% D: 90%. Процессор 12%, память 48%'"""
+        snapshot = self.system_monitor.snapshot
+        if snapshot is None:
+            return "Данные о системе еще собираются"
+        disks = []
+        for disk, percent in snapshot.disks:
+            # Диск, не ответивший при опросе (например, отключенный сетевой), не задерживает ответ
+            disks.append(f"{disk}: нет ответа" if percent is None else f"{disk}: {round(percent)}%")
+        status = f"Диски: {' '.join(disks)}. Процессор {round(snapshot.cpu)}%, память {round(snapshot.memory)}%"
+        if snapshot.battery is not None:
+            status += f", батарея {round(snapshot.battery[0])}%"
+        return status
 
     def process_user_input(self, text):
         """Обрабатывает распознанный текст и формирует ответ"""
-        responses = {
-            'greeting': ["Приветствую!", "Здравствуйте!", "Привет!"],
-            'time': [datetime.now().strftime('%H:%M')],
-            'weather': [
-                "Посмотрите погоду в приложении",
-                "Не могу узнать погоду, проверьте сами",
-                "Погоду лучше уточнить в интернете"
-            ],
-            'thanks': ["Всегда пожалуйста!", "Не за что!", "Рад помочь!"],
-            'help': [
-                "Команды: время, погода, перезагрузка. Скажите 'квант' перед командой.",
-                "Просто скажите 'квант' и что вам нужно: время, погода, громкость и т.д."
-            ],
-            'volume_set': ["{}"],  # Шаблон для ответа о громкости
-            'search': ["Ищу информацию в интернете"],
-            'open_paint': ["Открываю Paint"],
-            'open_telegram': ["Открываю Telegram"],
-            'open_yandex': ["Открываю Яндекс Браузер"],
-            'deepseek_search': ["Открываю DeepSeek в браузере"],
-            'system_status': ["{}"],
-            'timer': [
-                "Таймер {}",
-            ],
-            'restart': ["Выполняю перезапуск"],  
-            'default': ["Не понял", "Повторите, пожалуйста"]
-        }
+        dispatched = time.monotonic()
+        self.command_started = dispatched
+        if self.result_time is not None:
+            self.dispatch_latency.observe(dispatched - self.result_time)
+            self.result_time = None
+        match = self.router.match(text)
+        self.metrics.counter('quant_commands_total', "Выполненные команды по намерениям",
+                             intent=match.name or 'unknown').inc()
+        if match.intent is None:
+            response = random.choice(self.RESPONSES['default'])
+        else:
+            response = match.intent.handler(match.slots)
+        
+        if response:
+            self.speak(response, interrupt=True, started=dispatched)
+        self.deactivate(silent=True)
 
-        # Обработка команд громкости
-        if self.patterns['volume_set'].search(text):
-            # Пытаемся найти цифры в команде
-            numbers = re.findall(r'\d+', text)
-            if numbers:
-                vol = int(numbers[0])
-            else:
-                # Ищем числительные в тексте
-                words = text.split()
-                vol = None
-                for word in words:
-                    if word in self.number_words:
-                        vol = self.number_words[word]
-                        break
-                
-                # Если не нашли число - сообщаем текущую громкость
-                if vol is None:
-                    current_vol = self.volume_controller.get_volume()
-                    response = f"Текущая громкость {current_vol}%"
-                    self.speak(response, interrupt=True)
-                    self.deactivate(silent=True)
-                    return
-            
-            # Устанавливаем новую громкость
-            new_vol = self.volume_controller.set_volume(vol)
-            response = random.choice(responses['volume_set']).format(f"Громкость установлена на {new_vol}%")
-        
-        # Обработка таймера
-        elif self.patterns['timer'].search(text):
-                # Ищем время в формате "X минут(ы/у)" или "X секунд(ы/у)"
-                time_match = re.search(r'(\d+)\s*(минут[а-я]*|секунд[а-я]*)', text)
-                if time_match:
-                        value = int(time_match.group(1))
-                        unit = time_match.group(2)
-                        
-                        if 'минут' in unit:
-                                duration = value * 60
-                                time_str = f"{value} мин"
-                        elif 'секунд' in unit:
-                                duration = value
-                                time_str = f"{value} сек"
-                        else:
-                                response = "Укажите единицы измерения (минуты или секунды)"
-                                self.speak(response, interrupt=True)
-                                self.deactivate(silent=True)
-                                return
-                        
-                        timer_id = self.set_timer(duration)
-                        response = random.choice(responses['timer']).format(time_str)
-                else:
-                        # Попробуем найти числительные слова
-                        words = text.split()
-                        value = None
-                        unit = None
-                        
-                        # Ищем числительное
-                        for word in words:
-                                if word in self.number_words:
-                                        value = self.number_words[word]
-                                        break
-                        
-                        # Ищем единицы измерения
-                        if any('минут' in w for w in words):
-                                unit = 'минут'
-                        elif any('секунд' in w for w in words):
-                                unit = 'секунд'
-                        
-                        if value is not None and unit is not None:
-                                if unit == 'минут':
-                                        duration = value * 60
-                                        time_str = f"{value} мин"
-                                else:
-                                        duration = value
-                                        time_str = f"{value} сек"
-                                
-                                timer_id = self.set_timer(duration)
-                                response = random.choice(responses['timer']).format(time_str)
-                        else:
-                                response = "Сколько времени поставить на таймер? (например, 5 минут или 30 секунд)"
-        
-        # Поиск информации в интернете
-        elif self.patterns['search'].search(text):
-            query = re.sub(r'(поиск|найди|найти)\s*', '', text).strip()
-            if query:
-                browser.open(f"https://www.google.com/search?q={query}")
-                response = random.choice(responses['search'])
-            else:
-                response = "Что нужно найти?"
-        
-        # Открытие Paint
-        elif self.patterns['open_paint'].search(text):
-            if self.open_program('paint'):
-                response = random.choice(responses['open_paint'])
-            else:
-                response = "Не удалось открыть Paint"
-        
-        # Открытие Telegram
-        elif self.patterns['open_telegram'].search(text):
-            if self.open_program('telegram'):
-                response = random.choice(responses['open_telegram'])
-            else:
-                response = "Не удалось открыть Telegram"
-        
-        # Открытие Яндекс Браузера
-        elif self.patterns['open_yandex'].search(text):
-            if self.open_program('yandex'):
-                response = random.choice(responses['open_yandex'])
-            else:
-                response = "Не удалось открыть Яндекс Браузер"
-        
-        # Поиск в DeepSeek
-        elif self.patterns['deepseek_search'].search(text):
-            browser.open("https://www.deepseek.com")
-            response = random.choice(responses['deepseek_search'])
-        
-        # Состояние системы (включая диски)
-        elif self.patterns['system_status'].search(text):
-            status = self.get_system_status()
-            response = random.choice(responses['system_status']).format(status)
-        
-        # Обработка остальных команд
-        elif self.patterns['greeting'].search(text):
-            response = random.choice(responses['greeting'])
-        elif self.patterns['time'].search(text):
-            response = random.choice(responses['time'])
-        elif self.patterns['weather'].search(text):
-            response = random.choice(responses['weather'])
-        elif self.patterns['thanks'].search(text):
-            response = random.choice(responses['thanks'])
-        elif self.patterns['restart'].search(text):
-            response = random.choice(responses['restart'])
-            self.speak(response, interrupt=True)
-            self.restart()
-            return
-        elif self.patterns['help'].search(text):
-            response = random.choice(responses['help'])
+    def open_program_response(self, program_name, title):
+        """Запускает программу в пуле действий и сразу отвечает; об ошибке сообщит позже"""
+        def start():
+            if not self.open_program(program_name):
+                raise RuntimeError(f"программа {program_name} не запущена")
+        self.run_action(f'open_{program_name}', start, failed=f"Не удалось открыть {title}")
+        return random.choice(self.RESPONSES[f'open_{program_name}'])
+
+    @intent('timer', ['таймер', 'засеки', 'засечь', 'поставь таймер'], priority=140, early=('number', 'unit'))
+    def on_timer(self, slots):
+        """Ставит таймер на указанное число минут или секунд"""
+        value, unit = slots['number'], slots['unit']
+        if value is None or unit is None:
+            return "Сколько времени поставить на таймер? (например, 5 минут или 30 секунд)"
+        
+        if unit == 'минут':
+            duration = value * 60
+            time_str = f"{value} мин"
         else:
-            response = random.choice(responses['default'])
+            duration = value
+            time_str = f"{value} сек"
+        self.set_timer(duration)
+        return random.choice(self.RESPONSES['timer']).format(time_str)
 
-        self.speak(response, interrupt=True)
-        self.deactivate(silent=True)
+    def pick_timer(self, slots, nearest=False):
+        """Выбирает таймер по номеру из команды; возвращает (таймер, ответ при ошибке)"""
+        timers = self.scheduler.list()
+        if not timers:
+            return None, "Нет активных таймеров"
+        if slots['number'] is not None:
+            timer = self.scheduler.get(slots['number'])
+            return timer, None if timer else f"Таймера {slots['number']} нет"
+        if len(timers) == 1 or nearest:
+            return timers[0], None
+        return None, "Назовите номер таймера"
+
+    @intent('timer_cancel', ['отмени таймер', 'отменить таймер', 'удали таймер', 'останови таймер'],
+            priority=150, early=False)
+    def on_timer_cancel(self, slots):
+        """Отменяет таймер по номеру (или единственный)"""
+        timer, error = self.pick_timer(slots)
+        if timer is None:
+            return error
+        self.scheduler.cancel(timer.id)
+        return f"Таймер {timer.id} отменен"
+
+    @intent('timer_list', ['какие таймеры', 'список таймеров', 'мои таймеры'], priority=150)
+    def on_timer_list(self, slots):
+        """Перечисляет активные таймеры с оставшимся временем"""
+        timers = self.scheduler.list()
+        if not timers:
+            return "Нет активных таймеров"
+        items = [f"{timer.id}: осталось {format_duration(timer.remaining())}" for timer in timers]
+        return "Таймеры " + "; ".join(items)
+
+    @intent('timer_left', ['сколько осталось', 'сколько времени осталось', 'осталось'], priority=150)
+    def on_timer_left(self, slots):
+        """Сообщает, сколько осталось до срабатывания таймера (по умолчанию ближайшего)"""
+        timer, error = self.pick_timer(slots, nearest=True)
+        if timer is None:
+            return error
+        return f"До таймера {timer.id} осталось {format_duration(timer.remaining())}"
+
+    @intent('volume_set', ['громкость на', 'установи громкость', 'поставь громкость', 'громкость'],
+            priority=130, early=('number',))
+    def on_volume(self, slots):
+        """Устанавливает громкость или сообщает текущую, если число не названо"""
+        number = slots['number']
+        if number is None:
+            self.run_action('volume', lambda: self.volume().get_volume(),
+                            lambda level: f"Текущая громкость {level}%", "Не удалось узнать громкость")
+        else:
+            self.run_action('volume', lambda: self.volume().set_volume(number),
+                            lambda level: f"Громкость установлена на {level}%", "Не удалось изменить громкость")
+
+    @intent('search', ['поиск', 'найди', 'найти', 'search', 'find'], priority=120, early=False)
+    def on_search(self, slots):
+        """Поиск информации в интернете"""
+        query = slots['query']
+        if not query:
+            return "Что нужно найти?"
+        self.run_action('open_url', lambda: self.open_url(f"https://www.google.com/search?q={query}"),
+                        failed="Не удалось открыть браузер")
+        return random.choice(self.RESPONSES['search'])
+
+    @intent('open_paint', ['paint', 'рисовать'], priority=110)
+    def on_open_paint(self, slots):
+        return self.open_program_response('paint', "Paint")
+
+    @intent('open_telegram', ['telegram', 'телеграм', 'телега'], priority=100)
+    def on_open_telegram(self, slots):
+        return self.open_program_response('telegram', "Telegram")
+
+    @intent('open_yandex', ['яндекс', 'браузер'], priority=90)
+    def on_open_yandex(self, slots):
+        return self.open_program_response('yandex', "Яндекс Браузер")
+
+    @intent('deepseek_search', ['нейронка', 'нейросеть'], priority=80)
+    def on_deepseek(self, slots):
+        """Открывает DeepSeek в браузере"""
+        self.run_action('open_url', lambda: self.open_url("https://www.deepseek.com"),
+                        failed="Не удалось открыть браузер")
+        return random.choice(self.RESPONSES['deepseek_search'])
+
+    @intent('system_status', ['состояние системы', 'загрузка системы', 'диск', 'диски', 'процессор', 'память',
+                              'батарея'], priority=70)
+    def on_system_status(self, slots):
+        return self.get_system_status()
+
+    @intent('greeting', ['привет', 'здравствуй', 'добрый день'], priority=60)
+    def on_greeting(self, slots):
+        return random.choice(self.RESPONSES['greeting'])
+
+    @intent('language', ['на английский', 'английский', 'english', 'на русский', 'русский', 'russian'], priority=55)
+    def on_language(self, slots):
+        """Переключает язык распознавания"""
+        words = slots['text'].split()
+        language = next((self.LANGUAGE_WORDS[word] for word in words if word in self.LANGUAGE_WORDS), None)
+        if language is None or language not in LANGUAGES:
+            return "Не понял"
+        if language != self.language:
+            self.switch_language(language)
+        return f"Язык распознавания: {self.LANGUAGE_NAMES[language]}"
+
+    @intent('time', ['время', 'час', 'который час', 'сколько времени'], priority=50)
+    def on_time(self, slots):
+        return datetime.now().strftime('%H:%M')
+
+    @intent('weather', ['погода', 'погоду', 'прогноз погоды'], priority=40)
+    def on_weather(self, slots):
+        return random.choice(self.RESPONSES['weather'])
+
+    @intent('thanks', ['спасибо', 'благодарю', 'пасиб', 'спс'], priority=30)
+    def on_thanks(self, slots):
+        return random.choice(self.RESPONSES['thanks'])
+
+    @intent('restart', ['перезапуск', 'перезагрузись', 'обновись', 'рестарт'], priority=20)
+    def on_restart(self, slots):
+        """Перезапускает ассистента"""
+        self.speak(random.choice(self.RESPONSES['restart']), interrupt=True)
+        self.restart()
+
+    @intent('reload', ['перечитай настройки', 'обнови настройки', 'загрузи настройки'], priority=25)
+    def on_reload(self, slots):
+        """Перечитывает настройки и перезапускает ассистента без перезагрузки модели"""
+        self.speak(random.choice(self.RESPONSES['reload']), interrupt=True)
+        self.restart(reload_config=True)
+
+    @intent('help', ['помощь', 'помоги', 'что ты умеешь', 'команды', 'возможности'], priority=10)
+    def on_help(self, slots):
+        return random.choice(self.RESPONSES['help'])
+
+    def start_pipeline(self):
+        """Запускает потоки для захвата и обработки аудио"""
+        threads = [threading.Thread(target=self.audio_capture, name="capture", daemon=True),
+                   threading.Thread(target=self.process_audio, name="recognition", daemon=True)]
+        for thread in threads:
+            thread.start()
+        return threads
 
     def run(self):
         """Основной цикл работы ассистента"""
+        threads = []
+        started = time.monotonic()
         try:
-            # Запускаем потоки для захвата и обработки аудио
-            audio_thread = threading.Thread(target=self.audio_capture)
-            process_thread = threading.Thread(target=self.process_audio)
-            
-            audio_thread.daemon = True
-            process_thread.daemon = True
-            
             # Повышаем приоритет на Windows
             if sys.platform == 'win32':
                 try:
                     import win32api, win32process, win32con
                     win32process.SetPriorityClass(win32api.GetCurrentProcess(), win32process.HIGH_PRIORITY_CLASS)
                     win32process.SetThreadPriority(win32api.GetCurrentThread(), win32process.THREAD_PRIORITY_HIGHEST)
+                    # Ctrl+C не прерывает ожидание на условии - останавливаемся из обработчика консоли
+                    win32api.SetConsoleCtrlHandler(lambda event: self.stop() or True, True)
                 except:
                     pass
             
-            audio_thread.start()
-            process_thread.start()
+            threads = self.start_pipeline()
+            self.system_monitor.start()
             
-            # Основной цикл управления
-            while self.is_running:
-                time.sleep(0.1)
+            while True:
+                # Основной цикл спит до срока отключения и просыпается только по событиям
+                while self.is_running:
+                    # Автоматическое отключение после таймаута неактивности
+                    if self.wait_for_deadline():
+                        self.deactivate()
                 
-                # Автоматическое отключение после таймаута неактивности
-                if self.is_active and (time.time() - self.last_activity) > ACTIVE_TIMEOUT:
-                    self.deactivate()
+                if not self.restart_requested:
+                    break
+                if not SOFT_RESTART:
+                    self.exec_restart()
+                try:
+                    threads = self.soft_restart(threads)
+                except Exception as e:
+                    self.log(f"Ошибка мягкого перезапуска: {e}", "error")
+                    self.exec_restart()
                 
         except KeyboardInterrupt:
-            print_with_time("\nЗавершение работы...")
+            self.log("Завершение работы...")
         finally:
-            self.is_running = False
-            os._exit(0)
+            self.stop()
+            self.scheduler.stop()
+            self.actions.stop()
+            self.speech.stop()
+            for thread in threads:
+                thread.join(self.JOIN_TIMEOUT)
+                if thread.is_alive():
+                    self.log(f"Поток {thread.name} не завершился за {self.JOIN_TIMEOUT} с", "warning")
+            if self.pool_session is not None:
+                self.pool_session.close()
+                self.pool_session = None
+            uptime = max(time.monotonic() - started, 1e-9)
+            self.log(f"Пробуждений основного цикла: {self.loop_wakeups / uptime:.2f}/с, "
+                     f"распознавания: {(self.recognition_wakeups + self.audio_buffer.wakeups) / uptime:.2f}/с")
+            if self.vad is not None:
+                report = self.vad_report()
+                self.log(f"VAD: пропущено {report['skipped_fraction']:.0%} аудио, "
+                         f"сэкономлено {report['cpu_saved']:.1f} с CPU")
+            costs = ", ".join(f"{mode}: {cost * 1000:.0f} мс" for mode, cost in self.decode_report().items())
+            self.log(f"CPU декодирования на секунду аудио: {costs}")
 
 if __name__ == "__main__":
-    assistant = VoiceAssistant()
-    assistant.run()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Голосовой ассистент Квант")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="Показать время этапов запуска и выйти")
+    parser.add_argument('--device', help="Микрофон: номер или часть названия (вместо INPUT_DEVICE)")
+    parser.add_argument('--list-devices', action='store_true', help="Показать микрофоны и выйти")
+    args = parser.parse_args()
+    
+    if args.list_devices:
+        import pyaudio
+        pa = pyaudio.PyAudio()
+        try:
+            for index, name, rate in input_devices(pa):
+                print(f"{index:>3}  {name} ({rate} Гц)")
+        finally:
+            pa.terminate()
+        sys.exit(0)
+    if args.device is not None:
+        cli_settings['INPUT_DEVICE'] = int(args.device) if args.device.isdigit() else args.device
+    globals().update(cli_settings)
+    
+    EVENT_LOG.configure(LOG_FILE, LOG_MAX_BYTES, LOG_BACKUPS, LOG_CONSOLE)
+    pool = None
+    if RECOGNITION_WORKERS:
+        from recognition_pool import RecognitionPool
+        pool = RecognitionPool(RECOGNITION_WORKERS, SAMPLE_RATE)
+    try:
+        assistant = VoiceAssistant(pool=pool)
+        if args.profile_startup:
+            EVENT_LOG.flush()  # Отчет не должен перемешаться с событиями запуска
+            for phase, (start, duration) in assistant.startup_report():
+                print(f"{phase:<8} начало {start * 1000:>6.0f} мс, длительность {duration * 1000:>6.0f} мс")
+            assistant.speech.stop()
+            assistant.scheduler.stop()
+            assistant.audio_source.close()
+        else:
+            exporter = MetricsExporter(METRICS, METRICS_PORT, METRICS_SNAPSHOT, METRICS_SNAPSHOT_SECONDS,
+                                       log=log_event)
+            exporter.start()
+            try:
+                assistant.run()
+            finally:
+                exporter.stop()
+    finally:
+        if pool is not None:
+            pool.close()
\ No newline at end of file
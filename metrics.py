@@ -0,0 +1,292 @@
+"""Метрики конвейера: счетчики и гистограммы задержек, текст Prometheus и снимок JSON
+
+Гистограммы с фиксированными корзинами: наблюдение - двоичный поиск корзины
+и три сложения под блокировкой самой метрики, поэтому метрики можно не
+выключать. Экспорт (MetricsExporter) отдает их по HTTP на localhost
+и периодически сохраняет снимок в файл.
+"""
+import bisect
+import json
+import os
+import threading
+from datetime import datetime
+
+# Границы корзин задержек, с: от 0,1 мс до 10 с
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """Монотонный счетчик"""
+    kind = 'counter'
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def sample(self):
+        return {'value': self.value}
+
+
+class Gauge(Counter):
+    """Текущее значение: задается целиком (например, из снимка состояния системы)"""
+    kind = 'gauge'
+
+    def set(self, value):
+        self.value = value  # Присваивание атомарно - блокировка не нужна
+
+
+class Histogram:
+    """Распределение значений по корзинам с верхними границами buckets"""
+    kind = 'histogram'
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Последняя корзина - сверх всех границ
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def state(self):
+        """Согласованная копия: корзины, сумма, число наблюдений"""
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def quantile(self, q, state=None):
+        """Оценка квантиля по корзинам, как histogram_quantile в Prometheus (None - нет наблюдений)"""
+        counts, _, count = state or self.state()
+        if not count:
+            return None
+        rank = q * count
+        cumulative = 0
+        for index, n in enumerate(counts):
+            if n and cumulative + n >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]  # Выше последней границы оценки нет
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / n
+            cumulative += n
+        return self.buckets[-1]
+
+    def sample(self):
+        state = self.state()
+        _, total, count = state
+        return {'count': count, 'sum': total, 'p50': self.quantile(0.5, state),
+                'p95': self.quantile(0.95, state), 'p99': self.quantile(0.99, state)}
+
+
+class NullMetric:
+    """Метрика выключенного реестра: наблюдения ничего не стоят и никуда не попадают"""
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def set(self, value):
+        pass
+
+
+NULL_METRIC = NullMetric()
+
+
+class Metrics:
+    """Реестр метрик: метрика определяется именем и метками
+
+    Повторный запрос с теми же именем и метками возвращает ту же метрику,
+    поэтому ассистенты одного процесса (сессии сервера, мягкий перезапуск)
+    пишут в общие метрики. Частые метрики стоит запросить один раз и хранить.
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._families = {}  # Имя -> (тип, описание, {метки: метрика}) в порядке создания
+        self._lock = threading.Lock()
+
+    def counter(self, name, description, **labels):
+        return self._get(Counter, name, description, labels)
+
+    def gauge(self, name, description, **labels):
+        return self._get(Gauge, name, description, labels, Gauge.kind)
+
+    def histogram(self, name, description, buckets=LATENCY_BUCKETS, **labels):
+        return self._get(lambda: Histogram(buckets), name, description, labels, Histogram.kind)
+
+    def _get(self, factory, name, description, labels, kind=Counter.kind):
+        if not self.enabled:
+            return NULL_METRIC
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = (kind, description, {})
+            elif family[0] != kind:
+                raise ValueError(f"Метрика {name} уже объявлена как {family[0]}")
+            metric = family[2].get(key)
+            if metric is None:
+                metric = family[2][key] = factory()
+            return metric
+
+    def _items(self):
+        with self._lock:
+            return [(name, kind, description, list(metrics.items()))
+                    for name, (kind, description, metrics) in self._families.items()]
+
+    def render(self):
+        """Текстовый формат Prometheus (версия 0.0.4)"""
+        lines = []
+        for name, kind, description, metrics in self._items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in metrics:
+                if kind != Histogram.kind:
+                    lines.append(f"{name}{format_labels(labels)} {metric.value}")
+                    continue
+                counts, total, count = metric.state()
+                cumulative = 0
+                for bound, n in zip(metric.buckets + (float('inf'),), counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float('inf') else repr(float(bound))
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {total!r}")
+                lines.append(f"{name}_count{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Метрики для JSON: имя -> [{метки, значение или число/сумма/перцентили}]"""
+        return {name: [dict(metric.sample(), labels=dict(labels)) for labels, metric in metrics]
+                for name, kind, description, metrics in self._items()}
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+METRICS = Metrics()  # Реестр процесса по умолчанию
+
+
+def handler_class():
+    """Обработчик HTTP; http.server импортируется только при включенном HTTP, чтобы не задерживать запуск"""
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """/metrics - текст Prometheus, /metrics.json - тот же снимок, что пишется в файл"""
+        def do_GET(self):
+            if self.path == '/metrics':
+                body = self.server.exporter.metrics.render().encode('utf-8')
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path == '/metrics.json':
+                body = json.dumps(self.server.exporter.snapshot(), ensure_ascii=False).encode('utf-8')
+                content_type = "application/json; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Опрос каждые несколько секунд не должен засорять консоль
+
+    return MetricsHandler
+
+
+class MetricsExporter:
+    """Отдает метрики по HTTP и раз в interval секунд сохраняет снимок JSON
+
+    port=None - без HTTP, path=None - без снимка. Сервер слушает только
+    localhost: метрики не предназначены для чужих машин. Порт открывается
+    в фоне; если он занят, log получает сообщение, а ассистент работает дальше.
+    """
+    def __init__(self, metrics=METRICS, port=None, path=None, interval=60, host='127.0.0.1', log=print):
+        self.metrics = metrics
+        self.port = port
+        self.path = path
+        self.interval = interval
+        self.host = host
+        self.log = log
+        self.server = None
+        self.listening = threading.Event()  # Порт открыт (или открыть не удалось)
+        self.snapshots = 0  # Сколько раз сохранен снимок
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        if self.port is not None:
+            self._threads.append(threading.Thread(target=self._serve, name="metrics-http", daemon=True))
+        if self.path:
+            self._threads.append(threading.Thread(target=self._write_loop, name="metrics-snapshot", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Останавливает HTTP и сохраняет последний снимок"""
+        with self._lock:
+            self._stopped.set()
+            server = self.server
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.path:
+            self.write_snapshot()
+
+    def snapshot(self):
+        return {'time': datetime.now().isoformat(timespec='seconds'), 'metrics': self.metrics.snapshot()}
+
+    def write_snapshot(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.path)  # Читатель файла не увидит недописанный снимок
+        self.snapshots += 1
+
+    def _serve(self):
+        from http.server import ThreadingHTTPServer
+        try:
+            server = ThreadingHTTPServer((self.host, self.port), handler_class())
+        except OSError as e:
+            self.log(f"Метрики по HTTP недоступны ({self.host}:{self.port}): {e}")
+            self.listening.set()
+            return
+        server.daemon_threads = True
+        server.exporter = self
+        with self._lock:
+            if self._stopped.is_set():
+                server.server_close()
+                self.listening.set()
+                return
+            self.server = server  # После этого stop() остановит serve_forever, даже еще не начатый
+        self.listening.set()
+        server.serve_forever()
+
+    def _write_loop(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.write_snapshot()
+            except OSError as e:
+                self.log(f"Снимок метрик не сохранен: {e}")
@@ -0,0 +1,156 @@
+"""Кэш моделей распознавания: одна загруженная модель на имя, LRU в пределах бюджета памяти"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import METRICS
+from event_log import log_event
+
+
+def directory_size(path):
+    """Размер файлов в папке, байт"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def resident_memory():
+    """Резидентная память процесса, байт (None - без psutil)"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class CachedModel:
+    """Загруженная модель и ее учет: размер в памяти, время загрузки, обращения"""
+    def __init__(self, name, model, size, load_time):
+        self.name = name
+        self.model = model
+        self.size = size
+        self.load_time = load_time
+        self.uses = 0
+
+
+class ModelCache:
+    """Модели распознавания по имени, загружаемые при первом обращении
+
+    Все распознаватели одной модели получают один и тот же экземпляр Model.
+    Когда загруженные модели вместе занимают больше memory_bytes, выгружаются
+    давно не использованные (кроме только что запрошенной); память освобождается,
+    когда распознаватели выгруженной модели тоже удалены. Размер модели - прирост
+    резидентной памяти процесса при загрузке, а без psutil - размер ее файлов.
+    Загрузки идут по одной, чтобы прирост памяти относился к одной модели.
+    Размер, время загрузки, загрузки и выгрузки каждой модели публикуются в
+    metrics (quant_model_*) и в журнал событий.
+    """
+    def __init__(self, loader, memory_bytes=None, directory=None, metrics=METRICS):
+        self.loader = loader  # Имя -> Model
+        self.memory_bytes = memory_bytes  # None - без ограничения
+        self.directory = directory  # Папка моделей - для оценки размера по файлам
+        self.models = OrderedDict()  # Имя -> CachedModel, в порядке использования
+        self.evictions = 0
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def get(self, name):
+        """Модель name; загружается при первом обращении"""
+        entry = self._touch(name)
+        if entry is not None:
+            return entry.model
+        with self._load_lock:
+            entry = self._touch(name)  # Пока ждали, модель мог загрузить другой поток
+            if entry is not None:
+                return entry.model
+            rss = resident_memory()
+            started = time.perf_counter()
+            model = self.loader(name)
+            load_time = time.perf_counter() - started
+            size = resident_memory() - rss if rss is not None else 0
+            if size <= 0 and self.directory:
+                size = directory_size(os.path.join(self.directory, name))
+            with self._lock:
+                self.models[name] = entry = CachedModel(name, model, size, load_time)
+                entry.uses += 1
+                evicted = self._evict(keep=name)
+            self._loaded(entry)
+            for old in evicted:
+                self._unloaded(old)
+            return model
+
+    def loaded(self, name):
+        with self._lock:
+            return name in self.models
+
+    def evict(self, name):
+        """Выгружает модель; False, если она не загружена"""
+        with self._lock:
+            entry = self.models.pop(name, None)
+        if entry is None:
+            return False
+        self._unloaded(entry)
+        return True
+
+    @property
+    def resident_bytes(self):
+        with self._lock:
+            return sum(entry.size for entry in self.models.values())
+
+    def report(self):
+        """Загруженные модели, начиная с давно не использованной: имя, байт, время загрузки, обращений"""
+        with self._lock:
+            return [(entry.name, entry.size, entry.load_time, entry.uses) for entry in self.models.values()]
+
+    def _touch(self, name):
+        with self._lock:
+            entry = self.models.get(name)
+            if entry is not None:
+                self.models.move_to_end(name)
+                entry.uses += 1
+            return entry
+
+    def _evict(self, keep):
+        """Выгружает давно не использованные модели сверх бюджета (под блокировкой); возвращает выгруженные"""
+        evicted = []
+        if self.memory_bytes is None:
+            return evicted
+        used = sum(entry.size for entry in self.models.values())
+        for name in list(self.models):
+            if used <= self.memory_bytes:
+                break
+            if name == keep:
+                continue
+            entry = self.models.pop(name)
+            used -= entry.size
+            self.evictions += 1
+            self.metrics.counter('quant_model_evictions_total', "Модели, выгруженные сверх бюджета памяти",
+                                 model=name).inc()
+            evicted.append(entry)
+        return evicted
+
+    def _publish(self, entry, size):
+        self.metrics.gauge('quant_model_resident_bytes', "Память загруженной модели, байт",
+                           model=entry.name).set(size)
+        self.metrics.gauge('quant_model_cache_bytes', "Память всех загруженных моделей, байт").set(
+            self.resident_bytes)
+
+    def _loaded(self, entry):
+        self._publish(entry, entry.size)
+        self.metrics.gauge('quant_model_load_seconds', "Время последней загрузки модели",
+                           model=entry.name).set(entry.load_time)
+        self.metrics.counter('quant_model_loads_total', "Загрузки моделей", model=entry.name).inc()
+        log_event(f"Модель {entry.name} в кэше: {entry.size / 2 ** 20:.0f} МБ, загрузка {entry.load_time:.1f} с",
+                  model=entry.name, bytes=entry.size, seconds=round(entry.load_time, 3))
+
+    def _unloaded(self, entry):
+        self._publish(entry, 0)
+        log_event(f"Модель {entry.name} выгружена из кэша ({entry.size / 2 ** 20:.0f} МБ)",
+                  model=entry.name, bytes=entry.size)
@@ -0,0 +1,327 @@
+"""Загрузка модели: докачка по Range, проверка SHA-256, распаковка на лету и атомарная установка"""
+import hashlib
+import io
+import os
+import shutil
+import struct
+import tempfile
+import time
+import zipfile
+import zlib
+
+READ_BYTES = 64 * 1024  # Размер чтения из сети: при обрыве теряется не больше него
+WRITE_BUFFER = 1024 * 1024  # Буфер записи на диск
+
+
+def read_manifest(path):
+    """Читает манифест в формате sha256sum ("<хеш>  <имя файла>"): имя -> хеш"""
+    hashes = {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    hashes[parts[1].lstrip('*')] = parts[0].lower()
+    except OSError:
+        pass
+    return hashes
+
+
+def fetch(url, path, sha256=None, sink=None, chunk_size=READ_BYTES, timeout=(10, 30),
+          retries=5, on_progress=None):
+    """Скачивает url в path, продолжая с места обрыва
+
+    Данные пишутся в path + '.part'; при обрыве следующая попытка (в том числе
+    после перезапуска программы) запрашивает только недостающий хвост через
+    заголовок Range. Готовый файл переименовывается в path только после
+    проверки SHA-256. sink (если задан) получает весь поток байт по порядку:
+    feed(data) и reset(), когда загрузка начинается заново.
+    Возвращает число байт, полученных из сети.
+    """
+    import requests
+    partial = path + '.part'
+    fetched = 0
+    for attempt in range(retries + 1):
+        hasher = hashlib.sha256()
+        offset = replay_partial(partial, hasher, sink, WRITE_BUFFER)
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        try:
+            with requests.get(url, stream=True, headers=headers, timeout=timeout) as response:
+                if response.status_code == 416 and offset:
+                    break  # Файл уже скачан целиком
+                response.raise_for_status()
+                if offset and response.status_code != 206:
+                    # Сервер не умеет Range - начинаем заново
+                    offset = 0
+                    hasher = hashlib.sha256()
+                    if sink is not None:
+                        sink.reset()
+                total = offset + int(response.headers.get('content-length', 0))
+                with open(partial, 'ab' if offset else 'wb', buffering=WRITE_BUFFER) as f:
+                    done = offset
+                    for data in response.iter_content(chunk_size=chunk_size):
+                        f.write(data)
+                        hasher.update(data)
+                        if sink is not None:
+                            sink.feed(data)
+                        done += len(data)
+                        fetched += len(data)
+                        if on_progress is not None:
+                            on_progress(done, total)
+            break
+        except requests.RequestException:
+            if attempt == retries:
+                raise
+            time.sleep(min(2 ** attempt, 30))  # Часть файла сохранена, повторяем с ней
+
+    if sha256 and hasher.hexdigest() != sha256.lower():
+        os.remove(partial)  # Испорченный файл докачивать бессмысленно
+        raise ValueError(f"Контрольная сумма {os.path.basename(path)} не совпадает")
+    os.replace(partial, path)
+    return fetched
+
+
+def replay_partial(partial, hasher, sink, chunk_size):
+    """Пропускает уже скачанную часть через хеш и sink; возвращает ее размер"""
+    if sink is not None:
+        sink.reset()
+    try:
+        f = open(partial, 'rb')
+    except FileNotFoundError:
+        return 0
+    size = 0
+    with f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            hasher.update(data)
+            if sink is not None:
+                sink.feed(data)
+            size += len(data)
+    return size
+
+
+def safe_path(directory, name):
+    """Путь файла архива внутри directory; имена с .. и абсолютные пути запрещены"""
+    path = os.path.normpath(os.path.join(directory, name))
+    if os.path.isabs(name) or not path.startswith(os.path.normpath(directory) + os.sep):
+        raise ValueError(f"Недопустимое имя в архиве: {name}")
+    return path
+
+
+class StreamingUnzip:
+    """Распаковка zip по мере скачивания, по локальным заголовкам файлов
+
+    Центральный каталог в конце архива не нужен: каждый файл распаковывается,
+    как только пришли его данные, и проверяется по CRC-32. Zip64 не поддерживается.
+    Ошибка разбора не прерывает загрузку: она запоминается в error, дальше поток
+    пропускается, а close() ее возбуждает (архив можно распаковать целиком).
+    """
+    LOCAL_HEADER = struct.Struct('<4sHHHHHIIIHH')
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = 0
+        self.reset()
+
+    def reset(self):
+        """Начинает распаковку заново (загрузка пошла с начала)"""
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        self.buffer = bytearray()
+        self.finished = False  # Дошли до центрального каталога
+        self.files = 0
+        self._file = None
+        self._decompressor = None
+        self._remaining = None  # Сжатых байт текущего файла осталось (None - до дескриптора)
+        self._crc = 0
+        self._expected_crc = 0
+        self._descriptor = False
+        self._skip = 0
+        self.error = None  # Ошибка разбора; после нее поток не распаковывается
+
+    def feed(self, data):
+        if self.finished or self.error is not None:
+            return
+        self.buffer += data
+        try:
+            while self._step():
+                pass
+        except (ValueError, zlib.error, OSError) as error:  # Испорченный поток deflate - zlib.error
+            self.error = error
+            self.buffer = bytearray()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def close(self):
+        """Проверяет, что архив распакован без ошибок и дочитан до конца"""
+        if self.error is not None:
+            raise self.error
+        if not self.finished:
+            raise ValueError("Архив оборван")
+
+    def _step(self):
+        """Обрабатывает следующую часть буфера; False - нужны еще данные"""
+        if self._skip:
+            size = min(self._skip, len(self.buffer))
+            del self.buffer[:size]
+            self._skip -= size
+            return size > 0
+        if self._descriptor:
+            return self._read_descriptor()
+        if self._file is not None:
+            return self._read_data()
+        return self._read_header()
+
+    def _read_header(self):
+        if len(self.buffer) < 4:
+            return False
+        signature = bytes(self.buffer[:4])
+        if signature in (b'PK\x01\x02', b'PK\x05\x06'):
+            self.finished = True  # Дальше центральный каталог - все файлы уже распакованы
+            self.buffer = bytearray()
+            return False
+        if signature != b'PK\x03\x04':
+            raise ValueError("Поврежденный zip: нет локального заголовка")
+        if len(self.buffer) < self.LOCAL_HEADER.size:
+            return False
+        (_, _, flags, method, _, _, crc, compressed, _,
+         name_length, extra_length) = self.LOCAL_HEADER.unpack_from(self.buffer)
+        header_size = self.LOCAL_HEADER.size + name_length + extra_length
+        if len(self.buffer) < header_size:
+            return False
+        raw_name = bytes(self.buffer[self.LOCAL_HEADER.size:self.LOCAL_HEADER.size + name_length])
+        del self.buffer[:header_size]
+        if compressed == 0xFFFFFFFF:
+            raise ValueError("Zip64 не поддерживается")
+        name = raw_name.decode('utf-8' if flags & 0x800 else 'cp437')
+        is_dir = name.endswith('/')
+        # Без сжатия и с размером в дескрипторе конец данных не найти (у папки их нет)
+        if method not in (0, 8) or (flags & 0x08 and method == 0 and not is_dir):
+            raise ValueError(f"Неподдерживаемый способ сжатия: {method}")
+
+        path = safe_path(self.directory, name)
+        if is_dir:
+            os.makedirs(path, exist_ok=True)
+            if not flags & 0x08:
+                self._skip = compressed  # У папки бывают данные: пустой поток deflate
+                return True
+            # Размер данных папки - в дескрипторе после них (флаг 3):
+            # данные разбираются как у файла, но никуда не пишутся
+            self._file = io.BytesIO()
+            self._descriptor = method == 0  # Без сжатия данных у папки нет - сразу дескриптор
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._file = open(path, 'wb')
+        self._decompressor = zlib.decompressobj(-15) if method == 8 else None
+        self._remaining = None if flags & 0x08 else compressed
+        self._expected_crc = crc
+        self._crc = 0
+        return True
+
+    def _read_data(self):
+        if not self.buffer:
+            return False
+        if self._remaining is not None:
+            size = min(self._remaining, len(self.buffer))
+            data = bytes(self.buffer[:size])
+            del self.buffer[:size]
+            self._remaining -= size
+            self._write(self._decompressor.decompress(data) if self._decompressor else data)
+            if self._remaining == 0:
+                if self._decompressor is not None:
+                    self._write(self._decompressor.flush())
+                self._finish_file()
+            return True
+
+        # Размер неизвестен (флаг 3): конец файла определяет сам поток deflate
+        data = bytes(self.buffer)
+        self.buffer = bytearray()
+        self._write(self._decompressor.decompress(data))
+        if self._decompressor.eof:
+            self.buffer = bytearray(self._decompressor.unused_data)
+            self._descriptor = True
+        return True
+
+    def _read_descriptor(self):
+        if len(self.buffer) < 16:
+            return False
+        if self.buffer[:4] == b'PK\x07\x08':
+            self._expected_crc = struct.unpack_from('<I', self.buffer, 4)[0]
+            del self.buffer[:16]
+        else:
+            self._expected_crc = struct.unpack_from('<I', self.buffer, 0)[0]
+            del self.buffer[:12]
+        self._descriptor = False
+        self._finish_file()
+        return True
+
+    def _write(self, data):
+        self._file.write(data)
+        self._crc = zlib.crc32(data, self._crc)
+
+    def _finish_file(self):
+        self._file.close()
+        self._file = None
+        self.files += 1
+        if self._crc != self._expected_crc:
+            raise ValueError("CRC распакованного файла не совпадает")
+
+
+def extract(archive, directory):
+    """Распаковывает скачанный архив целиком (без распаковки на лету)"""
+    with zipfile.ZipFile(archive) as zf:
+        for info in zf.infolist():
+            safe_path(directory, info.filename)
+        zf.extractall(directory)
+
+
+def model_root(directory):
+    """Папка модели внутри распакованного архива: единственная папка верхнего уровня или сам архив"""
+    names = os.listdir(directory)
+    if len(names) == 1 and os.path.isdir(os.path.join(directory, names[0])):
+        return os.path.join(directory, names[0])
+    return directory
+
+
+def install_model(url, models_dir, name, sha256=None, stream_extract=True, on_progress=None):
+    """Скачивает, проверяет и устанавливает модель в models_dir/name
+
+    Модель распаковывается во временную папку рядом и переименовывается
+    в models_dir/name одним вызовом, поэтому недораспакованная модель
+    никогда не оказывается на месте готовой. Возвращает байты, полученные из сети.
+    """
+    os.makedirs(models_dir, exist_ok=True)
+    target = os.path.join(models_dir, name)
+    archive = os.path.join(models_dir, name + '.zip')
+    temp_dir = tempfile.mkdtemp(prefix=f'.{name}-', dir=models_dir)
+    try:
+        sink = StreamingUnzip(temp_dir) if stream_extract else None
+        fetched = fetch(url, archive, sha256, sink=sink, on_progress=on_progress)
+        if sink is not None:
+            try:
+                sink.close()
+            except (ValueError, zlib.error, OSError):
+                # Архив, который не удалось разобрать на лету, распаковываем целиком
+                sink.reset()
+                sink = None
+        if sink is None:
+            try:
+                extract(archive, temp_dir)
+            except (ValueError, zlib.error, zipfile.BadZipFile):
+                # Испорченный архив не докачивается: следующая попытка скачает его заново
+                for path in (archive, archive + '.part'):
+                    if os.path.exists(path):
+                        os.remove(path)
+                raise
+        os.replace(model_root(temp_dir), target)
+        os.remove(archive)
+        return fetched
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
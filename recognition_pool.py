@@ -0,0 +1,225 @@
+"""Распознавание в пуле процессов: декодирование Vosk вне GIL процесса ассистента"""
+import itertools
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+
+RING_BYTES = 2 * 1024 * 1024  # Кольцо сессии: с запасом больше самой длинной передаваемой фразы
+
+
+def attach_ring(name):
+    """Подключает кольцо, созданное процессом ассистента (удаляет его тоже он)"""
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:  # До Python 3.13 параметра track нет
+        return shared_memory.SharedMemory(name)
+
+
+def worker_main(connection, sample_rate):
+    """Цикл процесса-исполнителя: запросы по одному, ответ на каждый
+
+    Модели загружаются при первом обращении и общие для всех распознавателей
+    процесса; аудио читается из колец сессий по смещению и длине из запроса.
+    """
+    from vosk import Model, KaldiRecognizer, SetLogLevel
+    SetLogLevel(-1)
+    models = {}  # Путь -> Model
+    rings = {}  # Номер сессии -> (SharedMemory, емкость)
+    recognizers = {}  # Номер -> (номер сессии, KaldiRecognizer)
+
+    while True:
+        request = connection.recv()
+        op = request[0]
+        try:
+            if op == 'accept':
+                _, rec_id, start, length = request
+                session_id, recognizer = recognizers[rec_id]
+                ring, capacity = rings[session_id]
+                start %= capacity
+                first = min(length, capacity - start)
+                data = bytes(ring.buf[start:start + first])
+                if first < length:
+                    data += bytes(ring.buf[:length - first])
+                value = recognizer.AcceptWaveform(data)
+            elif op == 'result':
+                _, rec_id, method = request
+                value = getattr(recognizers[rec_id][1], method)()
+            elif op == 'reset':
+                recognizers[request[1]][1].Reset()
+                value = None
+            elif op == 'create':
+                _, rec_id, session_id, model_path, grammar = request
+                if model_path not in models:
+                    models[model_path] = Model(model_path)
+                model = models[model_path]
+                if grammar is None:
+                    recognizer = KaldiRecognizer(model, sample_rate)
+                else:
+                    recognizer = KaldiRecognizer(model, sample_rate, grammar)
+                recognizer.SetWords(True)
+                recognizers[rec_id] = (session_id, recognizer)
+                value = None
+            elif op == 'load':
+                started = time.perf_counter()
+                if request[1] not in models:
+                    models[request[1]] = Model(request[1])
+                value = time.perf_counter() - started
+            elif op == 'open':
+                _, session_id, ring_name, capacity = request
+                rings[session_id] = (attach_ring(ring_name), capacity)
+                value = None
+            elif op == 'release':
+                # Распознаватели сессии удаляются; с close=True - и ее кольцо
+                _, session_id, close = request
+                for rec_id in [r for r, (s, _) in recognizers.items() if s == session_id]:
+                    del recognizers[rec_id]
+                if close:
+                    ring, _ = rings.pop(session_id)
+                    ring.close()
+                value = None
+            elif op == 'stop':
+                connection.send(('ok', None))
+                return
+            else:
+                raise ValueError(f"Неизвестный запрос: {op}")
+            connection.send(('ok', value))
+        except Exception as e:
+            connection.send(('error', f"{type(e).__name__}: {e}"))
+
+
+class Worker:
+    """Процесс-исполнитель и канал к нему; запросы к одному процессу идут по очереди"""
+    def __init__(self, context, sample_rate, index):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(child, sample_rate),
+                                       name=f"recognition-{index}", daemon=True)
+        self.process.start()
+        child.close()
+        self.sessions = 0  # Сколько сессий закреплено за процессом
+        self.busy_time = 0.0  # Сколько секунд запросы ждали ответа процесса
+        self._lock = threading.Lock()
+
+    def call(self, *request):
+        started = time.perf_counter()
+        with self._lock:
+            self.connection.send(request)
+            status, value = self.connection.recv()
+            self.busy_time += time.perf_counter() - started
+        if status != 'ok':
+            raise RuntimeError(f"Процесс распознавания: {value}")
+        return value
+
+
+class RemoteRecognizer:
+    """Распознаватель в процессе-исполнителе с интерфейсом KaldiRecognizer"""
+    def __init__(self, session, rec_id):
+        self.session = session
+        self.id = rec_id
+
+    def AcceptWaveform(self, data):
+        start = self.session.write(data)
+        return self.session.worker.call('accept', self.id, start, len(data))
+
+    def Result(self):
+        return self.session.worker.call('result', self.id, 'Result')
+
+    def PartialResult(self):
+        return self.session.worker.call('result', self.id, 'PartialResult')
+
+    def FinalResult(self):
+        return self.session.worker.call('result', self.id, 'FinalResult')
+
+    def Reset(self):
+        self.session.worker.call('reset', self.id)
+
+    def SetWords(self, enabled):
+        pass  # Слова включаются при создании распознавателя
+
+
+class PoolSession:
+    """Распознаватели одного ассистента: все на одном процессе, чтобы их состояние не переезжало
+
+    Аудио передается через кольцо в общей памяти: процесс ассистента пишет
+    байты в кольцо, по каналу уходят только смещение и длина. Запросы
+    синхронные, поэтому к моменту следующей записи предыдущая уже прочитана.
+    """
+    def __init__(self, pool, worker, session_id, ring_bytes):
+        self.pool = pool
+        self.worker = worker
+        self.id = session_id
+        self.ring = shared_memory.SharedMemory(create=True, size=ring_bytes)
+        self.capacity = ring_bytes
+        self.write_pos = 0  # Всего записано байт
+        worker.call('open', session_id, self.ring.name, ring_bytes)
+
+    def write(self, data):
+        """Копирует аудио в кольцо и возвращает позицию его начала"""
+        size = len(data)
+        if size > self.capacity:
+            raise ValueError(f"Фрагмент {size} байт больше кольца ({self.capacity})")
+        start = self.write_pos % self.capacity
+        first = min(size, self.capacity - start)
+        src = memoryview(data)
+        self.ring.buf[start:start + first] = src[:first]
+        if first < size:
+            self.ring.buf[:size - first] = src[first:]
+        position = self.write_pos
+        self.write_pos += size
+        return position
+
+    def load(self, model_path):
+        """Загружает модель в процесс сессии заранее; возвращает время загрузки"""
+        return self.worker.call('load', model_path)
+
+    def recognizer(self, model_path, grammar=None):
+        rec_id = next(self.pool.ids)
+        self.worker.call('create', rec_id, self.id, model_path, grammar)
+        return RemoteRecognizer(self, rec_id)
+
+    def release(self):
+        """Удаляет распознаватели сессии (перед созданием новых)"""
+        self.worker.call('release', self.id, False)
+
+    def close(self):
+        try:
+            self.worker.call('release', self.id, True)
+        except (OSError, EOFError, RuntimeError):
+            pass  # Пул уже остановлен
+        self.pool.detach(self)
+        self.ring.close()
+        self.ring.unlink()
+
+
+class RecognitionPool:
+    """Пул процессов распознавания
+
+    Каждая сессия (ассистент или клиент сервера) закрепляется за наименее
+    занятым процессом и остается на нем. Процессы запускаются методом spawn -
+    одинаково на Windows и Linux; каждый загружает свою копию модели.
+    """
+    def __init__(self, workers=None, sample_rate=16000, ring_bytes=RING_BYTES):
+        context = multiprocessing.get_context('spawn')
+        self.workers = [Worker(context, sample_rate, index) for index in range(workers or multiprocessing.cpu_count())]
+        self.ring_bytes = ring_bytes
+        self.ids = itertools.count(1)  # Номера сессий и распознавателей
+        self._lock = threading.Lock()
+
+    def session(self):
+        """Новая сессия на наименее занятом процессе"""
+        with self._lock:
+            worker = min(self.workers, key=lambda w: w.sessions)
+            worker.sessions += 1
+        return PoolSession(self, worker, next(self.ids), self.ring_bytes)
+
+    def detach(self, session):
+        with self._lock:
+            session.worker.sessions -= 1
+
+    def close(self):
+        for worker in self.workers:
+            try:
+                worker.call('stop')
+            except (OSError, EOFError):
+                pass
+            worker.process.join(timeout=5)
@@ -0,0 +1,103 @@
+"""Потоковая передискретизация захвата: сведение каналов в моно и полифазный фильтр до частоты распознавания"""
+from math import gcd
+
+import numpy as np
+
+
+class Resampler:
+    """Переводит 16-битный PCM с частотой in_rate и channels каналами в моно out_rate
+
+    Частоты связаны дробью up/down (48000 -> 16000: 1/3, 44100 -> 16000: 160/441).
+    Фильтр нижних частот (sinc с окном Кайзера, срез rolloff от новой частоты
+    Найквиста) разложен на up фаз по taps коэффициентов, и каждый выходной
+    сэмпл - скалярное произведение одной фазы с taps последними входными.
+    Обрабатываются целые периоды по down входных сэмплов (up выходных), все
+    периоды чанка - одним einsum; остаток и последние taps - 1 сэмплов
+    переходят к следующему чанку, поэтому на стыках нет щелчков. Рабочие
+    массивы выделяются один раз и растут, только если пришел чанк больше
+    прежних; результат - memoryview рабочего массива без копии, поэтому
+    его нужно скопировать (например, RingBuffer.write) до следующего вызова.
+    При совпадающих частотах каналы только сводятся в моно.
+    """
+    def __init__(self, in_rate, out_rate, channels=1, taps=64, rolloff=0.9, beta=6.0):
+        divisor = gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.channels = channels
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        self.taps = taps
+        self.history = taps - 1
+        up, down = self.up, self.down
+
+        length = taps * up
+        cutoff = rolloff * 0.5 / max(up, down)  # Доля частоты дискретизации после вставки нулей
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * (np.arange(length) - (length - 1) / 2)) * np.kaiser(length, beta)
+        kernel *= up / kernel.sum()  # Единичное усиление после вставки up - 1 нулей
+        # Выход n периода: фаза (n * down) % up, последний входной сэмпл (n * down) // up
+        steps = np.arange(up) * down
+        phases = steps % up
+        self.table = kernel.reshape(taps, up).T[phases].astype(np.float32)  # (up, taps)
+        self.offsets = self.history + (steps // up)[:, None] - np.arange(taps)[None, :]  # (up, taps)
+
+        self.pending = 0  # Входные сэмплы после истории, еще не вошедшие в целый период
+        self._samples = np.zeros(self.history + down, dtype=np.float32)  # История + ожидающие
+        self._indices = {}  # Число периодов -> индексы входных сэмплов (periods, up, taps)
+        self._gathered = np.empty((0, up, taps), dtype=np.float32)
+        self._output = np.empty((0, up), dtype=np.float32)
+        self._pcm = np.empty(0, dtype=np.int16)
+        self._view = memoryview(self._pcm).cast('B')  # Байты _pcm: результат process без копии
+
+    def reset(self):
+        """Забывает историю и остаток (новый поток с устройства)"""
+        self.pending = 0
+        self._samples[:self.history] = 0
+
+    def process(self, data):
+        """Принимает чанк входного PCM и возвращает готовые выходные сэмплы
+
+        Результат - memoryview, который перезаписывается следующим вызовом.
+        """
+        frames = np.frombuffer(data, dtype=np.int16)
+        count = len(frames) // self.channels
+        if self.up == self.down:  # Частота совпадает - только сведение каналов
+            mono = frames[:count * self.channels].reshape(count, self.channels).mean(axis=1)
+            return np.rint(mono).astype(np.int16).tobytes()
+        start = self.history + self.pending
+        self._reserve(start + count)
+        samples = self._samples
+        if self.channels == 1:
+            samples[start:start + count] = frames[:count]
+        else:
+            np.mean(frames[:count * self.channels].reshape(count, self.channels), axis=1, dtype=np.float32,
+                     out=samples[start:start + count])
+        available = self.pending + count
+        periods = available // self.down
+        consumed = periods * self.down
+        self.pending = available - consumed
+
+        if periods:
+            indices = self._indices.get(periods)
+            if indices is None:
+                indices = self.offsets[None] + (np.arange(periods) * self.down)[:, None, None]
+                self._indices[periods] = indices
+            if len(self._gathered) < periods:
+                self._gathered = np.empty((periods, self.up, self.taps), dtype=np.float32)
+                self._output = np.empty((periods, self.up), dtype=np.float32)
+                self._pcm = np.empty(periods * self.up, dtype=np.int16)
+                self._view = memoryview(self._pcm).cast('B')
+            gathered, output = self._gathered[:periods], self._output[:periods]
+            np.take(samples, indices, out=gathered)
+            np.einsum('pnk,nk->pn', gathered, self.table, out=output)
+            np.clip(output, -32768, 32767, out=output)
+            np.rint(output.reshape(-1), out=self._pcm[:periods * self.up], casting='unsafe')
+        # История для следующего чанка - последние taps - 1 сэмплов перед неиспользованным остатком
+        keep = self.history + self.pending
+        samples[:keep] = samples[consumed:consumed + keep]
+        return self._view[:periods * self.up * 2] if periods else b""
+
+    def _reserve(self, size):
+        if len(self._samples) < size:
+            samples = np.zeros(size, dtype=np.float32)
+            samples[:len(self._samples)] = self._samples
+            self._samples = samples
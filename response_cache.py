@@ -0,0 +1,90 @@
+"""Кэш озвученных ответов: PCM на диске и LRU в памяти"""
+import hashlib
+import os
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Аудио неизменных фраз, отрендеренное движком речи один раз
+
+    Ключ - текст, голос и скорость речи: при смене голоса старые записи
+    просто перестают находиться. На диске лежит сырой 16-битный моно PCM
+    (<ключ>.pcm), в памяти - последние использованные фразы в пределах
+    memory_bytes. Фразы с изменяемой частью озвучиваются по частям:
+    известное начало из кэша, остальное - движком (см. plan()).
+    Кэшем пользуется только поток вывода речи, блокировки не нужны.
+    """
+    def __init__(self, directory, memory_bytes=8 * 1024 * 1024, phrases=(), prefixes=()):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.phrases = set(phrases)  # Фразы, которые озвучиваются целиком из кэша
+        # Неизменные начала фраз: длинные раньше, чтобы выбиралось самое длинное
+        self.prefixes = sorted(prefixes, key=len, reverse=True)
+        self.memory = OrderedDict()  # Ключ -> PCM, в порядке использования
+        self.memory_used = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(text, voice, rate):
+        return hashlib.sha1(f"{voice}\n{rate}\n{text}".encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.pcm')
+
+    def plan(self, text):
+        """Делит фразу на части: [(текст, из кэша)]"""
+        if text in self.phrases:
+            return [(text, True)]
+        for prefix in self.prefixes:
+            if text.startswith(prefix + " "):
+                return [(prefix, True), (text[len(prefix) + 1:], False)]
+        return [(text, False)]
+
+    def get(self, text, voice, rate):
+        """PCM фразы из памяти или с диска; None - фраза еще не отрендерена"""
+        key = self.key(text, voice, rate)
+        pcm = self.memory.get(key)
+        if pcm is not None:
+            self.memory.move_to_end(key)
+            self.memory_hits += 1
+            return pcm
+        try:
+            with open(self.path(key), 'rb') as f:
+                pcm = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self.remember(key, pcm)
+        return pcm
+
+    def put(self, text, voice, rate, pcm):
+        """Сохраняет отрендеренную фразу на диск и в память"""
+        key = self.key(text, voice, rate)
+        path = self.path(key)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(pcm)
+        os.replace(temp_path, path)  # Недописанный файл никогда не читается как готовый
+        self.remember(key, pcm)
+
+    def missing(self, voice, rate):
+        """Фразы и начала фраз, которых еще нет на диске"""
+        return [text for text in sorted(self.phrases) + self.prefixes
+                if not os.path.exists(self.path(self.key(text, voice, rate)))]
+
+    def remember(self, key, pcm):
+        """Кладет PCM в память, вытесняя давно не использованные фразы"""
+        if len(pcm) > self.memory_bytes:
+            return
+        old = self.memory.pop(key, None)
+        if old is not None:
+            self.memory_used -= len(old)
+        self.memory[key] = pcm
+        self.memory_used += len(pcm)
+        while self.memory_used > self.memory_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_used -= len(evicted)
@@ -0,0 +1,148 @@
+"""Кольцевой буфер аудио: один писатель (захват) и один читатель (распознавание)"""
+import threading
+
+
+class RingBuffer:
+    """Кольцевой буфер поверх одного заранее выделенного bytearray
+
+    Позиции чтения и записи - монотонные счетчики байт: запись двигает только
+    производитель, чтение - только потребитель, поэтому блокировки не нужны.
+    Потребитель получает memoryview на данные внутри буфера без копирования.
+    Последние preroll байт перед позицией чтения не перезаписываются - это
+    история, к которой можно вернуться через rewind().
+    """
+    def __init__(self, capacity, preroll=0):
+        self.capacity = capacity + preroll
+        self.preroll = preroll
+        self.buffer = bytearray(self.capacity)
+        self.view = memoryview(self.buffer)
+        self.write_pos = 0  # Всего записано байт (меняет только производитель)
+        self.read_pos = 0  # Всего прочитано байт (меняет только потребитель)
+        self.closed = False
+
+        self.overflows = 0  # Сколько записей не поместилось
+        self.dropped_bytes = 0  # Сколько байт потеряно при переполнении
+        self.skipped_bytes = 0  # Сколько байт потребитель пропустил через discard()
+        self.wakeups = 0  # Сколько раз потребитель просыпался в ожидании данных
+
+        self._discard_to = 0  # Запрошенная позиция пропуска (см. discard)
+        self._rewind_floor = 0  # Дальше этой позиции история может быть уже перезаписана
+        self._wanted = 0  # Сколько байт ждет потребитель (0 - не ждет)
+        self._space_wanted = 0  # Сколько места ждет производитель
+        self._data_ready = threading.Event()
+        self._space_ready = threading.Event()
+
+    def available(self):
+        """Количество непрочитанных байт"""
+        return self.write_pos - self.read_pos
+
+    def free(self):
+        """Свободное место для записи с учетом сохраняемой истории"""
+        history = min(self.read_pos, self.preroll)
+        return self.capacity - self.available() - history
+
+    # --- Производитель ---
+
+    def write(self, data):
+        """Записывает данные целиком; при нехватке места отбрасывает их и возвращает False"""
+        size = len(data)
+        if size > self.free():
+            self.overflows += 1
+            self.dropped_bytes += size
+            return False
+
+        start = self.write_pos % self.capacity
+        first = min(size, self.capacity - start)
+        src = memoryview(data)
+        self.view[start:start + first] = src[:first]
+        if first < size:
+            self.view[:size - first] = src[first:]
+        self.write_pos += size
+
+        wanted = self._wanted
+        if wanted and self.available() >= wanted:
+            self._data_ready.set()
+        return True
+
+    def wait_writable(self, size, timeout=None):
+        """Ждет, пока в буфере освободится size байт"""
+        if self.free() >= size:
+            return True
+        self._space_ready.clear()
+        self._space_wanted = size
+        if self.free() < size and not self.closed:
+            self._space_ready.wait(timeout)
+        self._space_wanted = 0
+        return self.free() >= size
+
+    def close(self):
+        """Закрывает буфер и будит ожидающего потребителя"""
+        self.closed = True
+        self._data_ready.set()
+        self._space_ready.set()
+
+    # --- Потребитель ---
+
+    def wait(self, min_bytes, timeout=None):
+        """Ждет, пока накопится min_bytes байт; True, если данные есть"""
+        if self.available() >= min_bytes:
+            return True
+        self._data_ready.clear()
+        self._wanted = min_bytes
+        # Повторная проверка после публикации _wanted исключает потерянное пробуждение
+        if self.available() < min_bytes and not self.closed:
+            self._data_ready.wait(timeout)
+            self.wakeups += 1
+        self._wanted = 0
+        return self.available() >= min_bytes
+
+    def peek(self, max_bytes, min_bytes=1, timeout=None):
+        """Возвращает memoryview на непрерывный участок непрочитанных данных
+
+        Данные остаются в буфере до вызова consume(). Если буфер закрыт,
+        отдается остаток даже меньше min_bytes. None - данных нет.
+        """
+        self._apply_discard()
+        if not self.wait(min_bytes, timeout):
+            if not (self.closed and self.available()):
+                return None
+        self._apply_discard()
+
+        start = self.read_pos % self.capacity
+        size = min(max_bytes, self.available(), self.capacity - start)
+        if size <= 0:
+            return None
+        return self.view[start:start + size]
+
+    def consume(self, size):
+        """Отмечает size байт как прочитанные"""
+        self.read_pos += size
+        wanted = self._space_wanted
+        if wanted and self.free() >= wanted:
+            self._space_ready.set()
+
+    def rewind(self, size):
+        """Возвращает позицию чтения назад на size байт истории (не больше preroll)"""
+        floor = max(self._rewind_floor, self.read_pos - self.preroll)
+        size = max(0, min(size, self.read_pos - floor))
+        self.read_pos -= size
+        self._rewind_floor = self.read_pos
+        self._discard_to = min(self._discard_to, self.read_pos)
+        return size
+
+    def discard(self, keep=0):
+        """Просит пропустить непрочитанные данные, оставив последние keep байт
+
+        Безопасно вызывать из любого потока: пропуск применяет сам потребитель.
+        """
+        self._discard_to = max(self._discard_to, self.write_pos - keep)
+
+    def _apply_discard(self):
+        target = self._discard_to
+        if target > self.read_pos:
+            target = min(target, self.write_pos)
+            self.skipped_bytes += target - self.read_pos
+            self.read_pos = target
+            wanted = self._space_wanted
+            if wanted and self.free() >= wanted:
+                self._space_ready.set()
@@ -0,0 +1,134 @@
+"""Планировщик таймеров: один поток и куча сроков по монотонным часам"""
+import heapq
+import threading
+import time
+
+
+class Timer:
+    """Таймер: номер, длительность и срок срабатывания по time.monotonic()"""
+    def __init__(self, timer_id, duration, deadline):
+        self.id = timer_id
+        self.duration = duration
+        self.deadline = deadline
+
+    def remaining(self):
+        """Сколько секунд осталось до срабатывания"""
+        return max(0.0, self.deadline - time.monotonic())
+
+
+class TimerScheduler:
+    """Все таймеры обслуживает один поток
+
+    Поток спит ровно до ближайшего срока (Condition.wait с таймаутом) и
+    просыпается раньше, только если добавлен таймер с более ранним сроком.
+    Отмененные таймеры удаляются из кучи лениво. on_fire вызывается
+    из потока планировщика и не должен надолго его занимать.
+    """
+    def __init__(self, on_fire):
+        self.on_fire = on_fire
+        self.timers = {}  # Номер -> Timer для активных таймеров
+        self.counter = 0  # Счетчик для номеров таймеров
+        self.wakeups = 0  # Сколько раз поток планировщика просыпался
+        self._heap = []  # (срок, номер)
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="timers", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Останавливает поток; несработавшие таймеры остаются в self.timers"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def add(self, duration, timer_id=None):
+        """Добавляет таймер на duration секунд и возвращает его номер"""
+        with self._cond:
+            if timer_id is None:
+                self.counter += 1
+                timer_id = self.counter
+            timer = Timer(timer_id, duration, time.monotonic() + duration)
+            self.timers[timer_id] = timer
+            heapq.heappush(self._heap, (timer.deadline, timer_id))
+            # Будим поток, только если новый срок стал ближайшим
+            if self._heap[0][1] == timer_id:
+                self._cond.notify()
+        return timer_id
+
+    def cancel(self, timer_id):
+        """Отменяет таймер; False, если такого нет"""
+        with self._cond:
+            if self.timers.pop(timer_id, None) is None:
+                return False
+            # Чистим кучу, когда отмененных записей становится больше половины
+            if len(self._heap) > 2 * len(self.timers) + 16:
+                self._heap = [(d, i) for d, i in self._heap
+                              if i in self.timers and self.timers[i].deadline == d]
+                heapq.heapify(self._heap)
+            return True
+
+    def list(self):
+        """Активные таймеры в порядке срабатывания"""
+        with self._cond:
+            return sorted(self.timers.values(), key=lambda timer: timer.deadline)
+
+    def get(self, timer_id):
+        with self._cond:
+            return self.timers.get(timer_id)
+
+    def snapshot(self):
+        """Активные таймеры как [(номер, длительность, осталось секунд)] - для переноса в новый процесс"""
+        with self._cond:
+            now = time.monotonic()
+            return [(timer.id, timer.duration, max(0.0, timer.deadline - now))
+                    for timer in sorted(self.timers.values(), key=lambda timer: timer.deadline)]
+
+    def restore(self, timers, elapsed=0.0):
+        """Возвращает таймеры из snapshot(); elapsed - сколько секунд прошло с него
+
+        Таймеры, срок которых истек за это время, срабатывают сразу.
+        """
+        with self._cond:
+            now = time.monotonic()
+            for timer_id, duration, remaining in timers:
+                timer = Timer(timer_id, duration, now + max(0.0, remaining - elapsed))
+                self.timers[timer_id] = timer
+                heapq.heappush(self._heap, (timer.deadline, timer_id))
+                self.counter = max(self.counter, timer_id)
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                due = self._next_due()
+                while due is None:
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout)
+                    self.wakeups += 1
+                    if not self._running:
+                        return
+                    due = self._next_due()
+            self.on_fire(due)
+
+    def _next_due(self):
+        """Снимает с кучи сработавший таймер (под блокировкой) или возвращает None"""
+        now = time.monotonic()
+        while self._heap and self._heap[0][0] <= now:
+            deadline, timer_id = heapq.heappop(self._heap)
+            timer = self.timers.get(timer_id)
+            if timer is not None and timer.deadline == deadline:
+                del self.timers[timer_id]
+                return timer
+        return None
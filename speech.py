@@ -0,0 +1,452 @@
+"""Вывод речи: очередь фраз, отдельный поток и сменные движки синтеза"""
+import heapq
+import os
+import threading
+import time
+import wave
+
+PRIORITY_LOW = 0  # Служебные фразы ("Готов")
+PRIORITY_NORMAL = 1  # Ответы на команды
+PRIORITY_ALARM = 2  # Сработавшие таймеры
+
+
+class SpeechBackend:
+    """Движок синтеза: все методы, кроме cancel(), вызываются из потока вывода
+
+    render() и play() нужны для кэша ответов: фраза рендерится в 16-битный
+    моно PCM один раз и потом проигрывается без синтеза. Движок без
+    render() озвучивает все фразы через say().
+    """
+    sample_rate = 16000  # Частота PCM из render() и для play()
+    renders = False  # render() возвращает звук фразы - иначе кэш озвученных ответов не нужен
+
+    def __init__(self):
+        self.interrupted = threading.Event()
+        self.on_audio = None  # Вызывается, когда фраза начинает звучать
+        self.voice_name = type(self).__name__  # Голос и скорость входят в ключ кэша
+        self.rate = 0
+
+    def open(self):
+        """Подготавливает движок; False - речь недоступна"""
+        return True
+
+    def say(self, text):
+        """Синтезирует и произносит фразу до конца; False - прервана через cancel()"""
+        raise NotImplementedError
+
+    def render(self, text):
+        """PCM фразы без воспроизведения; None - движок так не умеет"""
+        return None
+
+    def play(self, pcm, text):
+        """Проигрывает готовый PCM фразы text; False - прервано через cancel()"""
+        raise NotImplementedError
+
+    def audio_started(self):
+        if self.on_audio is not None:
+            self.on_audio()
+
+    def chime(self):
+        """Звуковой сигнал перед объявлением таймера"""
+
+    def reset(self):
+        """Снимает прерывание перед следующей фразой"""
+        self.interrupted.clear()
+
+    def cancel(self):
+        """Прерывает текущую фразу (из любого потока)"""
+        self.interrupted.set()
+
+    def close(self):
+        """Освобождает ресурсы движка"""
+
+
+class SapiBackend(SpeechBackend):
+    """Windows SAPI: асинхронный Speak и ожидание конца фразы или прерывания"""
+    SVSF_ASYNC = 1
+    SVSF_PURGE = 2
+    SAFT_16KHZ_16BIT_MONO = 18  # Формат потока, совпадающий с sample_rate
+    renders = True
+
+    def __init__(self, retries=3):
+        super().__init__()
+        self.retries = retries
+        self.voice = None
+        self.renderer = None  # Отдельный голос, который пишет в память, а не в колонки
+        self._cancel_event = None
+
+    def open(self):
+        # COM-объект создается и используется только в потоке вывода
+        import pythoncom
+        import win32com.client
+        import win32event
+        pythoncom.CoInitialize()
+        self._cancel_event = win32event.CreateEvent(None, True, False, None)
+        for attempt in range(self.retries):
+            try:
+                self.voice = win32com.client.Dispatch("SAPI.SpVoice")
+                self.voice_name = self.voice.Voice.Id
+                self.rate = self.voice.Rate
+                return True
+            except Exception:
+                if attempt < self.retries - 1:
+                    time.sleep(2)
+        return False
+
+    def say(self, text):
+        self.voice.Speak(text, self.SVSF_ASYNC | self.SVSF_PURGE)
+        self.audio_started()  # Нижняя граница: синтез только начался
+        return self._wait()
+
+    def render(self, text):
+        import win32com.client
+        if self.renderer is None:
+            self.renderer = win32com.client.Dispatch("SAPI.SpVoice")
+            self.renderer.Voice = self.voice.Voice
+            self.renderer.Rate = self.voice.Rate
+        stream = self._memory_stream()
+        self.renderer.AudioOutputStream = stream
+        self.renderer.Speak(text, 0)
+        return bytes(stream.GetData())
+
+    def play(self, pcm, text):
+        stream = self._memory_stream()
+        stream.SetData(pcm)
+        self.voice.SpeakStream(stream, self.SVSF_ASYNC | self.SVSF_PURGE)
+        self.audio_started()
+        return self._wait()
+
+    def _memory_stream(self):
+        import win32com.client
+        stream = win32com.client.Dispatch("SAPI.SpMemoryStream")
+        stream.Format.Type = self.SAFT_16KHZ_16BIT_MONO
+        return stream
+
+    def _wait(self):
+        import win32event
+        # Спим до конца фразы или до прерывания, без опроса
+        done = self.voice.SpeakCompleteEvent()
+        result = win32event.WaitForMultipleObjects([done, self._cancel_event], False, win32event.INFINITE)
+        if result == win32event.WAIT_OBJECT_0 + 1:
+            self.voice.Speak("", self.SVSF_ASYNC | self.SVSF_PURGE)  # Обрываем речь
+            return False
+        return True
+
+    def chime(self):
+        import winsound
+        for _ in range(3):  # Три сигнала
+            if self.interrupted.is_set():
+                return
+            winsound.Beep(1000, 500)  # Частота 1000 Гц, длительность 500 мс
+            self.interrupted.wait(0.3)
+
+    def reset(self):
+        import win32event
+        super().reset()
+        win32event.ResetEvent(self._cancel_event)
+
+    def cancel(self):
+        import win32event
+        super().cancel()
+        if self._cancel_event is not None:
+            win32event.SetEvent(self._cancel_event)
+
+    def close(self):
+        if self._cancel_event is None:
+            return  # Движок не открывался
+        import pythoncom
+        self.voice = self.renderer = None
+        pythoncom.CoUninitialize()
+
+
+class NullBackend(SpeechBackend):
+    """Речь без звука: запоминает фразы и имитирует время синтеза и произнесения
+
+    chars_per_second=None - фразы "произносятся" мгновенно;
+    synthesis_delay - сколько проходит от say() до первого звука.
+    spoken - список (начало по time.monotonic(), текст, произнесена до конца).
+    """
+    CHIME_SECONDS = 2.4  # Три сигнала по 0.5 с с паузами 0.3 с
+
+    def __init__(self, chars_per_second=None, synthesis_delay=0.0):
+        super().__init__()
+        self.chars_per_second = chars_per_second
+        self.synthesis_delay = synthesis_delay
+        self.spoken = []
+
+    @property
+    def renders(self):
+        # Без звука и без темпа "озвучка" - пустой PCM: кэшировать нечего
+        return self.chars_per_second is not None
+
+    def duration(self, text):
+        return len(text) / self.chars_per_second if self.chars_per_second else 0.0
+
+    def synthesize(self, text):
+        """PCM фразы: тишина ее длительности"""
+        return bytes(int(self.duration(text) * self.sample_rate) * 2)
+
+    def say(self, text):
+        if self.interrupted.wait(self.synthesis_delay):
+            self.spoken.append((time.monotonic(), text, False))
+            return False
+        return self.play(self.synthesize(text), text)
+
+    def render(self, text):
+        time.sleep(self.synthesis_delay)
+        return self.synthesize(text)
+
+    def play(self, pcm, text):
+        started = time.monotonic()
+        self.audio_started()
+        finished = not self.interrupted.wait(len(pcm) / 2 / self.sample_rate)
+        self.spoken.append((started, text, finished))
+        return finished
+
+    def chime(self):
+        if self.chars_per_second:
+            self.interrupted.wait(self.CHIME_SECONDS)
+
+
+class WaveFileBackend(NullBackend):
+    """Для проверки без SAPI: каждая фраза пишется в WAV-файл тоном ее длительности
+
+    При прерывании файл обрезается на моменте cancel(), так что по файлам
+    видно, что и сколько было бы произнесено.
+    """
+    def __init__(self, directory, chars_per_second=15.0, synthesis_delay=0.0):
+        super().__init__(chars_per_second, synthesis_delay)
+        self.directory = directory
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        return True
+
+    def synthesize(self, text):
+        # Меандр 500 Гц: звук, по которому легко измерить длину фразы
+        period = self.sample_rate // 500
+        wave_period = b'\xff\x3f' * (period // 2) + b'\x01\xc0' * (period - period // 2)
+        frames = int(self.duration(text) * self.sample_rate)
+        return (wave_period * (frames // period + 1))[:frames * 2]
+
+    def play(self, pcm, text):
+        finished = super().play(pcm, text)
+        played = int((time.monotonic() - self.spoken[-1][0]) * self.sample_rate) * 2
+        self.write(len(self.spoken), text, pcm[:played])
+        return finished
+
+    def write(self, index, text, pcm):
+        path = os.path.join(self.directory, f"{index:04d}.wav")
+        with wave.open(path, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(self.sample_rate)
+            wf.writeframes(pcm)
+        with open(os.path.splitext(path)[0] + '.txt', 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+class SpeechOutput:
+    """Очередь фраз с приоритетами и поток вывода: say() не блокирует вызывающего
+
+    Фразы произносятся по убыванию приоритета, при равном - по порядку.
+    interrupt=True обрывает текущую фразу и отбрасывает ожидающие, если они
+    не важнее новой. Движок открывается и используется только в потоке вывода.
+    С кэшем (ResponseCache) неизменные фразы и начала фраз проигрываются
+    готовым PCM, а недостающие рендерятся в простое, когда очередь пуста.
+    """
+    def __init__(self, backend, cache=None, on_ready=None):
+        self.backend = backend
+        self.backend.on_audio = self._on_audio
+        self.cache = cache
+        self.on_ready = on_ready  # Вызывается из потока вывода: on_ready(движок готов)
+        # Вызывается из потока вывода для фраз с started: on_first_audio(откуда звук, секунд от started)
+        self.on_first_audio = None
+        self.available = False
+        self.ready = threading.Event()  # Движок открыт (или открыть не удалось)
+        self.said = 0  # Сколько фраз начато
+        self.interrupted = 0  # Сколько фраз оборвано или отброшено
+        self.first_audio = []  # (откуда звук: memory/disk/synth, секунд от say() до первого звука)
+        self._queue = []  # (-приоритет, номер, текст, сигнал, время постановки, started)
+        self._pending = []  # Фразы для кэша, которые еще предстоит отрендерить
+        self._phrase_source = None
+        self._phrase_queued = None
+        self._phrase_started = None
+        self._counter = 0
+        self._current = None  # Приоритет произносимой фразы
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    @property
+    def speaking(self):
+        """Ассистент сейчас говорит или собирается"""
+        return self._current is not None or bool(self._queue)
+
+    @property
+    def rendering_left(self):
+        """Сколько фраз еще не отрендерено в кэш"""
+        return len(self._pending)
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="speech", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Обрывает речь и останавливает поток"""
+        with self._cond:
+            self._running = False
+            self._queue.clear()
+            if self._current is not None:
+                self.backend.cancel()
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def say(self, text, priority=PRIORITY_NORMAL, interrupt=False, chime=False, started=None):
+        """Ставит фразу в очередь и сразу возвращается
+
+        started - момент по time.monotonic(), от которого on_first_audio
+        считает задержку первого звука (например, начало выполнения команды).
+        """
+        with self._cond:
+            if interrupt:
+                self._cancel(priority)
+            self._counter += 1
+            heapq.heappush(self._queue, (-priority, self._counter, text, chime, time.monotonic(), started))
+            self._cond.notify_all()
+
+    def cancel(self, priority=PRIORITY_ALARM):
+        """Перебивание: обрывает и отбрасывает фразы с приоритетом не выше priority"""
+        with self._cond:
+            self._cancel(priority)
+            self._cond.notify_all()
+
+    def _cancel(self, priority):
+        kept = [item for item in self._queue if -item[0] > priority]
+        self.interrupted += len(self._queue) - len(kept)
+        if len(kept) != len(self._queue):
+            self._queue = kept
+            heapq.heapify(self._queue)
+        if self._current is not None and self._current <= priority:
+            self.interrupted += 1
+            self.backend.cancel()
+
+    def wait_idle(self, timeout=None):
+        """Ждет, пока очередь опустеет и фраза договорится; False - не дождались"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.speaking and self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def _run(self):
+        try:
+            self.available = self.backend.open()
+        except Exception:
+            self.available = False
+        if self.available and self.cache is not None:
+            self._pending = self.cache.missing(self._voice(), self.backend.rate)
+        if self.on_ready is not None:
+            self.on_ready(self.available)
+        self.ready.set()
+
+        while True:
+            with self._cond:
+                while self._running and not self._queue and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    break
+                if not self._queue:
+                    item = None
+                else:
+                    item = heapq.heappop(self._queue)
+                    self._current = -item[0]
+                    # Прерывание сбрасывается под той же блокировкой, что и выставляется
+                    self.backend.reset()
+                    self.said += 1
+
+            if item is None:
+                # Очередь пуста: рендерим одну фразу в кэш и снова проверяем очередь
+                self._render(self._pending.pop(0))
+                continue
+
+            _, _, text, chime, queued, started = item
+            if self.available:
+                try:
+                    if chime:
+                        self.backend.chime()
+                    self._phrase_source = None
+                    self._phrase_queued = queued
+                    self._phrase_started = started
+                    self._speak(text)
+                except Exception:
+                    # Переоткрываем движок здесь, не задерживая распознавание
+                    self.backend.close()
+                    try:
+                        self.available = self.backend.open()
+                    except Exception:
+                        self.available = False
+
+            with self._cond:
+                self._current = None
+                self._phrase_queued = None
+                self._phrase_started = None
+                self._cond.notify_all()
+
+        self.backend.close()
+
+    def _speak(self, text):
+        """Произносит фразу: части из кэша проигрываются готовыми, остальное синтезируется"""
+        parts = self.cache.plan(text) if self.cache is not None else [(text, False)]
+        for part, cacheable in parts:
+            if self.backend.interrupted.is_set():
+                return
+            pcm = self._cached(part) if cacheable else None
+            if pcm is not None:
+                self.backend.play(pcm, part)
+                continue
+            if self._phrase_source is None:
+                self._phrase_source = 'synth'
+            self.backend.say(part)
+            if cacheable and part not in self._pending:
+                self._pending.append(part)  # Отрендерим, когда очередь опустеет
+
+    def _cached(self, text):
+        memory_hits = self.cache.memory_hits
+        pcm = self.cache.get(text, self._voice(), self.backend.rate)
+        if pcm is not None and self._phrase_source is None:
+            self._phrase_source = 'memory' if self.cache.memory_hits > memory_hits else 'disk'
+        return pcm
+
+    def _render(self, text):
+        try:
+            pcm = self.backend.render(text)
+        except Exception:
+            pcm = None
+        if pcm is None:
+            self._pending = []  # Движок не умеет рендерить - кэш не заполнить
+            return
+        self.cache.put(text, self._voice(), self.backend.rate, pcm)
+
+    def _voice(self):
+        return f"{self.backend.voice_name}@{self.backend.sample_rate}"
+
+    def _on_audio(self):
+        """Первый звук фразы: записываем, сколько он заставил себя ждать"""
+        if self._phrase_queued is not None:
+            now = time.monotonic()
+            self.first_audio.append((self._phrase_source, now - self._phrase_queued))
+            if self._phrase_started is not None and self.on_first_audio is not None:
+                self.on_first_audio(self._phrase_source, now - self._phrase_started)
+            self._phrase_queued = None
+            self._phrase_started = None
+        self._phrase_source = None
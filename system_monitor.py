@@ -0,0 +1,152 @@
+"""Состояние системы в фоне: диски, процессор, память и батарея для голосовой команды и метрик"""
+import threading
+import time
+
+from metrics import METRICS
+from event_log import log_event
+
+
+def drive_name(mountpoint):
+    """'C:\\' -> 'C', '/home' -> '/home'"""
+    return mountpoint.rstrip('\\/:') or mountpoint
+
+
+class SystemSnapshot:
+    """Результат одного опроса; disks - [(диск, занято %)], None - диск не ответил вовремя"""
+    def __init__(self, disks, cpu, memory, battery, duration):
+        self.time = time.monotonic()
+        self.disks = disks
+        self.cpu = cpu  # Средняя загрузка процессора с прошлого опроса, %
+        self.memory = memory  # Занятая память, %
+        self.battery = battery  # (заряд %, от сети) или None - батареи нет
+        self.duration = duration  # Сколько длился опрос, с
+
+    @property
+    def age(self):
+        return time.monotonic() - self.time
+
+
+class DiskProbe:
+    """Запрос занятости одного диска в своем потоке: зависший сетевой диск держит только его"""
+    def __init__(self, psutil, mountpoint):
+        self.percent = None
+        self.done = threading.Event()
+        threading.Thread(target=self._run, args=(psutil, mountpoint), name="disk-probe", daemon=True).start()
+
+    def _run(self, psutil, mountpoint):
+        try:
+            self.percent = psutil.disk_usage(mountpoint).percent
+        except Exception:
+            pass  # Диск извлечен или недоступен
+        self.done.set()
+
+
+class SystemMonitor:
+    """Опрашивает систему раз в ttl секунд в своем потоке; snapshot - последний результат
+
+    Команда состояния системы только читает готовый снимок и не ждет дисков.
+    Диски опрашиваются параллельно, каждый не дольше mount_timeout; пока запрос
+    к зависшему диску не вернулся, новый к нему не отправляется. Значения
+    снимка дублируются в метрики (см. metrics.py). source - модуль psutil или
+    объект с теми же функциями (для замеров); psutil импортируется в потоке
+    опроса, чтобы не задерживать запуск.
+    """
+    def __init__(self, ttl=30, mount_timeout=1.0, source=None, metrics=METRICS):
+        self.ttl = ttl
+        self.mount_timeout = mount_timeout
+        self.source = source
+        self.metrics = metrics
+        self.snapshot = None
+        self.ready = threading.Event()  # Первый снимок готов
+        self.refreshes = 0
+        self.error = None  # Последняя ошибка опроса (о каждой новой пишем в журнал)
+        self._probes = {}  # Точка монтирования -> DiskProbe последнего запроса
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._refresh_time = metrics.histogram('quant_system_refresh_seconds', "Длительность опроса системы")
+
+    def start(self):
+        """Запускает опрос (повторный вызов ничего не делает - монитор общий для сессий сервера)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="system-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        self._stopped.set()
+        if thread is not None:
+            thread.join()
+
+    def refresh(self):
+        """Опрашивает систему и возвращает новый снимок"""
+        psutil = self.source
+        if psutil is None:
+            import psutil
+            self.source = psutil
+        started = time.perf_counter()
+        mountpoints = [partition.mountpoint for partition in psutil.disk_partitions(all=False)
+                       if partition.fstype and 'cdrom' not in partition.opts]
+        usage = self._disk_usage(psutil, mountpoints)
+        battery = None
+        try:
+            sensor = psutil.sensors_battery()
+            if sensor is not None:
+                battery = (sensor.percent, sensor.power_plugged)
+        except (AttributeError, NotImplementedError):
+            pass  # Платформа не сообщает о батарее
+        # Загрузка процессора - средняя с прошлого вызова; при первом опросе меряем 0,1 с
+        cpu = psutil.cpu_percent(interval=None if self.refreshes else 0.1)
+        snapshot = SystemSnapshot([(drive_name(mount), usage[mount]) for mount in mountpoints],
+                                  cpu, psutil.virtual_memory().percent, battery, time.perf_counter() - started)
+        self.snapshot = snapshot
+        self.refreshes += 1
+        self.ready.set()
+        self._publish(snapshot)
+        return snapshot
+
+    def _disk_usage(self, psutil, mountpoints):
+        """Занятость дисков в процентах, опрошенных параллельно; None - не ответил за mount_timeout"""
+        deadline = time.monotonic() + self.mount_timeout
+        for mount in mountpoints:
+            probe = self._probes.get(mount)
+            if probe is None or probe.done.is_set():  # Прежний запрос к диску вернулся
+                self._probes[mount] = DiskProbe(psutil, mount)
+        usage = {}
+        for mount in mountpoints:
+            probe = self._probes[mount]
+            if probe.done.wait(max(0.0, deadline - time.monotonic())):
+                usage[mount] = probe.percent
+            else:
+                usage[mount] = None
+                self.metrics.counter('quant_system_disk_timeouts_total', "Опросы, на которые диск не ответил вовремя",
+                                     disk=drive_name(mount)).inc()
+        return usage
+
+    def _publish(self, snapshot):
+        metrics = self.metrics
+        self._refresh_time.observe(snapshot.duration)
+        metrics.gauge('quant_system_cpu_percent', "Загрузка процессора, %").set(snapshot.cpu)
+        metrics.gauge('quant_system_memory_percent', "Занятая память, %").set(snapshot.memory)
+        if snapshot.battery is not None:
+            metrics.gauge('quant_system_battery_percent', "Заряд батареи, %").set(snapshot.battery[0])
+        for disk, percent in snapshot.disks:
+            if percent is not None:
+                metrics.gauge('quant_system_disk_used_percent', "Занятое место на диске, %", disk=disk).set(percent)
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+                self.error = None
+            except Exception as e:
+                # Без psutil или при сбое команда сообщит, что данных нет
+                if str(e) != str(self.error):
+                    log_event(f"Ошибка опроса состояния системы: {e}", "error")
+                self.error = e
+            if self._stopped.wait(self.ttl):
+                break
@@ -0,0 +1,88 @@
+"""Детектор речевой активности (VAD) перед распознавателем"""
+from collections import deque
+
+import numpy as np
+
+
+class VoiceActivityDetector:
+    """Энергетический VAD с учетом пересечений нуля, адаптивным шумом и удержанием
+
+    Чанк делится на кадры по frame_ms; для всех кадров сразу считаются
+    энергия (дБ относительно полной шкалы) и доля пересечений нуля.
+    Кадр считается речью, если энергия выше уровня шума на threshold_db,
+    либо выше на половину порога при высокой доле пересечений нуля
+    (глухие согласные). После конца речи затвор держится открытым hangover_ms.
+
+    Уровень шума - минимум энергии кадров за последние floor_window_ms
+    (minimum statistics): в паузах между словами энергия опускается до шума,
+    поэтому речь его не поднимает, а ровный шум (вентилятор) становится
+    уровнем шума, даже если сначала был принят за речь. Окно разбито на
+    floor_blocks частей: минимум считается по минимумам частей.
+    """
+    def __init__(self, sample_rate, frame_ms=20, threshold_db=10.0, hangover_ms=600,
+                 min_speech_frames=2, zcr_fricative=0.25, floor_db=-50.0, min_floor_db=-70.0,
+                 floor_window_ms=3000, floor_blocks=6):
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.threshold_db = threshold_db
+        self.hangover = hangover_ms / 1000
+        self.min_speech_frames = min_speech_frames
+        self.zcr_fricative = zcr_fricative
+        self.noise_floor = floor_db  # Текущая оценка уровня шума, дБ
+        self.min_floor_db = min_floor_db
+        self.floor_block = floor_window_ms / 1000 / floor_blocks  # Длительность части окна, с
+        self.block_minima = deque(maxlen=floor_blocks)  # Минимумы энергии завершенных частей окна
+        self.block_min = None  # Минимум текущей части
+        self.block_elapsed = 0.0
+        self.hangover_left = 0.0
+        self.is_open = False
+        self.speech = False  # Была ли речь в последнем чанке (а не только удержание после нее)
+
+    def analyze(self, data):
+        """Возвращает энергию (дБ) и долю пересечений нуля для каждого кадра"""
+        samples = np.frombuffer(data, dtype=np.int16)
+        count = len(samples) // self.frame_len
+        if count == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32)
+        frames = samples[:count * self.frame_len].reshape(count, self.frame_len).astype(np.float32)
+        frames *= 1 / 32768
+        energy = 10 * np.log10(np.einsum('ij,ij->i', frames, frames) / self.frame_len + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / self.frame_len
+        return energy, zcr
+
+    def process(self, data):
+        """Обрабатывает чанк и возвращает True, если его нужно отдать распознавателю"""
+        energy, zcr = self.analyze(data)
+        duration = len(data) / 2 / self.sample_rate
+
+        above = energy - self.noise_floor
+        speech = (above > self.threshold_db) | ((above > self.threshold_db / 2) & (zcr > self.zcr_fricative))
+
+        self.speech = np.count_nonzero(speech) >= self.min_speech_frames
+        if self.speech:
+            self.hangover_left = self.hangover
+            self.is_open = True
+        else:
+            self.hangover_left -= duration
+            if self.hangover_left <= 0:
+                self.is_open = False
+
+        self.track_floor(energy, duration)
+        return self.is_open
+
+    def track_floor(self, energy, duration):
+        """Обновляет уровень шума: минимум энергии кадров за окно floor_window_ms"""
+        if len(energy):
+            low = float(energy.min())
+            self.block_min = low if self.block_min is None else min(self.block_min, low)
+        self.block_elapsed += duration
+        if self.block_elapsed >= self.floor_block and self.block_min is not None:
+            self.block_minima.append(self.block_min)
+            self.block_min = None
+            self.block_elapsed = 0.0
+        minima = list(self.block_minima)
+        if self.block_min is not None:
+            minima.append(self.block_min)
+        if minima:
+            self.noise_floor = max(self.min_floor_db, min(minima))
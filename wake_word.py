@@ -0,0 +1,46 @@
+"""Ключевое слово по словам результата Vosk: целые слова, уверенность и время"""
+
+
+class WakeMatch:
+    """Найденное ключевое слово: слово, уверенность, время (с) и команда после него"""
+    def __init__(self, keyword, confidence, start, end, command, accepted):
+        self.keyword = keyword
+        self.confidence = confidence
+        self.start = start
+        self.end = end
+        self.command = command
+        self.accepted = accepted  # Уверенность не ниже порога
+
+
+class WakeWordDetector:
+    """Ищет ключевое слово среди слов результата, а не подстрокой текста
+
+    «ван» в «диване» или «ванне» не срабатывает: сравниваются целые слова.
+    Слова берутся из result['result'] (SetWords(True)) с уверенностью conf и
+    временем start/end; у промежуточных результатов слов нет, и тогда текст
+    делится на слова с уверенностью 1. Из нескольких ключевых слов берется
+    самое уверенное. Команда - слова, начавшиеся после конца ключевого слова,
+    без ключевых слов и [unk]; слова до него (чужая речь) в команду не входят.
+    """
+    def __init__(self, keywords, min_confidence=0.7):
+        self.keywords = set(keywords)
+        self.min_confidence = min_confidence
+
+    def words(self, result):
+        """[(слово, уверенность, начало, конец)] результата; время по порядку, если его нет"""
+        words = result.get('result')
+        if words:
+            return [(w['word'].lower(), w.get('conf', 1.0), w.get('start', index), w.get('end', index))
+                    for index, w in enumerate(words)]
+        return [(word, 1.0, index, index) for index, word in enumerate(result.get('text', '').lower().split())]
+
+    def detect(self, result):
+        """WakeMatch для ключевого слова результата или None, если его нет"""
+        words = self.words(result)
+        found = [word for word in words if word[0] in self.keywords]
+        if not found:
+            return None
+        keyword, confidence, start, end = max(found, key=lambda word: word[1])
+        command = " ".join(word for word, _, word_start, _ in words
+                           if word_start >= end and word not in self.keywords and word != '[unk]')
+        return WakeMatch(keyword, confidence, start, end, command, confidence >= self.min_confidence)